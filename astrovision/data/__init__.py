@@ -2,16 +2,37 @@
 Data module.
 """
 
-from .satellite_image import SatelliteImage
+from .satellite_image import SatelliteImage, iter_tiles, reproject_images
 from .labeled_satellite_image import (
     SegmentationLabeledSatelliteImage,
     DetectionLabeledSatelliteImage,
     ClassificationLabeledSatelliteImage,
+    compute_classification_labels,
 )
+from .statistics import RadiometricStatistics, compute_statistics
+from .export import write_tiles
+from .image_collection import ImageCollection
+from .catalog import ImageCatalog
+from .tile_store import TileStore
+from .shards import ShardWriter, ShardReader
+from .vector import VectorWriter, polygonize_tiles
 
 __all__ = [
     "SatelliteImage",
     "SegmentationLabeledSatelliteImage",
     "DetectionLabeledSatelliteImage",
     "ClassificationLabeledSatelliteImage",
+    "compute_classification_labels",
+    "iter_tiles",
+    "reproject_images",
+    "RadiometricStatistics",
+    "compute_statistics",
+    "write_tiles",
+    "ImageCollection",
+    "ImageCatalog",
+    "TileStore",
+    "ShardWriter",
+    "ShardReader",
+    "VectorWriter",
+    "polygonize_tiles",
 ]
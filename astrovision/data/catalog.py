@@ -0,0 +1,259 @@
+"""
+Columnar catalog of satellite images.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+import shapely
+from shapely.geometry.base import BaseGeometry
+
+from .raster_reader import RasterReader
+from .satellite_image import SatelliteImage
+from .utils import get_transform_for_tile, prepare_reprojected
+
+
+class ImageCatalog:
+    """
+    Catalog of satellite image metadata stored as NumPy columns, one row
+    per image, so that metadata queries on millions of tiles are
+    vectorized instead of walking SatelliteImage objects.
+
+    Columns are:
+        - bounds: (N, 4) float array of (left, bottom, right, top) bounds.
+        - crs_codes: (N,) integer codes into `crs_values`.
+        - deps: (N,) string array of départements, empty when unknown.
+        - dates: (N,) datetime64[D] array of dates, NaT when unknown.
+        - path_codes: (N,) integer codes into `file_paths`, -1 for images
+          which are not backed by a raster file.
+        - windows: (N, 4) integer array of (row_off, col_off, height, width)
+          windows in the raster file, -1 for images not backed by a file.
+    """
+
+    def __init__(
+        self,
+        bounds: np.ndarray,
+        crs_codes: np.ndarray,
+        crs_values: List[str],
+        deps: np.ndarray,
+        dates: np.ndarray,
+        path_codes: np.ndarray,
+        file_paths: List[str],
+        windows: np.ndarray,
+    ):
+        """
+        Constructor.
+
+        Args:
+            bounds (np.ndarray): (N, 4) array of bounds.
+            crs_codes (np.ndarray): (N,) array of codes into `crs_values`.
+            crs_values (List[str]): Distinct CRSs.
+            deps (np.ndarray): (N,) array of départements.
+            dates (np.ndarray): (N,) datetime64[D] array of dates.
+            path_codes (np.ndarray): (N,) array of codes into `file_paths`.
+            file_paths (List[str]): Distinct file paths.
+            windows (np.ndarray): (N, 4) array of windows.
+        """
+        self.bounds = bounds
+        self.crs_codes = crs_codes
+        self.crs_values = crs_values
+        self.deps = deps
+        self.dates = dates
+        self.path_codes = path_codes
+        self.file_paths = file_paths
+        self.windows = windows
+        self._footprints = None
+
+    def __len__(self) -> int:
+        return len(self.bounds)
+
+    @property
+    def crs(self) -> np.ndarray:
+        """
+        (N,) array of CRSs of the images.
+        """
+        return np.array(self.crs_values, dtype=object)[self.crs_codes]
+
+    @property
+    def footprints(self) -> np.ndarray:
+        """
+        (N,) array of image footprints, in the CRS of each image.
+        """
+        if self._footprints is None:
+            self._footprints = shapely.box(*self.bounds.T)
+        return self._footprints
+
+    @staticmethod
+    def from_images(images: Iterable[SatelliteImage]) -> ImageCatalog:
+        """
+        Build a catalog from satellite images. Images do not need to be
+        loaded: the file path and window of lazy images are recorded.
+
+        Args:
+            images (Iterable[SatelliteImage]): Satellite images.
+
+        Returns:
+            ImageCatalog: Catalog.
+        """
+        crs_values: Dict[str, int] = {}
+        file_paths: Dict[str, int] = {}
+        bounds, crs_codes, deps, dates, path_codes, windows = [], [], [], [], [], []
+
+        for image in images:
+            bounds.append(tuple(image.bounds))
+            crs_codes.append(crs_values.setdefault(image.crs, len(crs_values)))
+            deps.append(image.dep or "")
+            dates.append(image.date)
+            if image.reader is not None:
+                path = image.reader.file_path
+                path_codes.append(file_paths.setdefault(path, len(file_paths)))
+                windows.append(image.window)
+            else:
+                path_codes.append(-1)
+                windows.append((-1, -1, -1, -1))
+
+        return ImageCatalog(
+            bounds=np.array(bounds, dtype=np.float64).reshape(-1, 4),
+            crs_codes=np.array(crs_codes, dtype=np.int32),
+            crs_values=list(crs_values),
+            deps=np.array(deps, dtype="U3"),
+            dates=np.array(dates, dtype="datetime64[D]"),
+            path_codes=np.array(path_codes, dtype=np.int32),
+            file_paths=list(file_paths),
+            windows=np.array(windows, dtype=np.int64).reshape(-1, 4),
+        )
+
+    def to_images(self, **kwargs) -> List[SatelliteImage]:
+        """
+        Return lazy satellite images for the rows of the catalog. A single
+        reader is shared by all images of the same raster file.
+
+        Args:
+            **kwargs: Options passed to `RasterReader`, e.g. `bands_indices`
+                or `cast_to_float`.
+
+        Returns:
+            List[SatelliteImage]: Lazy satellite images.
+        """
+        if np.any(self.path_codes < 0):
+            raise ValueError(
+                "Images which are not backed by a raster file cannot be rebuilt."
+            )
+
+        readers = {}
+        images = []
+        for idx in range(len(self)):
+            path_code = int(self.path_codes[idx])
+            if path_code not in readers:
+                reader = RasterReader(self.file_paths[path_code], **kwargs)
+                readers[path_code] = (reader, reader.get_transform())
+            reader, transform = readers[path_code]
+
+            row_off, col_off, height, width = self.windows[idx].tolist()
+            dep = str(self.deps[idx]) or None
+            image_date = self.dates[idx]
+            images.append(
+                SatelliteImage(
+                    None,
+                    self.crs_values[self.crs_codes[idx]],
+                    None,
+                    get_transform_for_tile(transform, row_off, col_off),
+                    dep,
+                    None if np.isnat(image_date) else image_date.item(),
+                    reader=reader,
+                    window=(row_off, col_off, height, width),
+                )
+            )
+        return images
+
+    def select(self, selection: Union[np.ndarray, Sequence[int]]) -> ImageCatalog:
+        """
+        Return the sub-catalog of selected rows.
+
+        Args:
+            selection (Union[np.ndarray, Sequence[int]]): Boolean mask or
+                indices of rows.
+
+        Returns:
+            ImageCatalog: Sub-catalog.
+        """
+        selection = np.asarray(selection)
+        return ImageCatalog(
+            bounds=self.bounds[selection],
+            crs_codes=self.crs_codes[selection],
+            crs_values=self.crs_values,
+            deps=self.deps[selection],
+            dates=self.dates[selection],
+            path_codes=self.path_codes[selection],
+            file_paths=self.file_paths,
+            windows=self.windows[selection],
+        )
+
+    def mask_dates(
+        self, start: Optional[date] = None, end: Optional[date] = None
+    ) -> np.ndarray:
+        """
+        Return a boolean mask of images dated between `start` and `end`
+        (inclusive). Images without a date are excluded.
+
+        Args:
+            start (Optional[date]): Start date. Defaults to no lower bound.
+            end (Optional[date]): End date. Defaults to no upper bound.
+
+        Returns:
+            np.ndarray: Boolean mask.
+        """
+        mask = ~np.isnat(self.dates)
+        if start is not None:
+            mask &= self.dates >= np.datetime64(start, "D")
+        if end is not None:
+            mask &= self.dates <= np.datetime64(end, "D")
+        return mask
+
+    def mask_deps(self, deps: Sequence[str]) -> np.ndarray:
+        """
+        Return a boolean mask of images in départements `deps`.
+
+        Args:
+            deps (Sequence[str]): Départements.
+
+        Returns:
+            np.ndarray: Boolean mask.
+        """
+        return np.isin(self.deps, np.array(deps, dtype="U3"))
+
+    def mask_footprint(
+        self,
+        geometry: BaseGeometry,
+        crs: str,
+        predicate: str = "intersects",
+    ) -> np.ndarray:
+        """
+        Return a boolean mask of images whose footprints satisfy
+        `predicate` with a geometry. The geometry is reprojected and
+        prepared once per CRS of the catalog.
+
+        Args:
+            geometry (BaseGeometry): Geometry.
+            crs (str): CRS of the geometry.
+            predicate (str): Name of a shapely binary predicate, e.g.
+                "intersects", "within" or "contains", with image footprints
+                as first argument. Defaults to "intersects".
+
+        Returns:
+            np.ndarray: Boolean mask.
+        """
+        predicate_function = getattr(shapely, predicate)
+        mask = np.zeros(len(self), dtype=bool)
+        for code, catalog_crs in enumerate(self.crs_values):
+            crs_mask = self.crs_codes == code
+            if not np.any(crs_mask):
+                continue
+            projected_geometry = prepare_reprojected(geometry, crs, catalog_crs)
+            mask[crs_mask] = predicate_function(
+                self.footprints[crs_mask], projected_geometry
+            )
+        return mask
@@ -0,0 +1,151 @@
+"""
+Bulk export of satellite image tiles to disk.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Literal, Optional, Union
+
+import numpy as np
+
+from .labeled_satellite_image import SegmentationLabeledSatelliteImage
+from .satellite_image import SatelliteImage
+
+
+def write_tiles(
+    images: Iterable[Union[SatelliteImage, SegmentationLabeledSatelliteImage]],
+    out_dir: str,
+    naming: Union[str, Callable[[int, SatelliteImage], str]] = "{index}",
+    file_format: Literal[".tif", ".jp2"] = ".tif",
+    n_workers: int = 4,
+    executor: Literal["thread", "process"] = "thread",
+    **kwargs,
+) -> List[Dict[str, str]]:
+    """
+    Write many tiles to disk concurrently. Satellite images are written
+    to `out_dir/images` and, for segmentation labeled images, labels are
+    saved as .npy files to `out_dir/labels`, with the same file names.
+
+    Args:
+        images (Iterable[Union[SatelliteImage, SegmentationLabeledSatelliteImage]]):
+            Tiles to write.
+        out_dir (str): Output directory.
+        naming (Union[str, Callable[[int, SatelliteImage], str]]): Either a
+            format string with fields `index`, `dep`, `date`, `left`, `bottom`,
+            `right` and `top`, or a function of the tile index and satellite
+            image, giving the file name without extension. Defaults to
+            "{index}".
+        file_format (Literal[".tif", ".jp2"]): Raster file format.
+        n_workers (int): Number of workers. Defaults to 4.
+        executor (Literal["thread", "process"]): Whether to write tiles
+            with a thread or a process pool. Defaults to "thread".
+        **kwargs: Options passed to `SatelliteImage.to_raster_tif`. Unless
+            given, `num_threads` is set to an equal share of the CPUs for
+            each worker.
+
+    Returns:
+        List[Dict[str, str]]: Manifest of written files, with for each tile
+            in input order the path of the image ("image" key) and of
+            the label ("label" key) if any.
+    """
+    if file_format not in [".tif", ".jp2"]:
+        raise ValueError(
+            f"File format is {file_format} must " f'be either ".jp2" or ".tif".'
+        )
+    if file_format == ".jp2" and kwargs:
+        raise ValueError("Writing options are only supported for .tif files.")
+    if file_format == ".tif":
+        # Workers compress concurrently, they share the CPUs
+        kwargs.setdefault(
+            "num_threads", str(max(1, (os.cpu_count() or 1) // n_workers))
+        )
+
+    # Directories are created once instead of once per tile
+    images_dir = os.path.join(out_dir, "images")
+    labels_dir = os.path.join(out_dir, "labels")
+    os.makedirs(images_dir, exist_ok=True)
+
+    def generate_tasks():
+        labels_dir_exists = False
+        for idx, image in enumerate(images):
+            task = _get_write_task(
+                idx, image, naming, images_dir, labels_dir, file_format, kwargs
+            )
+            if task[3] is not None and not labels_dir_exists:
+                os.makedirs(labels_dir, exist_ok=True)
+                labels_dir_exists = True
+            yield task
+
+    tasks = generate_tasks()
+
+    pool_class = ThreadPoolExecutor if executor == "thread" else ProcessPoolExecutor
+    manifest = []
+    with pool_class(max_workers=n_workers) as pool:
+        # Tasks are submitted by batches to bound the number of pending tiles
+        while True:
+            batch = list(islice(tasks, 4 * n_workers))
+            if not batch:
+                break
+            manifest.extend(pool.map(_write_tile, *zip(*batch)))
+    return manifest
+
+
+def _get_write_task(
+    idx: int,
+    image: Union[SatelliteImage, SegmentationLabeledSatelliteImage],
+    naming: Union[str, Callable[[int, SatelliteImage], str]],
+    images_dir: str,
+    labels_dir: str,
+    file_format: str,
+    kwargs: Dict,
+) -> tuple:
+    """
+    Return the arguments of `_write_tile` for a tile.
+    """
+    if isinstance(image, SegmentationLabeledSatelliteImage):
+        satellite_image, label = image.satellite_image, image.label
+    else:
+        satellite_image, label = image, None
+
+    if callable(naming):
+        name = naming(idx, satellite_image)
+    else:
+        left, bottom, right, top = satellite_image.bounds
+        name = naming.format(
+            index=idx,
+            dep=satellite_image.dep,
+            date=satellite_image.date,
+            left=left,
+            bottom=bottom,
+            right=right,
+            top=top,
+        )
+
+    image_path = os.path.join(images_dir, name + file_format)
+    label_path = None
+    if label is not None:
+        label_path = os.path.join(labels_dir, name + ".npy")
+    return satellite_image, label, image_path, label_path, kwargs
+
+
+def _write_tile(
+    satellite_image: SatelliteImage,
+    label: Optional[np.ndarray],
+    image_path: str,
+    label_path: Optional[str],
+    kwargs: Dict,
+) -> Dict[str, str]:
+    """
+    Write a tile and its label.
+    """
+    if image_path.endswith(".jp2"):
+        satellite_image.to_raster_jp2(image_path)
+    else:
+        satellite_image.to_raster_tif(image_path, **kwargs)
+
+    paths = {"image": image_path}
+    if label_path is not None:
+        np.save(label_path, label)
+        paths["label"] = label_path
+    return paths
@@ -0,0 +1,264 @@
+"""
+Collection of satellite images with a spatial index.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry.base import BaseGeometry
+
+from .satellite_image import SatelliteImage
+from .utils import reproject_geometries
+
+
+class ImageCollection:
+    """
+    Collection of satellite images answering spatial queries in bulk.
+
+    Footprints of the images are indexed with shapely STRtrees, one per
+    CRS, so that queries are answered without checking images one by one.
+    Images can be lazy (see `SatelliteImage.from_raster`), only their
+    bounds and CRS being used. The index is built incrementally: images
+    added to the collection are indexed in a new tree at the next query,
+    and trees of a CRS are merged when there are more than `max_trees`
+    of them.
+    """
+
+    def __init__(
+        self,
+        images: Optional[Iterable[SatelliteImage]] = None,
+        max_trees: int = 8,
+    ):
+        """
+        Constructor.
+
+        Args:
+            images (Optional[Iterable[SatelliteImage]]): Satellite images.
+            max_trees (int): Maximum number of trees per CRS before they
+                are merged into a single tree. Defaults to 8.
+        """
+        self.images: List[SatelliteImage] = []
+        self.max_trees = max_trees
+        # Per CRS, list of (image indices, footprints, tree)
+        self._trees: Dict[str, List[Tuple[np.ndarray, np.ndarray, STRtree]]] = {}
+        # Per CRS, indices of images which are not indexed yet
+        self._pending: Dict[str, List[int]] = {}
+
+        if images is not None:
+            self.extend(images)
+
+    def __len__(self) -> int:
+        return len(self.images)
+
+    def __getitem__(self, idx: int) -> SatelliteImage:
+        return self.images[idx]
+
+    def __iter__(self) -> Iterator[SatelliteImage]:
+        return iter(self.images)
+
+    def add(self, image: SatelliteImage) -> None:
+        """
+        Add a satellite image to the collection.
+
+        Args:
+            image (SatelliteImage): Satellite image.
+        """
+        self._pending.setdefault(image.crs, []).append(len(self.images))
+        self.images.append(image)
+
+    def extend(self, images: Iterable[SatelliteImage]) -> None:
+        """
+        Add satellite images to the collection.
+
+        Args:
+            images (Iterable[SatelliteImage]): Satellite images.
+        """
+        for image in images:
+            self.add(image)
+
+    def select(self, indices: Sequence[int]) -> ImageCollection:
+        """
+        Return the sub-collection of images with indices `indices`.
+
+        Args:
+            indices (Sequence[int]): Indices of images.
+
+        Returns:
+            ImageCollection: Sub-collection.
+        """
+        return ImageCollection([self.images[idx] for idx in indices], self.max_trees)
+
+    def _get_trees(self) -> Dict[str, List[Tuple[np.ndarray, np.ndarray, STRtree]]]:
+        """
+        Index pending images and return the trees of each CRS.
+
+        Returns:
+            Dict[str, List[Tuple[np.ndarray, np.ndarray, STRtree]]]: Trees.
+        """
+        for crs, pending_indices in self._pending.items():
+            indices = np.array(pending_indices, dtype=np.int64)
+            bounds = np.array([self.images[idx].bounds for idx in pending_indices])
+            footprints = shapely.box(*bounds.T)
+
+            trees = self._trees.setdefault(crs, [])
+            trees.append((indices, footprints, STRtree(footprints)))
+            if len(trees) > self.max_trees:
+                indices = np.concatenate([tree[0] for tree in trees])
+                footprints = np.concatenate([tree[1] for tree in trees])
+                self._trees[crs] = [(indices, footprints, STRtree(footprints))]
+        self._pending = {}
+        return self._trees
+
+    def query(
+        self,
+        geometries: Union[BaseGeometry, np.ndarray],
+        crs: str,
+        predicate: Optional[str] = "intersects",
+    ) -> np.ndarray:
+        """
+        Return indices of images whose footprints satisfy `predicate`
+        with the query geometries. Query geometries are reprojected once
+        into each CRS of the collection.
+
+        Args:
+            geometries (Union[BaseGeometry, np.ndarray]): Query geometry or array
+                of query geometries.
+            crs (str): CRS of the query geometries.
+            predicate (Optional[str]): Predicate tested between query
+                geometries and image footprints, e.g. "intersects",
+                "within" or "contains", as in `shapely.STRtree.query`.
+                None tests bounding box intersection only.
+
+        Returns:
+            np.ndarray: For a single geometry, sorted indices of matching
+                images. For an array of geometries, a (2, M) array of pairs
+                (query geometry index, image index).
+        """
+        single_geometry = isinstance(geometries, BaseGeometry)
+        geometries_array = np.atleast_1d(np.asarray(geometries, dtype=object))
+
+        results = []
+        for tree_crs, trees in self._get_trees().items():
+            projected_geometries = reproject_geometries(geometries_array, crs, tree_crs)
+            for indices, _, tree in trees:
+                query_indices, tree_indices = tree.query(
+                    projected_geometries, predicate=predicate
+                )
+                results.append(np.stack([query_indices, indices[tree_indices]]))
+
+        if not results:
+            results = [np.empty((2, 0), dtype=np.int64)]
+        pairs = np.concatenate(results, axis=1)
+        if single_geometry:
+            return np.unique(pairs[1])
+        return pairs[:, np.lexsort((pairs[1], pairs[0]))]
+
+    def query_box(
+        self, box_bounds: Tuple, crs: str, predicate: Optional[str] = "intersects"
+    ) -> np.ndarray:
+        """
+        Return indices of images intersecting a bounding box specified by
+        `box_bounds` and a `crs`.
+
+        Args:
+            box_bounds (Tuple): Box bounds.
+            crs (str): Projection system.
+            predicate (Optional[str]): Predicate, see `query`.
+
+        Returns:
+            np.ndarray: Indices of images.
+        """
+        return self.query(shapely.box(*box_bounds), crs, predicate)
+
+    def query_polygon(
+        self,
+        polygon_geometry: BaseGeometry,
+        crs: str,
+        predicate: Optional[str] = "intersects",
+    ) -> np.ndarray:
+        """
+        Return indices of images intersecting a polygon.
+
+        Args:
+            polygon_geometry (BaseGeometry): Polygon geometry.
+            crs (str): Projection system.
+            predicate (Optional[str]): Predicate, see `query`.
+
+        Returns:
+            np.ndarray: Indices of images.
+        """
+        return self.query(polygon_geometry, crs, predicate)
+
+    def query_point(self, coordinates: Tuple, crs: str) -> np.ndarray:
+        """
+        Return indices of images containing a point specified by
+        `coordinates`.
+
+        Footprints are treated like pixels: a point on the left or top
+        edge of a footprint belongs to the image, while a point on its
+        right or bottom edge only belongs to it if no other image contains
+        the point. A point on the edge shared by adjacent tiles thus
+        belongs to a single tile, the one on its right or below it.
+
+        Args:
+            coordinates (Tuple): Coordinates.
+            crs (str): Projection system.
+
+        Returns:
+            np.ndarray: Indices of images.
+        """
+        point = shapely.Point(*coordinates)
+        indices = self.query(point, crs, "covered_by")
+        if len(indices) <= 1:
+            return indices
+
+        inside = np.zeros(len(indices), dtype=bool)
+        for idx, image_idx in enumerate(indices.tolist()):
+            image = self.images[image_idx]
+            projected_point = reproject_geometries(point, crs, image.crs)
+            _, bottom, right, _ = image.bounds
+            inside[idx] = projected_point.x < right and projected_point.y > bottom
+        return indices[inside] if np.any(inside) else indices
+
+    def nearest(
+        self, geometries: Union[BaseGeometry, np.ndarray], crs: str
+    ) -> Union[int, np.ndarray]:
+        """
+        Return the index of the image closest to each query geometry.
+        Distances are computed in the CRS of each image, which should
+        share the same units.
+
+        Args:
+            geometries (Union[BaseGeometry, np.ndarray]): Query geometry or array
+                of query geometries.
+            crs (str): CRS of the query geometries.
+
+        Returns:
+            Union[int, np.ndarray]: Index of the nearest image for a single
+                geometry, array of indices for an array of geometries.
+        """
+        if len(self.images) == 0:
+            raise ValueError("The collection is empty.")
+
+        single_geometry = isinstance(geometries, BaseGeometry)
+        geometries_array = np.atleast_1d(np.asarray(geometries, dtype=object))
+
+        nearest_indices = np.full(len(geometries_array), -1, dtype=np.int64)
+        nearest_distances = np.full(len(geometries_array), np.inf)
+        for tree_crs, trees in self._get_trees().items():
+            projected_geometries = reproject_geometries(geometries_array, crs, tree_crs)
+            for indices, _, tree in trees:
+                (query_indices, tree_indices), distances = tree.query_nearest(
+                    projected_geometries, return_distance=True, all_matches=False
+                )
+                closer = distances < nearest_distances[query_indices]
+                nearest_indices[query_indices[closer]] = indices[tree_indices[closer]]
+                nearest_distances[query_indices[closer]] = distances[closer]
+
+        if single_geometry:
+            return int(nearest_indices[0])
+        return nearest_indices
@@ -6,15 +6,31 @@ task.
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Literal, Optional, Tuple
+from typing import Dict, List, Literal, Optional, Sequence, Tuple, Union
 
 import matplotlib.pyplot as plt
 import numpy as np
+import rasterio.features
+import shapely
+import torch
+from affine import Affine
 from PIL import Image, ImageDraw
 
 from .satellite_image import SatelliteImage
-from .utils import generate_tiles_borders
+from .utils import (
+    assign_boxes_to_tiles,
+    assign_geometries_to_tiles,
+    boxes_pixel_to_world,
+    boxes_world_to_pixel,
+    compute_class_histograms,
+    generate_tiles_grid,
+    get_bounds_for_tiles,
+    get_tiles_batch,
+    get_tiles_metadata,
+    reproject_geometries,
+)
 
 import matplotlib as mpl
 from matplotlib.patches import Patch
@@ -24,6 +40,11 @@ class SegmentationLabeledSatelliteImage:
     """
     Class for satellite images with a semantic segmentation label.
     The segmentation label supports n classes.
+
+    Labels are either (H, W) class IDs, or (K, H, W) logits (or
+    probabilities) when `logits` is True. Logits can be stored compactly,
+    as float16 or as integers quantized with `quantize_logits`, the
+    logits being `label * logits_scale + logits_offset`.
     """
 
     def __init__(
@@ -33,6 +54,8 @@ class SegmentationLabeledSatelliteImage:
         source: Optional[Literal["RIL", "BDTOPO"]] = None,
         labeling_date: Optional[datetime] = None,
         logits: Optional[bool] = False,
+        logits_scale: Optional[float] = None,
+        logits_offset: float = 0.0,
     ):
         """
         Constructor.
@@ -43,18 +66,139 @@ class SegmentationLabeledSatelliteImage:
             source (Optional[Literal["RIL", "BDTOPO"]]): Labeling source.
             labeling_date (Optional[datetime]): Date of labeling data.
             logits (Optional[bool]): Whether label array is logits or class IDs
+            logits_scale (Optional[float]): Scale of quantized logits, for
+                integer logits arrays.
+            logits_offset (float): Offset of quantized logits.
         """
         if not issubclass(label.dtype.type, np.integer) and not logits:
             raise ValueError("Label array must contain integer values for class IDs.")
 
-        if not issubclass(label.dtype.type, np.floating) and logits:
-            raise ValueError("Label array must contain float values for logits.")
+        if logits and logits_scale is None:
+            if not issubclass(label.dtype.type, np.floating):
+                raise ValueError("Label array must contain float values for logits.")
+        elif logits and not issubclass(label.dtype.type, np.integer):
+            raise ValueError(
+                "Label array must contain integer values for quantized logits."
+            )
 
         self.satellite_image = satellite_image
         self.label = label
         self.source = source
         self.labeling_date = labeling_date
         self.logits = logits
+        self.logits_scale = logits_scale
+        self.logits_offset = logits_offset
+
+    @property
+    def label(self) -> np.ndarray:
+        """
+        Label array.
+        """
+        return self._label
+
+    @label.setter
+    def label(self, label: np.ndarray):
+        self._label = label
+        # Maps derived from logits are computed on first access
+        self._class_ids = None
+        self._confidence = None
+
+    @property
+    def class_ids(self) -> np.ndarray:
+        """
+        (H, W) class IDs: the label, or the argmax of logits, computed
+        once on the stored logits without dequantizing them.
+        """
+        if not self.logits:
+            return self.label
+        if self._class_ids is None:
+            self._class_ids = self.label.argmax(axis=0)
+        return self._class_ids
+
+    @property
+    def confidence(self) -> Optional[np.ndarray]:
+        """
+        (H, W) float32 score of the predicted class, i.e. its probability
+        when the label holds probabilities, or None for class IDs. It is
+        computed once, and only the maximum over classes is dequantized.
+        """
+        if not self.logits:
+            return None
+        if self._confidence is None:
+            self._confidence = self._dequantize(self.label.max(axis=0))
+        return self._confidence
+
+    def _dequantize(self, values: np.ndarray, dtype: np.dtype = np.float32):
+        """
+        Convert stored logits to float logits.
+        """
+        dtype = np.dtype(dtype).type
+        if self.logits_scale is None:
+            return values.astype(dtype, copy=False)
+        return values.astype(dtype) * dtype(self.logits_scale) + dtype(
+            self.logits_offset
+        )
+
+    def get_logits(self, dtype: np.dtype = np.float32) -> np.ndarray:
+        """
+        Return the (K, H, W) logits as floats, dequantized if they are
+        stored as integers.
+
+        Args:
+            dtype (np.dtype): Float data type. Defaults to np.float32.
+
+        Returns:
+            np.ndarray: Logits.
+        """
+        if not self.logits:
+            raise ValueError("Label array contains class IDs, not logits.")
+        return self._dequantize(self.label, dtype)
+
+    def quantize_logits(
+        self, dtype: np.dtype = np.uint8
+    ) -> SegmentationLabeledSatelliteImage:
+        """
+        Return a copy of the SegmentationLabeledSatelliteImage with logits
+        stored compactly: as float16, or as integers of type `dtype` with
+        a scale and an offset spanning the range of the logits.
+
+        Args:
+            dtype (np.dtype): np.float16, np.uint8 or np.uint16.
+                Defaults to np.uint8.
+
+        Returns:
+            SegmentationLabeledSatelliteImage: Labeled image with compact
+                logits.
+        """
+        dtype = np.dtype(dtype)
+        if not self.logits:
+            raise ValueError("Label array contains class IDs, not logits.")
+        if dtype not in [np.float16, np.uint8, np.uint16]:
+            raise ValueError("`dtype` must be np.float16, np.uint8 or np.uint16.")
+
+        if dtype == np.float16:
+            return SegmentationLabeledSatelliteImage(
+                self.satellite_image,
+                self.get_logits().astype(np.float16),
+                self.source,
+                self.labeling_date,
+                logits=True,
+            )
+
+        logits = self.get_logits()
+        minimum, maximum = float(logits.min()), float(logits.max())
+        levels = np.iinfo(dtype).max
+        scale = (maximum - minimum) / levels if maximum > minimum else 1.0
+        label = np.rint((logits - minimum) / scale)
+        return SegmentationLabeledSatelliteImage(
+            self.satellite_image,
+            np.clip(label, 0, levels, out=label).astype(dtype),
+            self.source,
+            self.labeling_date,
+            logits=True,
+            logits_scale=scale,
+            logits_offset=minimum,
+        )
 
     def split(self, tile_length: int) -> List[SegmentationLabeledSatelliteImage]:
         """
@@ -67,28 +211,322 @@ class SegmentationLabeledSatelliteImage:
         Returns:
             List[SegmentationLabeledSatelliteImage]: Labeled tiles.
         """
-        # Split satellite image
-        tiles = self.satellite_image.split(tile_length=tile_length)
+        # Compute the tile grid once for the image and the label
+        height = self.satellite_image.shape[1]
+        width = self.satellite_image.shape[2]
+        grid = generate_tiles_grid(height, width, tile_length)
 
-        # Split label
-        height = self.satellite_image.array.shape[1]
-        width = self.satellite_image.array.shape[2]
+        # Split satellite image
+        tiles = self.satellite_image.split_on_grid(grid)
 
-        indices = generate_tiles_borders(height, width, tile_length)
+        # Split label, along its last two dimensions for logits
         label_tiles = [
-            self.label[rows[0] : rows[1], cols[0] : cols[1]]  # noqa: E203
-            for rows, cols in indices
+            self.label[..., row_min:row_max, col_min:col_max]
+            for row_min, row_max, col_min, col_max in grid.tolist()
         ]
 
         labeled_tiles = [
             SegmentationLabeledSatelliteImage(
-                image, label, self.source, self.labeling_date
+                image,
+                label,
+                self.source,
+                self.labeling_date,
+                self.logits,
+                self.logits_scale,
+                self.logits_offset,
             )
             for image, label in zip(tiles, label_tiles)
         ]
 
         return labeled_tiles
 
+    @staticmethod
+    def from_geometries(
+        satellite_image: SatelliteImage,
+        geometries: Sequence[shapely.Geometry],
+        crs: str,
+        classes: Union[int, Sequence[int]] = 1,
+        source: Optional[Literal["RIL", "BDTOPO"]] = None,
+        labeling_date: Optional[datetime] = None,
+        all_touched: bool = False,
+        dtype: np.dtype = np.uint8,
+    ) -> SegmentationLabeledSatelliteImage:
+        """
+        Build a SegmentationLabeledSatelliteImage by rasterizing vector
+        labels (e.g. RIL or BDTOPO building polygons) on the pixel grid
+        of a satellite image. Pixels outside geometries are labeled 0,
+        and later geometries are drawn over earlier ones. Pixels of lazy
+        images are not read.
+
+        Args:
+            satellite_image (SatelliteImage): Satellite image.
+            geometries (Sequence[shapely.Geometry]): Geometries.
+            crs (str): CRS of the geometries.
+            classes (Union[int, Sequence[int]]): Class ID of all
+                geometries, or of each geometry. Defaults to 1.
+            source (Optional[Literal["RIL", "BDTOPO"]]): Labeling source.
+            labeling_date (Optional[datetime]): Date of labeling data.
+            all_touched (bool): True to label all pixels touched by a
+                geometry, instead of pixels whose center is inside it.
+            dtype (np.dtype): Data type of the label. Defaults to np.uint8.
+
+        Returns:
+            SegmentationLabeledSatelliteImage: Labeled satellite image.
+        """
+        _, height, width = satellite_image.shape
+        grid = np.array([[0, height, 0, width]])
+        return SegmentationLabeledSatelliteImage._from_geometries_on_grid(
+            satellite_image,
+            [satellite_image],
+            grid,
+            geometries,
+            crs,
+            classes,
+            source,
+            labeling_date,
+            all_touched,
+            dtype,
+            n_workers=1,
+        )[0]
+
+    @staticmethod
+    def from_geometries_split(
+        satellite_image: SatelliteImage,
+        geometries: Sequence[shapely.Geometry],
+        crs: str,
+        tile_length: int,
+        classes: Union[int, Sequence[int]] = 1,
+        source: Optional[Literal["RIL", "BDTOPO"]] = None,
+        labeling_date: Optional[datetime] = None,
+        all_touched: bool = False,
+        dtype: np.dtype = np.uint8,
+        stride: Optional[int] = None,
+        n_workers: int = 4,
+    ) -> List[SegmentationLabeledSatelliteImage]:
+        """
+        Split a satellite image into tiles of side `tile_length`, as
+        `SatelliteImage.split` does, and label each tile by rasterizing
+        vector labels. Geometries are reprojected once, assigned to the
+        tiles they intersect with a spatial index, and tiles are
+        rasterized in parallel with a thread pool.
+
+        Args:
+            satellite_image (SatelliteImage): Satellite image.
+            geometries (Sequence[shapely.Geometry]): Geometries.
+            crs (str): CRS of the geometries.
+            tile_length (int): Side of tiles.
+            classes (Union[int, Sequence[int]]): Class ID of all
+                geometries, or of each geometry. Defaults to 1.
+            source (Optional[Literal["RIL", "BDTOPO"]]): Labeling source.
+            labeling_date (Optional[datetime]): Date of labeling data.
+            all_touched (bool): True to label all pixels touched by a
+                geometry, instead of pixels whose center is inside it.
+            dtype (np.dtype): Data type of labels. Defaults to np.uint8.
+            stride (Optional[int]): Step between tile offsets. Defaults to
+                `tile_length`.
+            n_workers (int): Number of threads. Defaults to 4.
+
+        Returns:
+            List[SegmentationLabeledSatelliteImage]: Labeled tiles.
+        """
+        _, height, width = satellite_image.shape
+        grid = generate_tiles_grid(height, width, tile_length, stride)
+        return SegmentationLabeledSatelliteImage._from_geometries_on_grid(
+            satellite_image,
+            satellite_image.split_on_grid(grid),
+            grid,
+            geometries,
+            crs,
+            classes,
+            source,
+            labeling_date,
+            all_touched,
+            dtype,
+            n_workers,
+        )
+
+    @staticmethod
+    def _from_geometries_on_grid(
+        satellite_image: SatelliteImage,
+        tiles: List[SatelliteImage],
+        grid: np.ndarray,
+        geometries: Sequence[shapely.Geometry],
+        crs: str,
+        classes: Union[int, Sequence[int]],
+        source: Optional[Literal["RIL", "BDTOPO"]],
+        labeling_date: Optional[datetime],
+        all_touched: bool,
+        dtype: np.dtype,
+        n_workers: int,
+    ) -> List[SegmentationLabeledSatelliteImage]:
+        """
+        Label the tiles of a grid of a satellite image by rasterizing
+        geometries.
+        """
+        geometries = np.asarray(geometries, dtype=object).reshape(-1)
+        classes = np.broadcast_to(np.asarray(classes), geometries.shape)
+        geometries = reproject_geometries(geometries, crs, satellite_image.crs)
+
+        tile_indices, geometry_indices = assign_geometries_to_tiles(
+            geometries, get_bounds_for_tiles(satellite_image.transform, grid)
+        )
+        # Geometries of each tile are a contiguous run of the sorted pairs
+        starts = np.searchsorted(tile_indices, np.arange(len(grid) + 1))
+
+        def rasterize_tile(idx: int) -> np.ndarray:
+            row_min, row_max, col_min, col_max = grid[idx].tolist()
+            shape = (row_max - row_min, col_max - col_min)
+            start, stop = starts[idx], starts[idx + 1]
+            tile_geometries = geometry_indices[start:stop]
+            if len(tile_geometries) == 0:
+                return np.zeros(shape, dtype=dtype)
+            return rasterio.features.rasterize(
+                zip(geometries[tile_geometries], classes[tile_geometries].tolist()),
+                out_shape=shape,
+                transform=Affine(*tiles[idx].transform[:6]),
+                fill=0,
+                all_touched=all_touched,
+                dtype=dtype,
+            )
+
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            labels = list(executor.map(rasterize_tile, range(len(grid))))
+
+        return [
+            SegmentationLabeledSatelliteImage(tile, label, source, labeling_date)
+            for tile, label in zip(tiles, labels)
+        ]
+
+    def split_to_batch(
+        self,
+        tile_length: int,
+        bands_indices: Optional[List[int]] = None,
+        dtype: Optional[np.dtype] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Split the SegmentationLabeledSatelliteImage into square tiles of
+        side `tile_length`, stacked in a single (N, C, H, W) image array
+        and a single (N, H, W) label array, or (N, K, H, W) for logits,
+        without creating one object per tile. Tiles are in the order of
+        `split`, and images and labels are cut on the same grid. Quantized
+        logits are returned as stored, see `logits_scale`.
+
+        Args:
+            tile_length (int): Side of tiles.
+            bands_indices (Optional[List[int]]): Indices of bands to keep.
+                Defaults to all bands.
+            dtype (Optional[np.dtype]): Data type of the image batch.
+                Defaults to the data type of the image array.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]: Batch of
+                image tiles, batch of label tiles and metadata table of the
+                tiles, as returned by `get_tiles_metadata`.
+        """
+        _, height, width = self.satellite_image.shape
+        grid = generate_tiles_grid(height, width, tile_length)
+        metadata = get_tiles_metadata(self.satellite_image.transform, grid)
+
+        images = get_tiles_batch(
+            self.satellite_image._get_array(), grid, tile_length, bands_indices, dtype
+        )
+        if self.label.ndim == 2:
+            labels = get_tiles_batch(self.label[np.newaxis], grid, tile_length)[:, 0]
+        else:
+            labels = get_tiles_batch(self.label, grid, tile_length)
+
+        return images, labels, metadata
+
+    def reproject(
+        self,
+        crs: str,
+        resolution: Optional[Union[float, Tuple[float, float]]] = None,
+        resampling: str = "bilinear",
+        num_threads: Optional[str] = "ALL_CPUS",
+    ) -> SegmentationLabeledSatelliteImage:
+        """
+        Reproject the SegmentationLabeledSatelliteImage to another CRS
+        and/or resolution. Class IDs are resampled with the nearest
+        neighbour and logits with `resampling`, on the same grid as the
+        satellite image.
+
+        Args:
+            crs (str): Target Coordinate Reference System.
+            resolution (Optional[Union[float, Tuple[float, float]]]): Target
+                pixel size, or (x, y) pixel sizes.
+            resampling (str): Resampling method of the satellite image, see
+                `SatelliteImage.reproject`. Defaults to "bilinear".
+            num_threads (Optional[str]): Number of warping threads, or
+                "ALL_CPUS". Defaults to "ALL_CPUS".
+
+        Returns:
+            SegmentationLabeledSatelliteImage: Reprojected labeled image.
+        """
+        satellite_image = self.satellite_image.reproject(
+            crs, resolution, resampling, num_threads
+        )
+
+        label = self.label if self.label.ndim == 3 else self.label[np.newaxis]
+        # Float16 logits are warped as float32, which GDAL supports
+        label_image = SatelliteImage(
+            label.astype(np.float32) if label.dtype == np.float16 else label,
+            self.satellite_image.crs,
+            None,
+            self.satellite_image.transform,
+        )
+        label = label_image.reproject(
+            crs, resolution, resampling if self.logits else "near", num_threads
+        ).array.astype(self.label.dtype, copy=False)
+        if self.label.ndim == 2:
+            label = label[0]
+
+        return SegmentationLabeledSatelliteImage(
+            satellite_image,
+            label,
+            self.source,
+            self.labeling_date,
+            self.logits,
+            self.logits_scale,
+            self.logits_offset,
+        )
+
+    def polygonize(
+        self, connectivity: Literal[4, 8] = 4, background: int = 0
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Polygonize the label: each connected region of pixels of the same
+        class becomes a polygon, in the CRS of the satellite image.
+        Logits are converted to class IDs with an argmax.
+
+        Args:
+            connectivity (Literal[4, 8]): Pixel connectivity of regions.
+                Defaults to 4.
+            background (int): Class ID which is not polygonized.
+                Defaults to 0.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (M,) array of polygons and (M,)
+                array of their class IDs.
+        """
+        label = self.class_ids
+        # Data types supported by rasterio.features.shapes
+        if label.dtype not in [np.uint8, np.uint16, np.int16, np.int32]:
+            label = label.astype(np.int32)
+
+        polygons, classes = [], []
+        for geometry, value in rasterio.features.shapes(
+            label,
+            mask=label != background,
+            connectivity=connectivity,
+            transform=Affine(*self.satellite_image.transform[:6]),
+        ):
+            polygons.append(shapely.geometry.shape(geometry))
+            classes.append(value)
+        return (
+            np.array(polygons, dtype=object),
+            np.array(classes, dtype=np.int64),
+        )
+
     def plot(
         self,
         bands_indices: List[int],
@@ -122,14 +560,14 @@ class SegmentationLabeledSatelliteImage:
 
         # If class_labels is not provided, assume binary classification (two classes)
         if class_labels is None:
-            ax.imshow(self.label, alpha=alpha)
+            ax.imshow(self.class_ids, alpha=alpha)
         else:
             # Handle label overlay for multi-class case
             cmap = mpl.colors.ListedColormap(color_palette)
             # Handle multi-class case with legend
             # Create the color-mapped label for multi-class
             color_mapped_label = cmap(
-                self.label
+                self.class_ids
             )  # Converts class indices to RGBA values
             ax.imshow(color_mapped_label, alpha=alpha)  # Overlay the color-mapped mask
 
@@ -177,8 +615,8 @@ class SegmentationLabeledSatelliteImage:
 
         # If class_labels is not provided, assume binary classification (two classes)
         if class_labels is None:
-            label = np.zeros((*self.label.shape, 3))
-            label[self.label == 1, :] = [255, 255, 255]
+            label = np.zeros((*self.class_ids.shape, 3))
+            label[self.class_ids == 1, :] = [255, 255, 255]
             label = label.astype(np.uint8)
             ax2.imshow(label)
         else:
@@ -187,7 +625,7 @@ class SegmentationLabeledSatelliteImage:
             # Handle multi-class case with legend
             # Create the color-mapped label for multi-class
             color_mapped_label = cmap(
-                self.label
+                self.class_ids
             )  # Converts class indices to RGBA values
 
             ax2.imshow(color_mapped_label)  # Overlay the color-mapped mask
@@ -210,43 +648,75 @@ class SegmentationLabeledSatelliteImage:
         return plt.gcf()
 
     def to_classification_labeled_image(
-        self, aggregation_method: str = "any"
+        self,
+        aggregation_method: Literal["any", "majority", "weighted", "threshold"] = "any",
+        **kwargs,
     ) -> ClassificationLabeledSatelliteImage:
         """
         Return a ClassificationLabeledSatelliteImage.
 
         Args:
             aggregation_method (str): Method to aggregate pixel labels to a single class.
-                Options: 'any' (default), 'majority', 'weighted'.
+                Options: 'any' (default), 'majority', 'weighted', 'threshold'.
+            **kwargs: Options of `compute_classification_labels`.
 
         Returns:
             ClassificationLabeledSatelliteImage: Image with a single class label.
         """
-        if aggregation_method == "any":
-            classification_label = int(np.any(self.label > 0))
-        elif aggregation_method == "majority":
-            unique, counts = np.unique(self.label, return_counts=True)
-            classification_label = unique[np.argmax(counts)]
-        elif aggregation_method == "weighted":
-            unique, counts = np.unique(self.label, return_counts=True)
-            total_pixels = self.label.size
-            weights = counts / total_pixels
-            classification_label = unique[np.argmax(weights)]
-        else:
-            raise ValueError("Invalid aggregation method.")
+        classification_labels, _ = compute_classification_labels(
+            [self], aggregation_method, **kwargs
+        )
 
         return ClassificationLabeledSatelliteImage(
             satellite_image=self.satellite_image,
-            label=classification_label,
+            label=int(classification_labels[0]),
             source=self.source,
             labeling_date=self.labeling_date,
         )
 
+    @staticmethod
+    def to_classification_labeled_images(
+        labeled_images: List[SegmentationLabeledSatelliteImage],
+        aggregation_method: Literal["any", "majority", "weighted", "threshold"] = "any",
+        **kwargs,
+    ) -> Tuple[List[ClassificationLabeledSatelliteImage], np.ndarray]:
+        """
+        Convert many SegmentationLabeledSatelliteImage at once, with
+        class histograms computed for all tiles in a vectorized pass.
+
+        Args:
+            labeled_images (List[SegmentationLabeledSatelliteImage]):
+                Labeled images.
+            aggregation_method (str): Method to aggregate pixel labels to a single class.
+                Options: 'any' (default), 'majority', 'weighted', 'threshold'.
+            **kwargs: Options of `compute_classification_labels`.
+
+        Returns:
+            Tuple[List[ClassificationLabeledSatelliteImage], np.ndarray]:
+                Images with a single class label and (N, K) class histograms
+                of the images.
+        """
+        classification_labels, histograms = compute_classification_labels(
+            labeled_images, aggregation_method, **kwargs
+        )
+        classification_images = [
+            ClassificationLabeledSatelliteImage(
+                satellite_image=labeled_image.satellite_image,
+                label=label,
+                source=labeled_image.source,
+                labeling_date=labeled_image.labeling_date,
+            )
+            for labeled_image, label in zip(
+                labeled_images, classification_labels.tolist()
+            )
+        ]
+        return classification_images, histograms
+
 
 class DetectionLabeledSatelliteImage:
     """
     Class for satellite images with an object detection label.
-    The segmentation label is a List of box coordinates indicating
+    The detection label is an (M, 4) array of box coordinates indicating
     the coordinates of buildings on the image.
     TODO: generalize to n classes ?
     """
@@ -254,7 +724,7 @@ class DetectionLabeledSatelliteImage:
     def __init__(
         self,
         satellite_image: SatelliteImage,
-        label: List[Tuple[int]],
+        label: Union[np.ndarray, List[Tuple[int]]],
         source: Optional[Literal["RIL", "BDTOPO"]] = None,
         labeling_date: Optional[datetime] = None,
     ):
@@ -263,36 +733,123 @@ class DetectionLabeledSatelliteImage:
 
         Args:
             satellite_image (SatelliteImage): Satellite image.
-            label (List[Tuple[int]]): Object detection label
-                with format (x0, y0, x1, y1).
+            label (Union[np.ndarray, List[Tuple[int]]]): Object detection
+                label, as an (M, 4) array or a list of boxes, with format
+                (x0, y0, x1, y1) in pixel coordinates, x being the column
+                and y the row. Stored as an (M, 4) array.
             source (Optional[Literal["RIL", "BDTOPO"]]): Labeling source.
             labeling_date (Optional[datetime]): Date of labeling data.
         """
-        _, width, height = satellite_image.array.shape
-        for bounding_box in label:
-            x0, y0, x1, y1 = bounding_box
-            if (max(x0, x1) >= width) | (max(y0, y1) >= height):
-                raise ValueError(
-                    f"Bounding box {bounding_box} is not" f"contained in image."
-                )
+        label = np.asarray(label)
+        if label.size == 0:
+            label = np.empty((0, 4), dtype=np.int64)
+        if label.ndim != 2 or label.shape[1] != 4:
+            raise ValueError(
+                f"Label must be an (M, 4) array of boxes, not of shape {label.shape}."
+            )
+
+        _, height, width = satellite_image.shape
+        outside = (np.maximum(label[:, 0], label[:, 2]) >= width) | (
+            np.maximum(label[:, 1], label[:, 3]) >= height
+        )
+        if np.any(outside):
+            bounding_box = tuple(label[np.argmax(outside)].tolist())
+            raise ValueError(f"Bounding box {bounding_box} is not contained in image.")
 
         self.satellite_image = satellite_image
         self.label = label
         self.source = source
         self.labeling_date = labeling_date
 
-    def split(self, nfolds: int) -> List[DetectionLabeledSatelliteImage]:
+    def split(
+        self,
+        tile_length: int,
+        stride: Optional[int] = None,
+        min_visible_ratio: float = 0.0,
+    ) -> List[DetectionLabeledSatelliteImage]:
         """
         Split the DetectionLabeledSatelliteImage into labeled
-        tiles of dimension (`tile_length` x `tile_length`).
+        tiles of dimension (`tile_length` x `tile_length`). Boxes are
+        assigned to the tiles they overlap, clipped to the tile and
+        translated to its pixel coordinates, for all boxes at once.
 
         Args:
             tile_length (int): Dimension of tiles
+            stride (Optional[int]): Distance between consecutive tiles,
+                smaller than `tile_length` for overlapping tiles. Defaults
+                to `tile_length`.
+            min_visible_ratio (float): Minimum ratio of the area of a box
+                which must lie in a tile for the box to be kept in the tile.
+                Defaults to 0 (any overlap).
 
         Returns:
             List[DetectionLabeledSatelliteImage]: Labeled tiles.
         """
-        raise NotImplementedError()
+        height = self.satellite_image.shape[1]
+        width = self.satellite_image.shape[2]
+        grid = generate_tiles_grid(height, width, tile_length, stride)
+
+        tiles = self.satellite_image.split_on_grid(grid)
+
+        boxes = np.asarray(self.label).reshape(-1, 4)
+        tile_indices, _, clipped_boxes = assign_boxes_to_tiles(
+            boxes, grid, min_visible_ratio
+        )
+        # Boxes are sorted by tile, cut them at tile boundaries
+        boundaries = np.searchsorted(tile_indices, np.arange(1, len(grid)))
+        tile_boxes = np.split(clipped_boxes, boundaries)
+
+        return [
+            DetectionLabeledSatelliteImage(
+                image, label, self.source, self.labeling_date
+            )
+            for image, label in zip(tiles, tile_boxes)
+        ]
+
+    def get_world_boxes(self) -> np.ndarray:
+        """
+        Return the boxes of the label in the CRS of the satellite image.
+
+        Returns:
+            np.ndarray: An (M, 4) array of (left, bottom, right, top) boxes.
+        """
+        return boxes_pixel_to_world(self.label, self.satellite_image.transform)
+
+    @staticmethod
+    def from_world_boxes(
+        satellite_image: SatelliteImage,
+        boxes: np.ndarray,
+        source: Optional[Literal["RIL", "BDTOPO"]] = None,
+        labeling_date: Optional[datetime] = None,
+    ) -> DetectionLabeledSatelliteImage:
+        """
+        Factory method to create a DetectionLabeledSatelliteImage from
+        boxes given in the CRS of the satellite image.
+
+        Args:
+            satellite_image (SatelliteImage): Satellite image.
+            boxes (np.ndarray): An (M, 4) array of (left, bottom, right,
+                top) boxes.
+            source (Optional[Literal["RIL", "BDTOPO"]]): Labeling source.
+            labeling_date (Optional[datetime]): Date of labeling data.
+
+        Returns:
+            DetectionLabeledSatelliteImage: Labeled image.
+        """
+        label = boxes_world_to_pixel(boxes, satellite_image.transform)
+        return DetectionLabeledSatelliteImage(
+            satellite_image, label, source, labeling_date
+        )
+
+    def label_to_tensor(self) -> torch.Tensor:
+        """
+        Return the boxes of the label as an (M, 4) torch.Tensor sharing
+        memory with the label array.
+
+        Returns:
+            torch.Tensor: Tensor of boxes.
+        """
+        return torch.from_numpy(self.label)
 
     def plot(self, bands_indices: List[int]):
         """
@@ -327,7 +884,7 @@ class DetectionLabeledSatelliteImage:
         """
         Return a ClassificationLabeledSatelliteImage.
         """
-        if self.label:
+        if len(self.label) > 0:
             classification_label = 1
         else:
             classification_label = 0
@@ -403,3 +960,61 @@ class ClassificationLabeledSatelliteImage:
         plt.yticks([])
 
         return plt.gcf()
+
+
+def compute_classification_labels(
+    labels: Union[np.ndarray, List[SegmentationLabeledSatelliteImage]],
+    aggregation_method: Literal["any", "majority", "weighted", "threshold"] = "any",
+    threshold: float = 0.5,
+    class_weights: Optional[np.ndarray] = None,
+    n_classes: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute classification labels of many segmentation labels from their
+    per-tile class histograms, computed in a vectorized pass.
+
+    Aggregation methods are:
+        - 'any': 1 if any pixel belongs to a class other than 0.
+        - 'majority': most frequent class.
+        - 'weighted': class with the largest count weighted by
+          `class_weights`, the most frequent class without weights.
+        - 'threshold': 1 if the fraction of pixels of classes other than
+          0 is at least `threshold`.
+
+    Args:
+        labels (Union[np.ndarray, List[SegmentationLabeledSatelliteImage]]):
+            An (N, H, W) array of class IDs, or segmentation labeled
+            images. Logits are converted to class IDs with an argmax.
+        aggregation_method (str): Aggregation method. Defaults to 'any'.
+        threshold (float): Minimum fraction of non-background pixels for
+            the 'threshold' method. Defaults to 0.5.
+        class_weights (Optional[np.ndarray]): (K,) weights of classes for
+            the 'weighted' method. Defaults to None.
+        n_classes (Optional[int]): Number of classes. Defaults to the
+            maximum class ID + 1.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (N,) classification labels and
+            (N, K) class histograms, which can be reused e.g. for
+            class-balanced sampling.
+    """
+    if not isinstance(labels, np.ndarray):
+        labels = [labeled_image.class_ids for labeled_image in labels]
+    histograms = compute_class_histograms(labels, n_classes)
+
+    if aggregation_method == "any":
+        classification_labels = (histograms[:, 1:].sum(axis=1) > 0).astype(np.int64)
+    elif aggregation_method == "majority":
+        classification_labels = np.argmax(histograms, axis=1)
+    elif aggregation_method == "weighted":
+        weights = np.ones(histograms.shape[1])
+        if class_weights is not None:
+            weights[: len(class_weights)] = class_weights
+        classification_labels = np.argmax(histograms * weights, axis=1)
+    elif aggregation_method == "threshold":
+        fractions = histograms[:, 1:].sum(axis=1) / histograms.sum(axis=1)
+        classification_labels = (fractions >= threshold).astype(np.int64)
+    else:
+        raise ValueError("Invalid aggregation method.")
+
+    return classification_labels, histograms
@@ -0,0 +1,258 @@
+"""
+Windowed access to raster files.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+from affine import Affine
+from osgeo import gdal, gdal_array
+from pyproj.crs import CRS
+
+
+class RasterReader:
+    """
+    Wrapper around a GDAL dataset handle which reads pixel windows
+    on demand instead of loading the whole raster in memory.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        bands_indices: Optional[List[int]] = None,
+        channels_first: bool = True,
+        cast_to_float: bool = False,
+        dtype: np.dtype = np.float32,
+        overview_level: Optional[int] = None,
+    ):
+        """
+        Constructor.
+
+        Args:
+            file_path (str): File path.
+            bands_indices (Optional[List[int]]): Indices of bands to read,
+                between 0 and the number of bands - 1. Defaults to all bands.
+            channels_first (bool): True if channels should be moved
+                to first axis.
+            cast_to_float (bool): True to cast integer arrays to float,
+                scaled to [0, 1] according to the bit depth of the source.
+            dtype (np.dtype): Float data type used when `cast_to_float`
+                is True. Defaults to np.float32.
+            overview_level (Optional[int]): Index of the overview to read
+                instead of the full resolution raster, 0 being the finest
+                overview. Sizes, transform and bounds are then those of the
+                overview. Defaults to None (full resolution).
+        """
+        self.file_path = file_path
+        self._bands_indices = bands_indices
+        self.channels_first = channels_first
+        self.cast_to_float = cast_to_float
+        self.dtype = dtype
+        self.overview_level = overview_level
+        self._dataset = None
+        # GDAL dataset handles must not be used concurrently
+        self._lock = threading.Lock()
+
+    @property
+    def dataset(self) -> gdal.Dataset:
+        """
+        GDAL dataset handle, opened on first access.
+
+        Returns:
+            gdal.Dataset: Dataset handle.
+        """
+        if self._dataset is None:
+            if self.overview_level is None:
+                self._dataset = gdal.Open(self.file_path)
+            else:
+                self._dataset = gdal.OpenEx(
+                    self.file_path,
+                    gdal.OF_RASTER,
+                    open_options=[f"OVERVIEW_LEVEL={self.overview_level}"],
+                )
+            if self._dataset is None:
+                raise ValueError(f"Unable to open raster file {self.file_path}.")
+        return self._dataset
+
+    @property
+    def height(self) -> int:
+        """
+        Number of rows of the raster.
+        """
+        return self.dataset.RasterYSize
+
+    @property
+    def width(self) -> int:
+        """
+        Number of columns of the raster.
+        """
+        return self.dataset.RasterXSize
+
+    @property
+    def bands_indices(self) -> List[int]:
+        """
+        Indices of the bands read from the raster.
+        """
+        if self._bands_indices is None:
+            return list(range(self.dataset.RasterCount))
+        return self._bands_indices
+
+    @property
+    def count(self) -> int:
+        """
+        Number of bands read from the raster.
+        """
+        return len(self.bands_indices)
+
+    @staticmethod
+    def get_overview_level(file_path: str, resolution: float) -> Optional[int]:
+        """
+        Return the index of the coarsest overview of a raster with a pixel
+        size not larger than `resolution`, or None if no overview is
+        coarse enough to be read instead of the full resolution raster.
+
+        Args:
+            file_path (str): File path.
+            resolution (float): Requested pixel size.
+
+        Returns:
+            Optional[int]: Index of the overview.
+        """
+        dataset = gdal.Open(file_path)
+        if dataset is None:
+            raise ValueError(f"Unable to open raster file {file_path}.")
+        pixel_size = abs(dataset.GetGeoTransform()[1])
+        band = dataset.GetRasterBand(1)
+
+        overview_level = None
+        for idx in range(band.GetOverviewCount()):
+            factor = dataset.RasterXSize / band.GetOverview(idx).XSize
+            # Tolerance for rounding of overview sizes
+            if pixel_size * factor <= resolution * (1 + 1e-3):
+                overview_level = idx
+        return overview_level
+
+    def get_scale(self) -> float:
+        """
+        Return the maximum value of the source pixels according to their
+        bit depth, given by the NBITS metadata (e.g. 12 for Pléiades
+        products stored on 16 bits) or by the data type.
+
+        Returns:
+            float: Maximum value of the source pixels.
+        """
+        band = self.dataset.GetRasterBand(self.bands_indices[0] + 1)
+        n_bits = band.GetMetadataItem("NBITS", "IMAGE_STRUCTURE")
+        if n_bits is None:
+            data_type = gdal_array.GDALTypeCodeToNumericTypeCode(band.DataType)
+            n_bits = np.iinfo(data_type).bits
+        return float(2 ** int(n_bits) - 1)
+
+    def get_block_size(self) -> Tuple[int, int]:
+        """
+        Return the natural block size of the raster, as (height, width).
+
+        Returns:
+            Tuple[int, int]: Block size.
+        """
+        block_width, block_height = self.dataset.GetRasterBand(1).GetBlockSize()
+        return block_height, block_width
+
+    def get_crs(self) -> str:
+        """
+        Return the Coordinate Reference System of the raster.
+
+        Returns:
+            str: EPSG code of the raster.
+        """
+        spatial_ref = self.dataset.GetSpatialRef()
+        crs = CRS.from_wkt(spatial_ref.ExportToWkt())
+        return f"EPSG:{crs.to_epsg()}"
+
+    def get_transform(self) -> Affine:
+        """
+        Return the affine transform of the raster.
+
+        Returns:
+            Affine: Transform of the raster.
+        """
+        return Affine.from_gdal(*self.dataset.GetGeoTransform())
+
+    def get_bounds(self) -> Tuple:
+        """
+        Return the bounds (left, bottom, right, top) of the raster.
+
+        Returns:
+            Tuple: Bounds of the raster.
+        """
+        transform = self.dataset.GetGeoTransform()
+        return (
+            transform[0],  # left
+            transform[3] + transform[5] * self.height,  # bottom
+            transform[0] + transform[1] * self.width,  # right
+            transform[3],  # top
+        )
+
+    def read(
+        self,
+        window: Optional[Tuple[int, int, int, int]] = None,
+    ) -> np.array:
+        """
+        Read a pixel window from the raster.
+
+        Args:
+            window (Optional[Tuple[int, int, int, int]]): Window to read,
+                given as (row_off, col_off, height, width). Defaults to
+                the full raster.
+
+        Returns:
+            np.array: Window array, in (C, H, W) format unless
+                `channels_first` is False.
+        """
+        if window is None:
+            window = (0, 0, self.height, self.width)
+        row_off, col_off, height, width = window
+
+        with self._lock:
+            bands = [self.dataset.GetRasterBand(idx + 1) for idx in self.bands_indices]
+            dtype = gdal_array.GDALTypeCodeToNumericTypeCode(bands[0].DataType)
+            scale = None
+            if self.cast_to_float:
+                if np.issubdtype(dtype, np.integer):
+                    scale = self.get_scale()
+                dtype = self.dtype
+
+            # Bands are read straight into the output array, GDAL
+            # converting pixels to its data type
+            array = np.empty((len(bands), height, width), dtype=dtype)
+            for idx, band in enumerate(bands):
+                band.ReadAsArray(col_off, row_off, width, height, buf_obj=array[idx])
+
+        if scale is not None:
+            array /= scale
+
+        if not self.channels_first:
+            array = np.transpose(array, [1, 2, 0])
+
+        return array
+
+    def close(self) -> None:
+        """
+        Release the GDAL dataset handle. It is reopened on next read.
+        """
+        with self._lock:
+            self._dataset = None
+
+    def __getstate__(self):
+        # Dataset handles cannot be pickled, they are reopened lazily
+        state = self.__dict__.copy()
+        state["_dataset"] = None
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
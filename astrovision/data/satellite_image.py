@@ -5,93 +5,411 @@ Satellite image class.
 from __future__ import annotations
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
-from typing import List, Literal, Optional, Tuple
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from affine import Affine
 from pathlib import Path
 import matplotlib.pyplot as plt
 import numpy as np
 import rasterio
-import rasterio.plot as rp
 import torch
-from osgeo import gdal
-import pyproj
-from pyproj.crs import CRS
+from osgeo import gdal, gdal_array, osr
 from shapely.geometry import box, Polygon, Point
 from shapely.ops import transform
 
 from .constants import DEPARTMENTS_LIST
+from .raster_reader import RasterReader
 from .utils import (
-    generate_tiles_borders,
+    compute_band_histograms,
+    generate_tiles_grid,
     get_bounds_for_tile,
+    get_tiles_batch,
+    get_tiles_metadata,
     get_transform_for_tile,
+    get_transformer,
+    get_transforms_for_tiles,
+    quantiles_from_histograms,
 )
 
+if TYPE_CHECKING:
+    from .statistics import RadiometricStatistics
+
 
 class SatelliteImage:
     """
     Wrapper class for a satellite image.
     """
 
+    __slots__ = (
+        "_array",
+        "crs",
+        "_bounds",
+        "transform",
+        "dep",
+        "date",
+        "reader",
+        "window",
+        "_band_statistics",
+    )
+
     def __init__(
         self,
-        array: np.array,
+        array: Optional[np.array],
         crs: str,
-        bounds: Tuple,
+        bounds: Optional[Tuple],
         transform: Affine,
         dep: Optional[Literal[DEPARTMENTS_LIST]] = None,
         date: Optional[date] = None,
+        reader: Optional[RasterReader] = None,
+        window: Optional[Tuple[int, int, int, int]] = None,
     ):
         """
         Constructor.
 
         Args:
-            array (np.array): Image array. Assumes (C, H, W) format.
+            array (Optional[np.array]): Image array. Assumes (C, H, W) format.
+                Can be None for a lazy image backed by a `reader`.
             crs (str): Coordinate Reference System.
-            bounds (Tuple): Bounds for the satellite image.
+            bounds (Optional[Tuple]): Bounds for the satellite image. Can be
+                None to derive bounds from the transform and the shape.
             transform (Affine): Transform for the satellite image.
             dep (Optional[Literal[DEPARTMENTS_LIST]]): French département
                 of the image. Defaults to None.
             date (Optional[date]): Date of the satellite image. Defaults
                 to None.
+            reader (Optional[RasterReader]): Reader used to load pixels
+                on demand when `array` is None. Defaults to None.
+            window (Optional[Tuple[int, int, int, int]]): Window of the
+                image in the raster of `reader`, given as (row_off, col_off,
+                height, width). Defaults to the full raster.
         """
-        self.array = array
+        if array is None and reader is None:
+            raise ValueError("Either `array` or `reader` must be provided.")
+        if reader is not None and window is None:
+            window = (0, 0, reader.height, reader.width)
+
+        self._array = array
         self.crs = crs
-        self.bounds = bounds
+        self._bounds = bounds
         self.transform = transform
         self.dep = dep
         self.date = date
+        self.reader = reader
+        self.window = window
+        # Per-band statistics of the array, computed on demand
+        self._band_statistics = {}
 
-    def split(self, tile_length: int) -> List[SatelliteImage]:
+    @property
+    def array(self) -> np.array:
+        """
+        Image array. For a lazy image, the pixels of the image window
+        are read from the raster on first access. The returned array may
+        be modified in place, so cached band statistics are dropped, and
+        a read-only array shared with copies of the image is duplicated
+        on first access.
+
+        Returns:
+            np.array: Image array.
+        """
+        self._band_statistics = {}
+        array = self._get_array()
+        if not array.flags.writeable:
+            # Copy on write of an array shared by `copy`
+            array = self._array = array.copy()
+        return array
+
+    @array.setter
+    def array(self, array: np.array):
+        self._array = array
+        self._band_statistics = {}
+
+    def _get_array(self) -> np.array:
+        """
+        Return the image array for reading only.
+
+        Returns:
+            np.array: Image array, which must not be modified.
+        """
+        if self._array is None:
+            self._array = self.reader.read(self.window)
+        return self._array
+
+    @property
+    def bounds(self) -> Tuple:
+        """
+        Bounds (left, bottom, right, top) of the image, derived from the
+        transform and the shape unless given to the constructor.
+
+        Returns:
+            Tuple: Bounds of the image.
+        """
+        if self._bounds is not None:
+            return self._bounds
+        if self.window is not None:
+            _, _, height, width = self.window
+        else:
+            _, height, width = self._array.shape
+        return get_bounds_for_tile(self.transform, (0, height), (0, width))
+
+    @bounds.setter
+    def bounds(self, bounds: Optional[Tuple]):
+        self._bounds = bounds
+
+    @property
+    def is_loaded(self) -> bool:
+        """
+        Return True if the pixels of the image are in memory.
+
+        Returns:
+            bool: Boolean.
+        """
+        return self._array is not None
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        """
+        Shape of the image array, available without reading pixels.
+
+        Returns:
+            Tuple[int, int, int]: Shape of the image array.
+        """
+        if self._array is not None:
+            return self._array.shape
+        _, _, height, width = self.window
+        if self.reader.channels_first:
+            return (self.reader.count, height, width)
+        return (height, width, self.reader.count)
+
+    def crop(self, row_indices: Tuple, col_indices: Tuple) -> SatelliteImage:
+        """
+        Crop the SatelliteImage. For a lazy image, no pixel is read:
+        the cropped image only references a smaller window.
+
+        Args:
+            row_indices (Tuple): Minimum and maximum row indices of the crop.
+            col_indices (Tuple): Minimum and maximum column indices of the crop.
+
+        Returns:
+            SatelliteImage: Cropped image.
+        """
+        return self._crop(
+            row_indices,
+            col_indices,
+            get_transform_for_tile(self.transform, row_indices[0], col_indices[0]),
+        )
+
+    def _crop(
+        self,
+        row_indices: Tuple,
+        col_indices: Tuple,
+        transform: Affine,
+    ) -> SatelliteImage:
+        """
+        Crop the SatelliteImage given a precomputed transform.
+
+        Args:
+            row_indices (Tuple): Minimum and maximum row indices of the crop.
+            col_indices (Tuple): Minimum and maximum column indices of the crop.
+            transform (Affine): Transform of the crop.
+
+        Returns:
+            SatelliteImage: Cropped image.
+        """
+        row_min, row_max = row_indices
+        col_min, col_max = col_indices
+
+        if self._array is not None:
+            array = self.array[:, row_min:row_max, col_min:col_max]
+            window = None
+        else:
+            array = None
+            row_off, col_off, _, _ = self.window
+            window = (
+                row_off + row_min,
+                col_off + col_min,
+                row_max - row_min,
+                col_max - col_min,
+            )
+
+        return SatelliteImage(
+            array=array,
+            crs=self.crs,
+            bounds=None,
+            transform=transform,
+            dep=self.dep,
+            date=self.date,
+            reader=self.reader if array is None else None,
+            window=window,
+        )
+
+    def split(
+        self, tile_length: int, stride: Optional[int] = None
+    ) -> List[SatelliteImage]:
         """
         Split the SatelliteImage into square tiles of side `tile_length`.
+        Tiles of a lazy image are lazy as well.
 
         Args:
             tile_length (int): Side of of tiles.
+            stride (Optional[int]): Distance between consecutive tiles,
+                smaller than `tile_length` for overlapping tiles. Defaults
+                to `tile_length`.
 
         Returns:
             List[SatelliteImage]: List of tiles.
         """
-        height = self.array.shape[1]
-        width = self.array.shape[2]
+        height = self.shape[1]
+        width = self.shape[2]
 
-        indices = generate_tiles_borders(height, width, tile_length)
+        grid = generate_tiles_grid(height, width, tile_length, stride)
+
+        return self.split_on_grid(grid)
+
+    def split_on_grid(self, grid: np.ndarray) -> List[SatelliteImage]:
+        """
+        Split the SatelliteImage according to a tile grid.
+
+        Args:
+            grid (np.ndarray): An (N, 4) array of tile border indices
+                (row_min, row_max, col_min, col_max), as returned by
+                `generate_tiles_grid`.
+
+        Returns:
+            List[SatelliteImage]: List of tiles.
+        """
+        transforms = get_transforms_for_tiles(self.transform, grid).tolist()
 
         tiles = [
-            SatelliteImage(
-                array=self.array[:, rows[0] : rows[1], cols[0] : cols[1]],  # noqa
-                crs=self.crs,
-                bounds=get_bounds_for_tile(self.transform, rows, cols),
-                transform=get_transform_for_tile(self.transform, rows[0], cols[0]),
-                dep=self.dep,
-                date=self.date,
+            self._crop(
+                (row_min, row_max),
+                (col_min, col_max),
+                Affine(*tile_transform),
             )
-            for rows, cols in indices
+            for (
+                row_min,
+                row_max,
+                col_min,
+                col_max,
+            ), tile_transform in zip(grid.tolist(), transforms)
         ]
 
         return tiles
 
+    def iter_tiles(self, tile_length: int) -> Iterator[SatelliteImage]:
+        """
+        Iterate over square tiles of side `tile_length`, in the order of
+        `split`. Tiles of a lazy image are read from the raster one at a
+        time, so that only one tile (or one strip of blocks, for rasters
+        with blocks wider than a tile) is in memory at once.
+
+        Args:
+            tile_length (int): Side of tiles.
+
+        Yields:
+            SatelliteImage: Tiles, with their pixels loaded.
+        """
+        height = self.shape[1]
+        width = self.shape[2]
+
+        grid = generate_tiles_grid(height, width, tile_length)
+
+        if self._array is not None:
+            yield from self.split_on_grid(grid)
+            return
+
+        _, block_width = self.reader.get_block_size()
+        if block_width <= tile_length or not self.reader.channels_first:
+            for row_min, row_max, col_min, col_max in grid.tolist():
+                tile = self.crop((row_min, row_max), (col_min, col_max))
+                tile.array = tile.reader.read(tile.window)
+                yield tile
+            return
+
+        # Blocks span several tiles: read each strip of rows once
+        row_off, col_off, _, _ = self.window
+        for row_min in np.unique(grid[:, 0]).tolist():
+            strip_grid = grid[grid[:, 0] == row_min]
+            strip = self.reader.read((row_off + row_min, col_off, tile_length, width))
+            for tile in self.split_on_grid(strip_grid):
+                _, tile_col_off, _, tile_width = tile.window
+                tile_col_off -= col_off
+                tile_array = strip[
+                    :, :, tile_col_off : tile_col_off + tile_width  # noqa: E203
+                ]
+                tile.array = np.ascontiguousarray(tile_array)
+                yield tile
+            del strip
+
+    def split_to_batch(
+        self,
+        tile_length: int,
+        bands_indices: Optional[List[int]] = None,
+        dtype: Optional[np.dtype] = None,
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Split the SatelliteImage into square tiles of side `tile_length`
+        stacked in a single contiguous (N, C, H, W) array, without creating
+        one SatelliteImage per tile. Tiles are in the order of `split`.
+
+        When `tile_length` divides the image dimensions, tiles are copied
+        from a strided view of the image array in a single pass.
+
+        Args:
+            tile_length (int): Side of tiles.
+            bands_indices (Optional[List[int]]): Indices of bands to keep.
+                Defaults to all bands.
+            dtype (Optional[np.dtype]): Data type of the batch. Defaults
+                to the data type of the image array.
+
+        Returns:
+            Tuple[np.ndarray, Dict[str, np.ndarray]]: Batch of tiles and
+                metadata table of the tiles, as returned by
+                `get_tiles_metadata`.
+        """
+        _, height, width = self.shape
+        grid = generate_tiles_grid(height, width, tile_length)
+        metadata = get_tiles_metadata(self.transform, grid)
+        batch = get_tiles_batch(
+            self._get_array(), grid, tile_length, bands_indices, dtype
+        )
+        return batch, metadata
+
+    def to_tensor_batch(
+        self,
+        tile_length: int,
+        bands_indices: Optional[List[int]] = None,
+        dtype: Optional[np.dtype] = None,
+    ) -> Tuple[torch.Tensor, Dict[str, np.ndarray]]:
+        """
+        Split the SatelliteImage into a (N, C, H, W) torch.Tensor of
+        square tiles of side `tile_length`. See `split_to_batch`.
+
+        Args:
+            tile_length (int): Side of tiles.
+            bands_indices (Optional[List[int]]): Indices of bands to keep.
+                Defaults to all bands.
+            dtype (Optional[np.dtype]): Data type of the batch. Defaults
+                to the data type of the image array.
+
+        Returns:
+            Tuple[torch.Tensor, Dict[str, np.ndarray]]: Tensor of tiles
+                and metadata table of the tiles.
+        """
+        batch, metadata = self.split_to_batch(tile_length, bands_indices, dtype)
+        return torch.from_numpy(batch), metadata
+
     def to_tensor(self, bands_indices: Optional[List[int]] = None) -> torch.Tensor:
         """
         Return SatelliteImage array as a torch.Tensor.
@@ -109,13 +427,79 @@ class SatelliteImage:
         else:
             return torch.from_numpy(self.array[bands_indices, :, :])
 
-    def normalize(self, quantile: float = 0.97) -> SatelliteImage:
+    def get_quantiles(self, quantile: float) -> np.ndarray:
+        """
+        Return per-band quantiles of the array. For 8 and 16-bit integer
+        arrays, quantiles are computed exactly from band histograms in
+        linear time instead of sorting bands. Results are cached on the
+        image until `array` is accessed or reassigned.
+
+        Args:
+            quantile (float): Quantile to compute, between 0 and 1.
+
+        Returns:
+            np.ndarray: A (C,) array of quantiles.
+        """
+        key = ("quantile", quantile)
+        if key not in self._band_statistics:
+            array = self._get_array()
+            if np.issubdtype(array.dtype, np.integer) and array.dtype.itemsize <= 2:
+                histograms, offset = compute_band_histograms(array)
+                nonzero_bins = histograms > 0
+                self._band_statistics["min"] = offset + np.argmax(nonzero_bins, axis=1)
+                self._band_statistics["max"] = (
+                    offset
+                    + histograms.shape[1]
+                    - 1
+                    - np.argmax(nonzero_bins[:, ::-1], axis=1)
+                )
+                quantiles = quantiles_from_histograms(histograms, quantile, offset)
+            else:
+                quantiles = np.quantile(
+                    array.reshape(array.shape[0], -1), quantile, axis=1
+                )
+            self._band_statistics[key] = quantiles
+        return self._band_statistics[key]
+
+    def _get_band_range(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return per-band minimum and maximum values of the array, cached
+        on the image until `array` is accessed or reassigned.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Minimum and maximum values.
+        """
+        if "min" not in self._band_statistics:
+            array = self._get_array()
+            array = array.reshape(array.shape[0], -1)
+            self._band_statistics["min"] = array.min(axis=1)
+            self._band_statistics["max"] = array.max(axis=1)
+        return self._band_statistics["min"], self._band_statistics["max"]
+
+    def normalize(
+        self,
+        quantile: float = 0.97,
+        dtype: np.dtype = np.float64,
+        inplace: bool = False,
+        statistics: Optional[RadiometricStatistics] = None,
+    ) -> SatelliteImage:
         """
         Normalize array values with min-max normalization after
         clipping at quantiles.
 
+        Integer arrays of at most 16 bits are normalized through a lookup
+        table built from the cached band quantiles, in a single pass.
+
         Args:
             quantile (float): Normalize an array.
+            dtype (np.dtype): Float data type of the normalized array.
+                Defaults to np.float64.
+            inplace (bool): True to normalize the array of the image in
+                place, which must then be a float array. Defaults to False.
+            statistics (Optional[RadiometricStatistics]): Statistics of a
+                whole dataset. If given, quantiles and ranges are taken from
+                these statistics instead of the image, so that all images
+                get the same stretch. Defaults to None.
 
         Returns:
             SatelliteImage: Normalized image.
@@ -125,21 +509,49 @@ class SatelliteImage:
                 "Value of the `quantile` parameter must be between 0.5 and 1."
             )
 
-        normalized_bands = [
-            rp.adjust_band(
-                np.clip(
-                    self.array[i, :, :],
-                    0,
-                    np.quantile(self.array[i, :, :], quantile),
-                )
-            )
-            for i in range(len(self.array))
-        ]
-        array = np.stack(normalized_bands)
+        array = self.array if inplace else self._get_array()
+        if inplace and not np.issubdtype(array.dtype, np.floating):
+            raise ValueError("In-place normalization requires a float array.")
+
+        if statistics is not None:
+            upper = statistics.quantile(quantile)
+            band_min, band_max = statistics.min, statistics.max
+        else:
+            upper = self.get_quantiles(quantile)
+            band_min, band_max = self._get_band_range()
+        # Range of each band after clipping at [0, upper]
+        low = np.minimum(np.maximum(band_min, 0), upper).astype(np.float64)
+        high = np.minimum(np.maximum(band_max, 0), upper).astype(np.float64)
+
+        normalized_array = array if inplace else np.empty(array.shape, dtype=dtype)
+        use_lookup_table = (
+            np.issubdtype(array.dtype, np.integer) and array.dtype.itemsize <= 2
+        )
+        if use_lookup_table:
+            info = np.iinfo(array.dtype)
+            values = np.arange(info.min, info.max + 1, dtype=np.float64)
+
+        for idx, band in enumerate(array):
+            if use_lookup_table:
+                lookup_table = (
+                    (np.clip(values, 0, upper[idx]) - low[idx]) / (high[idx] - low[idx])
+                ).astype(dtype)
+                indices = band if info.min == 0 else band.astype(np.int32) - info.min
+                np.take(lookup_table, indices, out=normalized_array[idx])
+            else:
+                normalized_band = normalized_array[idx]
+                np.clip(band, 0, upper[idx], out=normalized_band)
+                normalized_band -= low[idx]
+                normalized_band /= high[idx] - low[idx]
+
+        if inplace:
+            self._band_statistics = {}
+            return self
+
         return SatelliteImage(
-            array=array,
+            array=normalized_array,
             crs=self.crs,
-            bounds=self.bounds,
+            bounds=self._bounds,
             transform=self.transform,
             dep=self.dep,
             date=self.date,
@@ -147,19 +559,32 @@ class SatelliteImage:
 
     def copy(self) -> SatelliteImage:
         """
-        Deep copy a satellite image.
+        Copy a satellite image. Pixels are copied on write: both images
+        share a read-only array, which each image duplicates the first
+        time its `array` is accessed, while reads such as `normalize` or
+        `to_raster` do not duplicate pixels. Arrays obtained from `array`
+        before the copy become read-only, and views of them, e.g. arrays
+        of tiles from `split`, must not be modified anymore. The copy of
+        a lazy image which is not loaded yet shares the reader and does
+        not read pixels.
 
         Returns:
             SatelliteImage: Copied image.
         """
-        return SatelliteImage(
-            array=self.array.copy(),
+        if self._array is not None:
+            self._array.flags.writeable = False
+        image = SatelliteImage(
+            array=self._array,
             crs=self.crs,
-            bounds=self.bounds,
+            bounds=self._bounds,
             transform=self.transform,
             dep=self.dep,
             date=self.date,
+            reader=self.reader,
+            window=self.window,
         )
+        image._band_statistics = dict(self._band_statistics)
+        return image
 
     def plot(self, bands_indices: List[int]):
         """
@@ -171,7 +596,7 @@ class SatelliteImage:
                 number of bands - 1.
         """
         fig, ax = plt.subplots(figsize=(5, 5))
-        ax.imshow(np.transpose(self.array, (1, 2, 0))[:, :, bands_indices])
+        ax.imshow(np.transpose(self._get_array(), (1, 2, 0))[:, :, bands_indices])
         plt.xticks([])
         plt.yticks([])
         plt.show()
@@ -183,51 +608,81 @@ class SatelliteImage:
         file_path: str,
         dep: Optional[Literal[DEPARTMENTS_LIST]] = None,
         date: Optional[date] = None,
-        n_bands: int = 3,
+        n_bands: Optional[int] = None,
         channels_first: bool = True,
         cast_to_float: bool = False,
+        lazy: bool = False,
+        bands_indices: Optional[List[int]] = None,
+        dtype: np.dtype = np.float32,
+        overview_level: Optional[int] = None,
+        resolution: Optional[float] = None,
     ) -> SatelliteImage:
         """
         Factory method to create a Satellite image from a raster file.
+        Only the requested bands are read, and pixels keep the data type
+        of the raster unless `cast_to_float` is True.
 
         Args:
             file_path (str): File path.
             dep (Optional[Literal[DEPARTMENTS_LIST]]): Département.
             date (Optional[date]): Date. Defaults to None.
-            n_bands (int): Number of bands.
+            n_bands (Optional[int]): Number of bands to read, starting
+                from the first one. Defaults to all bands.
             channels_first (bool): True if channels should be moved
                 to first axis.
-            cast_to_float (bool): True to cast array to float.
+            cast_to_float (bool): True to cast integer arrays to float,
+                scaled to [0, 1] according to the bit depth of the source.
+            lazy (bool): True to only read metadata and keep the dataset
+                handle open, pixels being read when they are needed.
+            bands_indices (Optional[List[int]]): Indices of bands to read,
+                between 0 and the number of bands - 1. Takes precedence
+                over `n_bands`. Defaults to all bands.
+            dtype (np.dtype): Float data type used when `cast_to_float`
+                is True. Defaults to np.float32.
+            overview_level (Optional[int]): Index of the overview to read
+                instead of the full resolution raster, 0 being the finest
+                overview. Defaults to None (full resolution).
+            resolution (Optional[float]): Requested pixel size. The coarsest
+                overview with a pixel size not larger than `resolution` is
+                read. Takes precedence over `overview_level`. Defaults to
+                None (full resolution).
 
         Returns:
             SatelliteImage: Satellite image.
         """
-        ds = gdal.Open(file_path)
-        array = ds.ReadAsArray()
-        if not channels_first:
-            array = np.transpose(array, [1, 2, 0])
-
-        if cast_to_float:
-            if np.issubdtype(array.dtype, np.integer):
-                array = np.uint8(array)
-                array = array.astype(float) / 255.0
-
-        spatial_ref = ds.GetSpatialRef()
-        crs = CRS.from_wkt(spatial_ref.ExportToWkt())
-        crs_epsg = f"EPSG:{crs.to_epsg()}"
-
-        transform = ds.GetGeoTransform()
-        bounds = (
-            transform[0],  # left
-            transform[3] + transform[5] * ds.RasterYSize,  # bottom
-            transform[0] + transform[1] * ds.RasterXSize,  # right
-            transform[3],  # top
+        if bands_indices is None and n_bands is not None:
+            bands_indices = list(range(n_bands))
+        if resolution is not None:
+            overview_level = RasterReader.get_overview_level(file_path, resolution)
+
+        reader = RasterReader(
+            file_path,
+            bands_indices=bands_indices,
+            channels_first=channels_first,
+            cast_to_float=cast_to_float,
+            dtype=dtype,
+            overview_level=overview_level,
         )
-        transform = Affine.from_gdal(*transform)
+        crs = reader.get_crs()
+        bounds = reader.get_bounds()
+        transform = reader.get_transform()
+
+        if lazy:
+            return SatelliteImage(
+                None,
+                crs,
+                bounds,
+                transform,
+                dep,
+                date,
+                reader=reader,
+            )
 
+        array = reader.read()
+        reader.close()
         return SatelliteImage(
             array,
-            crs_epsg,
+            crs,
             bounds,
             transform,
             dep,
@@ -237,6 +692,7 @@ class SatelliteImage:
     def to_raster(
         self,
         file_path: str,
+        **kwargs,
     ) -> None:
         """
         Save a SatelliteImage to a raster file
@@ -244,12 +700,13 @@ class SatelliteImage:
 
         Args:
             file_path (str): File path.
+            **kwargs: Options passed to `to_raster_tif` for .tif files.
         """
         file_format = Path(file_path).suffix
         if file_format == ".jp2":
             self.to_raster_jp2(file_path)
         elif file_format == ".tif":
-            self.to_raster_tif(file_path)
+            self.to_raster_tif(file_path, **kwargs)
         else:
             raise ValueError(
                 f"File format is {file_format} must " f'be either ".jp2" or ".tif".'
@@ -262,7 +719,7 @@ class SatelliteImage:
         Args:
             file_path (str): File path.
         """
-        data = self.array
+        data = self._get_array()
         crs = self.crs
         transform = self.transform
         n_bands = len(data)
@@ -283,53 +740,196 @@ class SatelliteImage:
         }
 
         dirname = os.path.dirname(file_path)
-        if not os.path.exists(dirname):
-            os.makedirs(dirname)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname, exist_ok=True)
 
         # Use Gdal here to remove rasterio dependency
         with rasterio.open(file_path, "w", **metadata) as dst:
             dst.write(data, indexes=np.arange(n_bands) + 1)
 
-    def to_raster_tif(self, file_path: str) -> None:
+    def to_raster_tif(
+        self,
+        file_path: str,
+        compress: Optional[Literal["DEFLATE", "LZW", "ZSTD"]] = None,
+        predictor: Optional[int] = None,
+        tiled: bool = False,
+        block_size: int = 256,
+        cog: bool = False,
+        num_threads: Optional[str] = "ALL_CPUS",
+        overviews: Optional[List[int]] = None,
+        overview_resampling: Literal[
+            "NEAREST", "AVERAGE", "BILINEAR", "CUBIC", "MODE"
+        ] = "AVERAGE",
+    ) -> None:
         """
-        Save a SatelliteImage to a .tif raster file.
+        Save a SatelliteImage to a .tif raster file, keeping the data
+        type of the array.
 
         Args:
             file_path (str): File path.
+            compress (Optional[Literal["DEFLATE", "LZW", "ZSTD"]]):
+                Compression method. Defaults to None (no compression).
+            predictor (Optional[int]): Compression predictor, 2 for
+                horizontal differencing and 3 for floating point. Defaults
+                to 2 for integer arrays and 3 for float arrays when
+                `compress` is set.
+            tiled (bool): True to write an internally tiled GeoTIFF.
+            block_size (int): Side of internal tiles when `tiled` or `cog`
+                is True. Defaults to 256.
+            cog (bool): True to write a Cloud-Optimized GeoTIFF, internally
+                tiled and with overviews.
+            num_threads (Optional[str]): Number of threads used to compress
+                the file, or "ALL_CPUS". Defaults to "ALL_CPUS".
+            overviews (Optional[List[int]]): Decimation factors of internal
+                overviews to build, e.g. [2, 4, 8]. Cloud-Optimized GeoTIFFs
+                always get overviews down to the block size. Defaults to
+                None (no overviews).
+            overview_resampling (Literal["NEAREST", "AVERAGE", "BILINEAR",
+                "CUBIC", "MODE"]): Resampling method of overviews. Use
+                "NEAREST" or "MODE" for class IDs. Defaults to "AVERAGE".
         """
-        transform = self.transform
-        array = self.array
-        crs = self.crs
-
         dirname = os.path.dirname(file_path)
-        if not os.path.exists(dirname):
-            os.makedirs(dirname)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname, exist_ok=True)
+
+        options = []
+        if compress is not None:
+            if predictor is None:
+                dtype = self._get_array().dtype
+                predictor = 3 if np.issubdtype(dtype, np.floating) else 2
+            options += [f"COMPRESS={compress}", f"PREDICTOR={predictor}"]
+        if num_threads is not None:
+            options.append(f"NUM_THREADS={num_threads}")
+
+        if cog:
+            # The COG driver only supports copying an existing dataset
+            options = [
+                option.replace("PREDICTOR=2", "PREDICTOR=STANDARD").replace(
+                    "PREDICTOR=3", "PREDICTOR=FLOATING_POINT"
+                )
+                for option in options
+            ]
+            options += [
+                f"BLOCKSIZE={block_size}",
+                "OVERVIEWS=AUTO",
+                f"OVERVIEW_RESAMPLING={overview_resampling}",
+            ]
+            mem_ds = self._to_gdal_dataset("MEM", "")
+            gdal.GetDriverByName("COG").CreateCopy(file_path, mem_ds, options=options)
+            mem_ds = None
+            return
+
+        if tiled:
+            options += [
+                "TILED=YES",
+                f"BLOCKXSIZE={block_size}",
+                f"BLOCKYSIZE={block_size}",
+            ]
+        out_ds = self._to_gdal_dataset("GTiff", file_path, options)
+        if overviews:
+            out_ds.BuildOverviews(overview_resampling, overviews)
+        out_ds.FlushCache()
+        out_ds = None
+        return
+
+    def _to_gdal_dataset(
+        self,
+        driver_name: str,
+        file_path: str,
+        options: Optional[List[str]] = None,
+    ) -> gdal.Dataset:
+        """
+        Create a GDAL dataset with the array and georeferencing of the
+        SatelliteImage.
+
+        Args:
+            driver_name (str): GDAL driver name, e.g. "GTiff" or "MEM".
+            file_path (str): File path, empty for in-memory datasets.
+            options (Optional[List[str]]): Driver creation options.
+
+        Returns:
+            gdal.Dataset: GDAL dataset.
+        """
+        array = self._get_array()
+        data_type = gdal_array.NumericTypeCodeToGDALTypeCode(array.dtype)
+        if data_type is None:
+            raise ValueError(f"Data type {array.dtype} is not supported by GDAL.")
 
-        driver = gdal.GetDriverByName("GTiff")
+        driver = gdal.GetDriverByName(driver_name)
         out_ds = driver.Create(
             file_path,
             array.shape[2],
             array.shape[1],
             array.shape[0],
-            gdal.GDT_Float64,
+            data_type,
+            options=options or [],
         )
-        out_ds.SetGeoTransform(
-            [
-                transform[2],
-                transform[0],
-                transform[1],
-                transform[5],
-                transform[3],
-                transform[4],
-            ]
+        out_ds.SetGeoTransform(self.transform.to_gdal())
+        spatial_ref = osr.SpatialReference()
+        spatial_ref.SetFromUserInput(self.crs)
+        out_ds.SetProjection(spatial_ref.ExportToWkt())
+
+        out_ds.WriteArray(array)
+        return out_ds
+
+    def reproject(
+        self,
+        crs: str,
+        resolution: Optional[Union[float, Tuple[float, float]]] = None,
+        resampling: Literal[
+            "near", "bilinear", "cubic", "cubicspline", "lanczos", "average", "mode"
+        ] = "bilinear",
+        num_threads: Optional[str] = "ALL_CPUS",
+    ) -> SatelliteImage:
+        """
+        Reproject the SatelliteImage to another CRS and/or resolution with
+        a multithreaded GDAL warp between in-memory datasets. Pixels
+        outside of the footprint of the image are set to 0.
+
+        Args:
+            crs (str): Target Coordinate Reference System.
+            resolution (Optional[Union[float, Tuple[float, float]]]): Target
+                pixel size, or (x, y) pixel sizes, in units of `crs`.
+                Defaults to a resolution computed by GDAL from the source.
+            resampling (Literal["near", "bilinear", "cubic", "cubicspline",
+                "lanczos", "average", "mode"]): Resampling method. Use "near"
+                or "mode" for class IDs. Defaults to "bilinear".
+            num_threads (Optional[str]): Number of warping threads, or
+                "ALL_CPUS". Defaults to "ALL_CPUS".
+
+        Returns:
+            SatelliteImage: Reprojected image.
+        """
+        if resolution is not None and not isinstance(resolution, (tuple, list)):
+            resolution = (resolution, resolution)
+        x_res, y_res = resolution if resolution is not None else (None, None)
+
+        src_ds = self._to_gdal_dataset("MEM", "")
+        options = gdal.WarpOptions(
+            format="MEM",
+            dstSRS=crs,
+            xRes=x_res,
+            yRes=y_res,
+            resampleAlg=resampling,
+            multithread=num_threads is not None,
+            warpOptions=[f"NUM_THREADS={num_threads}"] if num_threads else None,
         )
-        out_ds.SetProjection(crs)
+        out_ds = gdal.Warp("", src_ds, options=options)
 
-        for j in range(array.shape[0]):
-            out_ds.GetRasterBand(j + 1).WriteArray(array[j, :, :])
+        array = out_ds.ReadAsArray()
+        if array.ndim == 2:
+            array = array[np.newaxis]
+        transform = Affine.from_gdal(*out_ds.GetGeoTransform())
+        src_ds, out_ds = None, None
 
-        out_ds = None
-        return
+        return SatelliteImage(
+            array=array,
+            crs=crs,
+            bounds=None,
+            transform=transform,
+            dep=self.dep,
+            date=self.date,
+        )
 
     def intersects_box(self, box_bounds: Tuple, crs: str) -> bool:
         """
@@ -346,12 +946,7 @@ class SatelliteImage:
         image_geometry = box(*self.bounds)
         bbox_geometry = box(*box_bounds)
         if crs != self.crs:
-            source_crs = pyproj.CRS(crs)
-            target_crs = pyproj.CRS(self.crs)
-            transformer = pyproj.Transformer.from_proj(
-                source_crs,
-                target_crs,
-            )
+            transformer = get_transformer(crs, self.crs)
             bbox_geometry = transform(transformer.transform, bbox_geometry)
         return image_geometry.intersects(bbox_geometry)
 
@@ -368,12 +963,7 @@ class SatelliteImage:
         """
         image_geometry = box(*self.bounds)
         if crs != self.crs:
-            source_crs = pyproj.Proj(self.crs)
-            target_crs = pyproj.Proj(crs)
-            transformer = pyproj.Transformer.from_proj(
-                source_crs,
-                target_crs,
-            )
+            transformer = get_transformer(self.crs, crs)
             image_geometry = transform(transformer.transform, image_geometry)
         return image_geometry.intersects(polygon_geometry)
 
@@ -390,11 +980,85 @@ class SatelliteImage:
         """
         point = Point(*coordinates)
         if crs != self.crs:
-            source_crs = pyproj.Proj(crs)
-            target_crs = pyproj.Proj(self.crs)
-            transformer = pyproj.Transformer.from_proj(
-                source_crs,
-                target_crs,
-            )
+            transformer = get_transformer(crs, self.crs)
             point = transform(transformer.transform, point)
         return point.within(box(*self.bounds))
+
+
+def iter_tiles(
+    file_path: str,
+    tile_length: int,
+    dep: Optional[Literal[DEPARTMENTS_LIST]] = None,
+    date: Optional[date] = None,
+    cast_to_float: bool = False,
+    bands_indices: Optional[List[int]] = None,
+) -> Iterator[SatelliteImage]:
+    """
+    Iterate over square tiles of side `tile_length` of a raster file,
+    reading each tile straight from disk.
+
+    Args:
+        file_path (str): File path.
+        tile_length (int): Side of tiles.
+        dep (Optional[Literal[DEPARTMENTS_LIST]]): Département.
+        date (Optional[date]): Date. Defaults to None.
+        cast_to_float (bool): True to cast arrays to float.
+        bands_indices (Optional[List[int]]): Indices of bands to read.
+            Defaults to all bands.
+
+    Yields:
+        SatelliteImage: Tiles, with their pixels loaded.
+    """
+    satellite_image = SatelliteImage.from_raster(
+        file_path,
+        dep=dep,
+        date=date,
+        cast_to_float=cast_to_float,
+        lazy=True,
+        bands_indices=bands_indices,
+    )
+    yield from satellite_image.iter_tiles(tile_length)
+
+
+def reproject_images(
+    satellite_images: Iterable[SatelliteImage],
+    crs: str,
+    resolution: Optional[Union[float, Tuple[float, float]]] = None,
+    resampling: str = "bilinear",
+    n_workers: int = 4,
+) -> List[SatelliteImage]:
+    """
+    Reproject many satellite images to a common CRS and resolution with
+    a thread pool, GDAL releasing the GIL while warping. Images which are
+    already in `crs` at `resolution` are returned as is.
+
+    Args:
+        satellite_images (Iterable[SatelliteImage]): Satellite images.
+        crs (str): Target Coordinate Reference System.
+        resolution (Optional[Union[float, Tuple[float, float]]]): Target
+            pixel size, or (x, y) pixel sizes. Defaults to a resolution
+            computed by GDAL for each image.
+        resampling (str): Resampling method, see `SatelliteImage.reproject`.
+        n_workers (int): Number of threads. Defaults to 4.
+
+    Returns:
+        List[SatelliteImage]: Reprojected images, in input order.
+    """
+    if resolution is not None:
+        if isinstance(resolution, (tuple, list)):
+            resolution = tuple(resolution)
+        else:
+            resolution = (resolution, resolution)
+
+    def reproject_image(satellite_image: SatelliteImage) -> SatelliteImage:
+        transform = satellite_image.transform
+        if satellite_image.crs == crs and (
+            resolution is None
+            or np.allclose((abs(transform.a), abs(transform.e)), resolution)
+        ):
+            return satellite_image
+        # Images are warped concurrently, each with a single thread
+        return satellite_image.reproject(crs, resolution, resampling, num_threads=None)
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        return list(executor.map(reproject_image, satellite_images))
@@ -0,0 +1,352 @@
+"""
+Sharded tar archives of labeled satellite image tiles.
+
+Tiles are written WebDataset-style: each sample is stored as three
+consecutive members of a tar shard sharing the same key, the image array
+(`<key>.image.npy`), the label array (`<key>.label.npy`) and the
+metadata (`<key>.json`) with the georeferencing of the tile. An index
+of member offsets, `index.npz`, is written next to the shards so that
+samples can also be read at random without scanning the shards.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import tarfile
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional, Union
+
+import numpy as np
+from affine import Affine
+
+from .labeled_satellite_image import (
+    ClassificationLabeledSatelliteImage,
+    DetectionLabeledSatelliteImage,
+    SegmentationLabeledSatelliteImage,
+)
+from .satellite_image import SatelliteImage
+
+LabeledSatelliteImage = Union[
+    SegmentationLabeledSatelliteImage,
+    ClassificationLabeledSatelliteImage,
+    DetectionLabeledSatelliteImage,
+]
+
+MEMBER_SUFFIXES = [".image.npy", ".label.npy", ".json"]
+
+
+class ShardWriter:
+    """
+    Writer of labeled satellite image tiles to tar shards. A new shard is
+    started when the current one holds `max_samples` samples or reaches
+    `max_size` bytes. The index is written when the writer is closed.
+    """
+
+    def __init__(
+        self,
+        out_dir: str,
+        max_samples: int = 10000,
+        max_size: int = 2**30,
+        prefix: str = "shard",
+    ):
+        """
+        Constructor.
+
+        Args:
+            out_dir (str): Output directory.
+            max_samples (int): Maximum number of samples per shard.
+            max_size (int): Maximum size of a shard, in bytes.
+            prefix (str): Prefix of shard file names. Defaults to "shard".
+        """
+        self.out_dir = out_dir
+        self.max_samples = max_samples
+        self.max_size = max_size
+        self.prefix = prefix
+        os.makedirs(out_dir, exist_ok=True)
+
+        self.shards: List[str] = []
+        self._shard_ids: List[int] = []
+        self._offsets: List[List[int]] = []
+        self._sizes: List[List[int]] = []
+        self._file = None
+        self._tar = None
+        self._shard_count = 0
+
+    def __enter__(self) -> ShardWriter:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._shard_ids)
+
+    def write(self, labeled_image: LabeledSatelliteImage) -> None:
+        """
+        Add a labeled tile to the shards.
+
+        Args:
+            labeled_image (LabeledSatelliteImage): Labeled satellite image.
+        """
+        if (
+            self._tar is None
+            or self._shard_count >= self.max_samples
+            or self._tar.offset >= self.max_size
+        ):
+            self._open_shard()
+
+        key = f"{len(self):09d}"
+        members = _encode_sample(labeled_image)
+        offsets, sizes = [], []
+        for suffix, data in zip(MEMBER_SUFFIXES, members):
+            info = tarfile.TarInfo(key + suffix)
+            info.size = len(data)
+            self._tar.addfile(info, io.BytesIO(data))
+            # Data is followed by padding to a multiple of the block size
+            padded_size = -(-len(data) // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+            offsets.append(self._tar.offset - padded_size)
+            sizes.append(len(data))
+
+        self._shard_ids.append(len(self.shards) - 1)
+        self._offsets.append(offsets)
+        self._sizes.append(sizes)
+        self._shard_count += 1
+
+    def close(self) -> None:
+        """
+        Close the current shard and write the index.
+        """
+        self._close_shard()
+        np.savez(
+            os.path.join(self.out_dir, "index.npz"),
+            shards=np.array(self.shards, dtype=str),
+            shard_ids=np.array(self._shard_ids, dtype=np.int32),
+            offsets=np.array(self._offsets, dtype=np.int64).reshape(-1, 3),
+            sizes=np.array(self._sizes, dtype=np.int64).reshape(-1, 3),
+        )
+
+    def _open_shard(self) -> None:
+        """
+        Close the current shard and start a new one.
+        """
+        self._close_shard()
+        name = f"{self.prefix}-{len(self.shards):06d}.tar"
+        self._file = open(os.path.join(self.out_dir, name), "wb")
+        self._tar = tarfile.open(
+            fileobj=self._file, mode="w", format=tarfile.USTAR_FORMAT
+        )
+        self.shards.append(name)
+        self._shard_count = 0
+
+    def _close_shard(self) -> None:
+        """
+        Close the current shard, if any.
+        """
+        if self._tar is not None:
+            self._tar.close()
+            self._file.close()
+            self._tar, self._file = None, None
+
+
+class ShardReader:
+    """
+    Reader of tar shards written by a ShardWriter. Iterating over the
+    reader streams samples sequentially, shard by shard, while indexing
+    reads a single sample at the offsets given by the shard index.
+    """
+
+    def __init__(self, shards_dir: str):
+        """
+        Constructor.
+
+        Args:
+            shards_dir (str): Directory of the shards and of their index.
+        """
+        self.shards_dir = shards_dir
+        with np.load(os.path.join(shards_dir, "index.npz")) as index:
+            self.shards = index["shards"].tolist()
+            self.shard_ids = index["shard_ids"]
+            self.offsets = index["offsets"]
+            self.sizes = index["sizes"]
+        self._files: Dict[int, io.BufferedReader] = {}
+        # File handles are shared, reads must not be interleaved
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.shard_ids)
+
+    def __getitem__(self, idx: int) -> LabeledSatelliteImage:
+        """
+        Read a sample through the shard index.
+
+        Args:
+            idx (int): Index of the sample.
+
+        Returns:
+            LabeledSatelliteImage: Labeled satellite image.
+        """
+        shard_id = int(self.shard_ids[idx])
+        members = []
+        with self._lock:
+            if shard_id not in self._files:
+                path = os.path.join(self.shards_dir, self.shards[shard_id])
+                self._files[shard_id] = open(path, "rb")
+            file = self._files[shard_id]
+            for offset, size in zip(self.offsets[idx], self.sizes[idx]):
+                file.seek(offset)
+                members.append(file.read(size))
+        return _decode_sample(*members)
+
+    def __iter__(self) -> Iterator[LabeledSatelliteImage]:
+        return self.iter_shards()
+
+    def iter_shards(
+        self, shard_ids: Optional[List[int]] = None
+    ) -> Iterator[LabeledSatelliteImage]:
+        """
+        Stream samples sequentially from shards. Giving distinct shards
+        to each DataLoader worker splits a dataset between workers.
+
+        Args:
+            shard_ids (Optional[List[int]]): Indices of the shards to read.
+                Defaults to all shards.
+
+        Yields:
+            LabeledSatelliteImage: Labeled satellite images.
+        """
+        if shard_ids is None:
+            shard_ids = range(len(self.shards))
+
+        for shard_id in shard_ids:
+            path = os.path.join(self.shards_dir, self.shards[shard_id])
+            with tarfile.open(path, mode="r|") as tar:
+                members = []
+                for info in tar:
+                    members.append(tar.extractfile(info).read())
+                    if len(members) == len(MEMBER_SUFFIXES):
+                        yield _decode_sample(*members)
+                        members = []
+
+    def close(self) -> None:
+        """
+        Close the shard file handles.
+        """
+        with self._lock:
+            for file in self._files.values():
+                file.close()
+            self._files = {}
+
+    def __getstate__(self):
+        # File handles cannot be pickled, they are reopened lazily
+        state = self.__dict__.copy()
+        state["_files"] = {}
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+def _to_bytes(array: np.ndarray) -> bytes:
+    """
+    Serialize an array to the .npy format.
+    """
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def _to_isoformat(value: Optional[date]) -> Optional[str]:
+    """
+    Serialize an optional date or datetime.
+    """
+    return value.isoformat() if value is not None else None
+
+
+def _from_isoformat(value: Optional[str]) -> Optional[date]:
+    """
+    Parse an optional date or datetime serialized with `_to_isoformat`.
+    """
+    if value is None:
+        return None
+    if len(value) == 10:
+        return date.fromisoformat(value)
+    return datetime.fromisoformat(value)
+
+
+def _encode_sample(labeled_image: LabeledSatelliteImage) -> List[bytes]:
+    """
+    Serialize a labeled satellite image to the contents of its members.
+    """
+    satellite_image = labeled_image.satellite_image
+    metadata = {
+        "crs": satellite_image.crs,
+        "bounds": [float(value) for value in satellite_image.bounds],
+        "transform": list(satellite_image.transform)[:6],
+        "dep": satellite_image.dep,
+        "date": _to_isoformat(satellite_image.date),
+        "source": labeled_image.source,
+        "labeling_date": _to_isoformat(labeled_image.labeling_date),
+    }
+
+    if isinstance(labeled_image, SegmentationLabeledSatelliteImage):
+        metadata["task"] = "segmentation"
+        metadata["logits"] = bool(labeled_image.logits)
+        metadata["logits_scale"] = labeled_image.logits_scale
+        metadata["logits_offset"] = labeled_image.logits_offset
+        label = np.asarray(labeled_image.label)
+    elif isinstance(labeled_image, DetectionLabeledSatelliteImage):
+        metadata["task"] = "detection"
+        label = labeled_image.label
+    elif isinstance(labeled_image, ClassificationLabeledSatelliteImage):
+        metadata["task"] = "classification"
+        label = np.asarray(labeled_image.label)
+    else:
+        raise TypeError(
+            f"Cannot write {type(labeled_image).__name__} objects to shards."
+        )
+
+    return [
+        _to_bytes(satellite_image.array),
+        _to_bytes(label),
+        json.dumps(metadata).encode(),
+    ]
+
+
+def _decode_sample(
+    image_data: bytes, label_data: bytes, metadata_data: bytes
+) -> LabeledSatelliteImage:
+    """
+    Deserialize a labeled satellite image from the contents of its members.
+    """
+    metadata = json.loads(metadata_data)
+    satellite_image = SatelliteImage(
+        np.load(io.BytesIO(image_data), allow_pickle=False),
+        metadata["crs"],
+        tuple(metadata["bounds"]),
+        Affine(*metadata["transform"]),
+        metadata["dep"],
+        _from_isoformat(metadata["date"]),
+    )
+    label = np.load(io.BytesIO(label_data), allow_pickle=False)
+    kwargs = {
+        "source": metadata["source"],
+        "labeling_date": _from_isoformat(metadata["labeling_date"]),
+    }
+
+    if metadata["task"] == "segmentation":
+        return SegmentationLabeledSatelliteImage(
+            satellite_image,
+            label,
+            logits=metadata["logits"],
+            logits_scale=metadata.get("logits_scale"),
+            logits_offset=metadata.get("logits_offset", 0.0),
+            **kwargs,
+        )
+    if metadata["task"] == "detection":
+        return DetectionLabeledSatelliteImage(satellite_image, label, **kwargs)
+    return ClassificationLabeledSatelliteImage(satellite_image, int(label), **kwargs)
@@ -0,0 +1,293 @@
+"""
+Streaming radiometric statistics over collections of satellite images.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, Optional, Tuple, Union
+
+import numpy as np
+
+from .raster_reader import RasterReader
+from .satellite_image import SatelliteImage
+from .utils import compute_band_histograms, quantiles_from_histograms
+
+
+class RadiometricStatistics:
+    """
+    Accumulator of per-band statistics (count, mean, standard deviation,
+    minimum, maximum and histogram-based quantiles) over many images.
+
+    Memory usage does not depend on the number of images: statistics are
+    updated image by image, and accumulators computed on separate subsets
+    of images can be merged. Histograms have one bin per value for 8 and
+    16-bit integer images, which makes quantiles exact, and `n_bins` bins
+    over `value_range` for float images, whose non-finite values, e.g.
+    NaN nodata, are left out.
+    """
+
+    def __init__(
+        self,
+        value_range: Optional[Tuple[float, float]] = None,
+        n_bins: int = 4096,
+    ):
+        """
+        Constructor.
+
+        Args:
+            value_range (Optional[Tuple[float, float]]): Range of the
+                histogram bins for float images. Values outside of the range
+                are counted in the first or last bin. Defaults to (0, 1).
+            n_bins (int): Number of histogram bins for float images.
+        """
+        self.value_range = value_range
+        self.n_bins = n_bins
+
+        self.count = None
+        self.mean = None
+        self._m2 = None
+        self.min = None
+        self.max = None
+        self.histograms = None
+        # Histogram layout, as (value of the first bin, bin width)
+        self._bins = None
+
+    @property
+    def std(self) -> np.ndarray:
+        """
+        Per-band (population) standard deviation, NaN for bands without
+        any finite value.
+        """
+        with np.errstate(invalid="ignore"):
+            return np.sqrt(self._m2 / self.count)
+
+    def quantile(self, quantile: float) -> np.ndarray:
+        """
+        Per-band quantiles, exact for integer images and approximated
+        to the bin width for float images.
+
+        Args:
+            quantile (float): Quantile to compute, between 0 and 1.
+
+        Returns:
+            np.ndarray: A (C,) array of quantiles.
+        """
+        if self.histograms is None:
+            raise ValueError("No image has been added to the statistics.")
+        low, width = self._bins
+        positions = quantiles_from_histograms(self.histograms, quantile)
+        if width == 1:
+            return low + positions
+        # Bin centers, clipped to the observed range
+        return np.clip(low + (positions + 0.5) * width, self.min, self.max)
+
+    def update(
+        self, image: Union[SatelliteImage, str], strip_height: int = 1024
+    ) -> RadiometricStatistics:
+        """
+        Add an image to the statistics. Raster files, and lazy images which
+        are not loaded yet, are read by strips of `strip_height` rows so
+        that they are never fully loaded in memory.
+
+        Args:
+            image (Union[SatelliteImage, str]): Satellite image or path
+                of a raster file.
+            strip_height (int): Number of rows read at once from raster files.
+
+        Returns:
+            RadiometricStatistics: Updated statistics.
+        """
+        if isinstance(image, SatelliteImage):
+            if image.is_loaded:
+                self._update_array(image._get_array())
+            else:
+                self._update_reader(image.reader, image.window, strip_height)
+            return self
+
+        reader = RasterReader(image)
+        self._update_reader(reader, (0, 0, reader.height, reader.width), strip_height)
+        reader.close()
+        return self
+
+    def _update_reader(
+        self,
+        reader: RasterReader,
+        window: Tuple[int, int, int, int],
+        strip_height: int,
+    ) -> None:
+        """
+        Add a window of a raster to the statistics, read by strips.
+
+        Args:
+            reader (RasterReader): Reader of the raster.
+            window (Tuple[int, int, int, int]): Window to read, given as
+                (row_off, col_off, height, width).
+            strip_height (int): Number of rows read at once.
+        """
+        row_off, col_off, height, width = window
+        for strip_off in range(row_off, row_off + height, strip_height):
+            strip_rows = min(strip_height, row_off + height - strip_off)
+            strip = reader.read((strip_off, col_off, strip_rows, width))
+            if not reader.channels_first:
+                strip = np.moveaxis(strip, -1, 0)
+            self._update_array(strip)
+
+    def _update_array(self, array: np.ndarray) -> None:
+        """
+        Add a (C, H, W) array to the statistics.
+
+        Args:
+            array (np.ndarray): Image array.
+        """
+        self.merge(self._from_array(array))
+
+    def _from_array(self, array: np.ndarray) -> RadiometricStatistics:
+        """
+        Compute the statistics of a single (C, H, W) array.
+
+        Args:
+            array (np.ndarray): Image array.
+
+        Returns:
+            RadiometricStatistics: Statistics of the array.
+        """
+        statistics = RadiometricStatistics(self.value_range, self.n_bins)
+
+        if np.issubdtype(array.dtype, np.integer) and array.dtype.itemsize <= 2:
+            histograms, offset = compute_band_histograms(array)
+            values = offset + np.arange(histograms.shape[1], dtype=np.float64)
+            count = histograms.sum(axis=1)
+            mean = histograms @ values / count
+            m2 = (histograms * (values - mean[:, np.newaxis]) ** 2).sum(axis=1)
+
+            nonzero_bins = histograms > 0
+            statistics.min = offset + np.argmax(nonzero_bins, axis=1).astype(float)
+            statistics.max = offset + (
+                histograms.shape[1] - 1 - np.argmax(nonzero_bins[:, ::-1], axis=1)
+            ).astype(float)
+            statistics._bins = (offset, 1)
+        else:
+            n_bands = array.shape[0]
+            bands = array.reshape(n_bands, -1)
+            low, high = self.value_range if self.value_range else (0.0, 1.0)
+            width = (high - low) / self.n_bins
+
+            count = np.zeros(n_bands, dtype=np.int64)
+            mean = np.zeros(n_bands)
+            m2 = np.zeros(n_bands)
+            statistics.min = np.full(n_bands, np.inf)
+            statistics.max = np.full(n_bands, -np.inf)
+            histograms = np.zeros((n_bands, self.n_bins), dtype=np.int64)
+            for idx, band in enumerate(bands):
+                # Non-finite values, e.g. NaN nodata, are left out
+                finite = np.isfinite(band)
+                if not finite.all():
+                    band = band[finite]
+                if band.size == 0:
+                    continue
+
+                count[idx] = band.size
+                mean[idx] = band.mean(dtype=np.float64)
+                m2[idx] = np.sum((band - mean[idx]) ** 2)
+                statistics.min[idx] = band.min()
+                statistics.max[idx] = band.max()
+                bins = np.clip((band - low) // width, 0, self.n_bins - 1)
+                histograms[idx] = np.bincount(
+                    bins.astype(np.intp), minlength=self.n_bins
+                )
+            statistics._bins = (low, width)
+
+        statistics.count = count
+        statistics.mean = mean
+        statistics._m2 = m2
+        statistics.histograms = histograms
+        return statistics
+
+    def merge(self, other: RadiometricStatistics) -> RadiometricStatistics:
+        """
+        Merge statistics computed on another set of images into these
+        statistics.
+
+        Args:
+            other (RadiometricStatistics): Statistics to merge.
+
+        Returns:
+            RadiometricStatistics: Merged statistics.
+        """
+        if other.count is None:
+            return self
+        if self.count is None:
+            self.count = other.count.copy()
+            self.mean = other.mean.copy()
+            self._m2 = other._m2.copy()
+            self.min = other.min.copy()
+            self.max = other.max.copy()
+            self.histograms = other.histograms.copy()
+            self._bins = other._bins
+            return self
+
+        if self._bins != other._bins or self.histograms.shape != other.histograms.shape:
+            raise ValueError(
+                "Statistics with different data types or histogram bins "
+                "cannot be merged."
+            )
+
+        # Parallel variance update of Chan et al., bands without any value
+        # in both statistics are left empty
+        count = self.count + other.count
+        weight = np.divide(
+            other.count, count, out=np.zeros(count.shape), where=count > 0
+        )
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * weight
+        self._m2 = self._m2 + other._m2 + delta**2 * self.count * weight
+        self.count = count
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.histograms += other.histograms
+        return self
+
+
+def compute_statistics(
+    images: Iterable[Union[SatelliteImage, str]],
+    n_workers: int = 1,
+    value_range: Optional[Tuple[float, float]] = None,
+    n_bins: int = 4096,
+) -> RadiometricStatistics:
+    """
+    Compute radiometric statistics over satellite images or raster files,
+    with `n_workers` threads each accumulating partial statistics which
+    are merged at the end.
+
+    Args:
+        images (Iterable[Union[SatelliteImage, str]]): Satellite images or
+            paths of raster files.
+        n_workers (int): Number of threads. Defaults to 1.
+        value_range (Optional[Tuple[float, float]]): Range of the histogram
+            bins for float images. Defaults to (0, 1).
+        n_bins (int): Number of histogram bins for float images.
+
+    Returns:
+        RadiometricStatistics: Statistics of the images.
+    """
+    statistics = RadiometricStatistics(value_range, n_bins)
+    if n_workers <= 1:
+        for image in images:
+            statistics.update(image)
+        return statistics
+
+    def compute_partial_statistics(image):
+        return RadiometricStatistics(value_range, n_bins).update(image)
+
+    # Images are submitted by batches to bound the number of pending tasks
+    images = iter(images)
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        while True:
+            batch = list(islice(images, 4 * n_workers))
+            if not batch:
+                break
+            for partial_statistics in executor.map(compute_partial_statistics, batch):
+                statistics.merge(partial_statistics)
+    return statistics
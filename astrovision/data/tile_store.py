@@ -0,0 +1,250 @@
+"""
+Local store of decoded rasters, reloaded as memory-mapped arrays.
+"""
+
+from __future__ import annotations
+
+import datetime
+import hashlib
+import json
+import os
+from datetime import date
+from typing import Dict, List, Literal, Optional
+
+import numpy as np
+from affine import Affine
+
+from .raster_reader import RasterReader
+from .satellite_image import SatelliteImage
+
+
+class TileStore:
+    """
+    Cache of decoded rasters. Each raster is decoded once to a `.npy`
+    file with a JSON sidecar holding its CRS, bounds, transform, dep and
+    date, and is then reloaded as a SatelliteImage whose array is an
+    `np.memmap`: reloading does not decode or copy pixels, and the OS page
+    cache is shared by all processes reading the same tiles (e.g.
+    DataLoader workers).
+
+    Entries are invalidated when the source file changes, according to
+    its modification time and size, or to its SHA-256 hash.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        validation: Literal["mtime", "hash"] = "mtime",
+        mmap_mode: Literal["r", "c", "r+"] = "r",
+    ):
+        """
+        Constructor.
+
+        Args:
+            cache_dir (str): Directory of the store.
+            validation (Literal["mtime", "hash"]): Whether to detect
+                changes of source files with their modification time and
+                size, or with their hash. Defaults to "mtime".
+            mmap_mode (Literal["r", "c", "r+"]): Memory-map mode of
+                returned arrays. "c" gives writable copy-on-write arrays.
+                Defaults to "r".
+        """
+        if validation not in ["mtime", "hash"]:
+            raise ValueError('`validation` must be either "mtime" or "hash".')
+        self.cache_dir = cache_dir
+        self.validation = validation
+        self.mmap_mode = mmap_mode
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get(
+        self,
+        file_path: str,
+        dep: Optional[str] = None,
+        date: Optional[date] = None,
+        bands_indices: Optional[List[int]] = None,
+        cast_to_float: bool = False,
+        dtype: np.dtype = np.float32,
+    ) -> SatelliteImage:
+        """
+        Return a satellite image backed by the memory-mapped decoded
+        raster, decoding the raster first if it is missing from the store
+        or if the source file has changed.
+
+        Args:
+            file_path (str): Path of the raster file.
+            dep (Optional[str]): Département. Defaults to the département
+                stored with the raster.
+            date (Optional[date]): Date. Defaults to the date stored with
+                the raster.
+            bands_indices (Optional[List[int]]): Indices of bands to read.
+                Defaults to all bands.
+            cast_to_float (bool): True to cast integer arrays to float,
+                scaled to [0, 1] according to the bit depth of the source.
+            dtype (np.dtype): Float data type used when `cast_to_float`
+                is True. Defaults to np.float32.
+
+        Returns:
+            SatelliteImage: Satellite image with an `np.memmap` array.
+        """
+        reader = RasterReader(
+            file_path,
+            bands_indices=bands_indices,
+            cast_to_float=cast_to_float,
+            dtype=dtype,
+        )
+        key = self._get_key(reader)
+        array_path, metadata_path = self._get_paths(key)
+
+        metadata = self._load_metadata(metadata_path)
+        if metadata is None or not self._is_valid(file_path, metadata):
+            metadata = self._decode(reader, dep, date, array_path, metadata_path)
+        reader.close()
+
+        stored_date = metadata["date"]
+        if date is None and stored_date is not None:
+            date = datetime.date.fromisoformat(stored_date)
+        return SatelliteImage(
+            np.load(array_path, mmap_mode=self.mmap_mode),
+            metadata["crs"],
+            tuple(metadata["bounds"]),
+            Affine(*metadata["transform"]),
+            dep if dep is not None else metadata["dep"],
+            date,
+        )
+
+    def invalidate(self, file_path: str) -> None:
+        """
+        Remove all entries of a raster file from the store.
+
+        Args:
+            file_path (str): Path of the raster file.
+        """
+        source = os.path.abspath(file_path)
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            metadata_path = os.path.join(self.cache_dir, name)
+            metadata = self._load_metadata(metadata_path)
+            if metadata is not None and metadata["source"] == source:
+                self._remove(name[: -len(".json")])
+
+    def clear(self) -> None:
+        """
+        Remove all entries from the store.
+        """
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json"):
+                self._remove(name[: -len(".json")])
+
+    def _get_key(self, reader: RasterReader) -> str:
+        """
+        Return the key of a raster file read with given options.
+        """
+        options = (
+            os.path.abspath(reader.file_path),
+            reader._bands_indices,
+            reader.cast_to_float,
+            np.dtype(reader.dtype).str if reader.cast_to_float else None,
+        )
+        return hashlib.sha1(repr(options).encode()).hexdigest()
+
+    def _get_paths(self, key: str):
+        """
+        Return the paths of the array and metadata files of a key.
+        """
+        return (
+            os.path.join(self.cache_dir, key + ".npy"),
+            os.path.join(self.cache_dir, key + ".json"),
+        )
+
+    def _remove(self, key: str) -> None:
+        """
+        Remove the files of an entry.
+        """
+        for path in self._get_paths(key):
+            if os.path.exists(path):
+                os.remove(path)
+
+    @staticmethod
+    def _load_metadata(metadata_path: str) -> Optional[Dict]:
+        """
+        Load the metadata sidecar of an entry, if it exists.
+        """
+        if not os.path.exists(metadata_path):
+            return None
+        with open(metadata_path) as f:
+            return json.load(f)
+
+    def _get_source_state(self, file_path: str) -> Dict:
+        """
+        Return the state of a source file compared to detect changes.
+        """
+        stat = os.stat(file_path)
+        if self.validation == "mtime":
+            return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+        sha256 = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(2**20), b""):
+                sha256.update(chunk)
+        return {"sha256": sha256.hexdigest(), "size": stat.st_size}
+
+    def _is_valid(self, file_path: str, metadata: Dict) -> bool:
+        """
+        Return True if an entry is up to date with its source file.
+        """
+        state = self._get_source_state(file_path)
+        return all(metadata.get(key) == value for key, value in state.items())
+
+    def _decode(
+        self,
+        reader: RasterReader,
+        dep: Optional[str],
+        date: Optional[date],
+        array_path: str,
+        metadata_path: str,
+    ) -> Dict:
+        """
+        Decode a raster to the store, by strips of its natural block
+        height so that it is never fully loaded in memory.
+
+        Returns:
+            Dict: Metadata of the entry.
+        """
+        # Source state is taken before decoding so that a change of the
+        # source during decoding invalidates the entry
+        metadata = {
+            "source": os.path.abspath(reader.file_path),
+            **self._get_source_state(reader.file_path),
+            "crs": reader.get_crs(),
+            "bounds": list(reader.get_bounds()),
+            "transform": list(reader.get_transform())[:6],
+            "dep": dep,
+            "date": date.isoformat() if date is not None else None,
+        }
+
+        height, width = reader.height, reader.width
+        strip_height = max(reader.get_block_size()[0], 256)
+        # Files are written under temporary names and renamed once
+        # complete, so that concurrent readers never see partial entries
+        tmp_array_path = f"{array_path}.{os.getpid()}.tmp"
+        array = None
+        for row_off in range(0, height, strip_height):
+            strip_rows = min(strip_height, height - row_off)
+            strip = reader.read((row_off, 0, strip_rows, width))
+            if array is None:
+                array = np.lib.format.open_memmap(
+                    tmp_array_path,
+                    mode="w+",
+                    dtype=strip.dtype,
+                    shape=(strip.shape[0], height, width),
+                )
+            array[:, row_off : row_off + strip_rows] = strip  # noqa: E203
+        array.flush()
+        del array
+        os.replace(tmp_array_path, array_path)
+
+        tmp_metadata_path = f"{metadata_path}.{os.getpid()}.tmp"
+        with open(tmp_metadata_path, "w") as f:
+            json.dump(metadata, f)
+        os.replace(tmp_metadata_path, metadata_path)
+        return metadata
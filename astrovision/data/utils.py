@@ -3,8 +3,13 @@ Util functions for the data module.
 """
 
 from affine import Affine
-from typing import List, Tuple
+import copy
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+import pyproj
 import rasterio
+import shapely
 
 
 def generate_tiles_borders(height: int, width: int, tile_length: int) -> List:
@@ -25,30 +30,195 @@ def generate_tiles_borders(height: int, width: int, tile_length: int) -> List:
             of a tile that can be extracted from the original image.
     """
 
+    grid = generate_tiles_grid(height, width, tile_length)
+    indices = [
+        ((row_min, row_max), (col_min, col_max))
+        for row_min, row_max, col_min, col_max in grid.tolist()
+    ]
+    return indices
+
+
+def generate_tiles_grid(
+    height: int, width: int, tile_length: int, stride: Optional[int] = None
+) -> np.ndarray:
+    """
+    Vectorized version of `generate_tiles_borders`. Given the dimensions
+    of an original image and a desired tile side length, this function
+    returns an array with one row (row_min, row_max, col_min, col_max)
+    per tile, in the same order as `generate_tiles_borders`. Tiles which
+    would go past the image border are shifted back inside the image.
+
+    Args:
+        height (int): Height of the original image.
+        width (int): Width of the original image.
+        tile_length (int): Dimension of tiles.
+        stride (Optional[int]): Distance between the offsets of consecutive
+            tiles, smaller than `tile_length` for overlapping tiles.
+            Defaults to `tile_length`.
+
+    Returns:
+        np.ndarray: An (N, 4) integer array of tile border indices.
+    """
     if (tile_length > height) | (tile_length > width):
         raise ValueError(
             "The size of the tile should be smaller"
             "than the size of the original image."
         )
 
-    indices = [
-        (
-            ((height - tile_length, height), (width - tile_length, width))
-            if (x + tile_length > height) & (y + tile_length > width)
-            else (
-                ((x, x + tile_length), (y, y + tile_length))
-                if (x + tile_length <= height) & (y + tile_length <= width)
-                else (
-                    ((height - tile_length, height), (y, y + tile_length))
-                    if (x + tile_length > height) & (y + tile_length <= width)
-                    else ((x, x + tile_length), (width - tile_length, width))
-                )
-            )
+    if stride is None:
+        stride = tile_length
+
+    # Offsets shifted back inside the image may be duplicated
+    row_offsets = np.unique(
+        np.minimum(np.arange(0, height, stride, dtype=np.int64), height - tile_length)
+    )
+    col_offsets = np.unique(
+        np.minimum(np.arange(0, width, stride, dtype=np.int64), width - tile_length)
+    )
+    row_grid, col_grid = np.meshgrid(row_offsets, col_offsets, indexing="ij")
+    row_grid = row_grid.ravel()
+    col_grid = col_grid.ravel()
+
+    return np.stack(
+        [row_grid, row_grid + tile_length, col_grid, col_grid + tile_length],
+        axis=1,
+    )
+
+
+def assign_boxes_to_tiles(
+    boxes: np.ndarray, grid: np.ndarray, min_visible_ratio: float = 0.0
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Assign bounding boxes to the tiles of a grid they overlap, and clip
+    and translate them to the pixel coordinates of each tile, for all
+    boxes and tiles at once.
+
+    Boxes are given as (x0, y0, x1, y1) inclusive pixel coordinates,
+    x being the column and y the row. Candidate tiles of each box are
+    found by binary search on the grid offsets, so that the cost grows
+    with the number of (box, tile) pairs rather than with the product
+    of the numbers of boxes and tiles.
+
+    Args:
+        boxes (np.ndarray): An (M, 4) array of boxes.
+        grid (np.ndarray): An (N, 4) array of tile border indices, as
+            returned by `generate_tiles_grid`.
+        min_visible_ratio (float): Minimum ratio of the area of a box
+            which must lie in a tile for the box to be assigned to it.
+            Defaults to 0 (any overlap).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Tile indices, box
+            indices and (K, 4) clipped boxes in tile coordinates of the
+            (box, tile) pairs, sorted by tile then by box.
+    """
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    tile_length = int(grid[0, 1] - grid[0, 0])
+    row_offsets = np.unique(grid[:, 0])
+    col_offsets = np.unique(grid[:, 2])
+
+    x0, y0, x1, y1 = boxes.T
+    # Tiles with offset in [x0 - tile_length + 1, x1] overlap the box
+    col_first = np.searchsorted(col_offsets, x0 - tile_length + 1, side="left")
+    col_count = np.searchsorted(col_offsets, x1, side="right") - col_first
+    row_first = np.searchsorted(row_offsets, y0 - tile_length + 1, side="left")
+    row_count = np.searchsorted(row_offsets, y1, side="right") - row_first
+    pair_count = np.maximum(col_count, 0) * np.maximum(row_count, 0)
+
+    # One entry per (box, tile) pair
+    box_indices = np.repeat(np.arange(len(boxes)), pair_count)
+    local_indices = np.arange(len(box_indices)) - np.repeat(
+        np.cumsum(pair_count) - pair_count, pair_count
+    )
+    col_indices = col_first[box_indices] + local_indices % col_count[box_indices]
+    row_indices = row_first[box_indices] + local_indices // col_count[box_indices]
+    tile_indices = row_indices * len(col_offsets) + col_indices
+
+    col_off = col_offsets[col_indices]
+    row_off = row_offsets[row_indices]
+    clipped_boxes = np.stack(
+        [
+            np.maximum(x0[box_indices], col_off) - col_off,
+            np.maximum(y0[box_indices], row_off) - row_off,
+            np.minimum(x1[box_indices], col_off + tile_length - 1) - col_off,
+            np.minimum(y1[box_indices], row_off + tile_length - 1) - row_off,
+        ],
+        axis=1,
+    ).astype(boxes.dtype, copy=False)
+
+    if min_visible_ratio > 0:
+        areas = (x1 - x0 + 1) * (y1 - y0 + 1)
+        clipped_areas = (clipped_boxes[:, 2] - clipped_boxes[:, 0] + 1) * (
+            clipped_boxes[:, 3] - clipped_boxes[:, 1] + 1
         )
-        for x in range(0, height, tile_length)
-        for y in range(0, width, tile_length)
-    ]
-    return indices
+        visible = clipped_areas >= min_visible_ratio * areas[box_indices]
+        tile_indices = tile_indices[visible]
+        box_indices = box_indices[visible]
+        clipped_boxes = clipped_boxes[visible]
+
+    order = np.lexsort((box_indices, tile_indices))
+    return tile_indices[order], box_indices[order], clipped_boxes[order]
+
+
+def boxes_pixel_to_world(boxes: np.ndarray, transform: Affine) -> np.ndarray:
+    """
+    Convert (x0, y0, x1, y1) inclusive pixel boxes to (left, bottom,
+    right, top) world boxes through an affine transform, for all boxes
+    at once. The world box of a pixel box spans its pixels entirely.
+
+    Args:
+        boxes (np.ndarray): An (M, 4) array of pixel boxes.
+        transform (Affine): Transform of the image.
+
+    Returns:
+        np.ndarray: An (M, 4) float array of world boxes.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    a, b, c, d, e, f = transform[:6]
+    corners_x = boxes[:, [0, 2]] + [0, 1]
+    corners_y = boxes[:, [1, 3]] + [0, 1]
+    world_x = a * corners_x + b * corners_y + c
+    world_y = d * corners_x + e * corners_y + f
+    return np.stack(
+        [
+            world_x.min(axis=1),
+            world_y.min(axis=1),
+            world_x.max(axis=1),
+            world_y.max(axis=1),
+        ],
+        axis=1,
+    )
+
+
+def boxes_world_to_pixel(boxes: np.ndarray, transform: Affine) -> np.ndarray:
+    """
+    Convert (left, bottom, right, top) world boxes to (x0, y0, x1, y1)
+    inclusive pixel boxes of the pixels they overlap, through the
+    inverse of an affine transform, for all boxes at once.
+
+    Args:
+        boxes (np.ndarray): An (M, 4) array of world boxes.
+        transform (Affine): Transform of the image.
+
+    Returns:
+        np.ndarray: An (M, 4) int64 array of pixel boxes.
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    a, b, c, d, e, f = (~transform)[:6]
+    corners_x = boxes[:, [0, 2]]
+    corners_y = boxes[:, [1, 3]]
+    pixel_x = a * corners_x + b * corners_y + c
+    pixel_y = d * corners_x + e * corners_y + f
+    # Tolerance for floating point errors on pixel edges
+    return np.stack(
+        [
+            np.floor(pixel_x.min(axis=1) + 1e-6),
+            np.floor(pixel_y.min(axis=1) + 1e-6),
+            np.ceil(pixel_x.max(axis=1) - 1e-6) - 1,
+            np.ceil(pixel_y.max(axis=1) - 1e-6) - 1,
+        ],
+        axis=1,
+    ).astype(np.int64)
 
 
 def get_bounds_for_tile(
@@ -95,3 +265,392 @@ def get_transform_for_tile(transform: Affine, row_off: int, col_off: int) -> Aff
     """
     x, y = transform * (col_off, row_off)
     return Affine.translation(x - transform.c, y - transform.f) * transform
+
+
+def get_bounds_for_tiles(transform: Affine, grid: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of `get_bounds_for_tile`. Given a transformation
+    of a satellite image and a tile grid as returned by
+    `generate_tiles_grid`, returns the bounding coordinates of all tiles.
+
+    Args:
+        transform (Affine): An affine transformation.
+        grid (np.ndarray): An (N, 4) array of tile border indices.
+
+    Returns:
+        np.ndarray: An (N, 4) array of bounding coordinates
+            (left, bottom, right, top) of the tiles.
+    """
+    a, b, c, d, e, f = transform[:6]
+    row_min, row_max, col_min, col_max = grid.T
+
+    left = a * col_min + b * row_max + c
+    bottom = d * col_min + e * row_max + f
+    right = a * col_max + b * row_min + c
+    top = d * col_max + e * row_min + f
+    return np.stack([left, bottom, right, top], axis=1)
+
+
+def get_transforms_for_tiles(transform: Affine, grid: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of `get_transform_for_tile`. Given a transformation
+    of a satellite image and a tile grid as returned by
+    `generate_tiles_grid`, returns the coefficients of the transform
+    matrix of all tiles.
+
+    Args:
+        transform (Affine): An affine transformation.
+        grid (np.ndarray): An (N, 4) array of tile border indices.
+
+    Returns:
+        np.ndarray: An (N, 6) array of coefficients (a, b, c, d, e, f)
+            of the tile transforms, in the order of `Affine`.
+    """
+    a, b, c, d, e, f = transform[:6]
+    row_off = grid[:, 0]
+    col_off = grid[:, 2]
+
+    transforms = np.empty((len(grid), 6), dtype=np.float64)
+    transforms[:, 0] = a
+    transforms[:, 1] = b
+    transforms[:, 2] = a * col_off + b * row_off + c
+    transforms[:, 3] = d
+    transforms[:, 4] = e
+    transforms[:, 5] = d * col_off + e * row_off + f
+    return transforms
+
+
+def get_tiles_metadata(transform: Affine, grid: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Return a compact metadata table for the tiles of a tile grid.
+
+    Args:
+        transform (Affine): An affine transformation.
+        grid (np.ndarray): An (N, 4) array of tile border indices.
+
+    Returns:
+        Dict[str, np.ndarray]: Dictionary with keys "indices" for the (N, 4)
+            tile border indices, "bounds" for the (N, 4) tile bounds and
+            "transforms" for the (N, 6) tile transform coefficients.
+    """
+    return {
+        "indices": grid,
+        "bounds": get_bounds_for_tiles(transform, grid),
+        "transforms": get_transforms_for_tiles(transform, grid),
+    }
+
+
+def get_tiles_batch(
+    array: np.ndarray,
+    grid: np.ndarray,
+    tile_length: int,
+    bands_indices: Optional[List[int]] = None,
+    dtype: Optional[np.dtype] = None,
+) -> np.ndarray:
+    """
+    Stack the square tiles of side `tile_length` of a (C, H, W) array,
+    given by a tile grid, in a single contiguous (N, C, H, W) array.
+
+    When `tile_length` divides the array dimensions, tiles are copied
+    from a strided view of the array in a single pass.
+
+    Args:
+        array (np.ndarray): A (C, H, W) array.
+        grid (np.ndarray): An (N, 4) array of tile border indices, as
+            returned by `generate_tiles_grid`.
+        tile_length (int): Side of tiles.
+        bands_indices (Optional[List[int]]): Indices of bands to keep.
+            Defaults to all bands.
+        dtype (Optional[np.dtype]): Data type of the batch. Defaults
+            to the data type of the array.
+
+    Returns:
+        np.ndarray: An (N, C, H, W) array of tiles.
+    """
+    n_bands, height, width = array.shape
+    if bands_indices is None:
+        bands_indices = list(range(n_bands))
+    if dtype is None:
+        dtype = array.dtype
+
+    batch = np.empty(
+        (len(grid), len(bands_indices), tile_length, tile_length), dtype=dtype
+    )
+
+    if (height % tile_length == 0) and (width % tile_length == 0):
+        # (n_rows, n_cols, C, H, W) view on the array
+        n_rows = height // tile_length
+        n_cols = width // tile_length
+        band_stride, row_stride, col_stride = array.strides
+        tiles = np.lib.stride_tricks.as_strided(
+            array,
+            shape=(n_rows, n_cols, n_bands, tile_length, tile_length),
+            strides=(
+                row_stride * tile_length,
+                col_stride * tile_length,
+                band_stride,
+                row_stride,
+                col_stride,
+            ),
+            writeable=False,
+        )
+        batch_view = batch.reshape(
+            n_rows, n_cols, len(bands_indices), tile_length, tile_length
+        )
+        for idx, band in enumerate(bands_indices):
+            batch_view[:, :, idx] = tiles[:, :, band]
+    else:
+        # (C, H - tile_length + 1, W - tile_length + 1, H, W) view
+        windows = np.lib.stride_tricks.sliding_window_view(
+            array, (tile_length, tile_length), axis=(1, 2)
+        )
+        for idx, band in enumerate(bands_indices):
+            batch[:, idx] = windows[band, grid[:, 0], grid[:, 2]]
+
+    return batch
+
+
+def compute_band_histograms(
+    array: np.ndarray, chunk_size: int = 2**22
+) -> Tuple[np.ndarray, int]:
+    """
+    Compute exact per-band histograms of a (C, H, W) integer array with
+    at most 16 bits, with one bin per possible value. Bands are processed
+    by chunks of `chunk_size` pixels to bound memory usage.
+
+    Args:
+        array (np.ndarray): Integer array in (C, H, W) format.
+        chunk_size (int): Number of pixels processed at once.
+
+    Returns:
+        Tuple[np.ndarray, int]: A (C, K) array of counts, where K is the
+            number of values of the data type, and the value of the
+            first bin.
+    """
+    info = np.iinfo(array.dtype)
+    if info.bits > 16:
+        raise ValueError("Histograms are only computed for 8 and 16-bit integers.")
+    offset = int(info.min)
+    n_bins = int(info.max) - offset + 1
+
+    histograms = np.zeros((array.shape[0], n_bins), dtype=np.int64)
+    for idx, band in enumerate(array):
+        values = band.ravel()
+        for start in range(0, values.size, chunk_size):
+            chunk = values[start : start + chunk_size]  # noqa: E203
+            if offset:
+                chunk = chunk.astype(np.int32) - offset
+            histograms[idx] += np.bincount(chunk, minlength=n_bins)
+    return histograms, offset
+
+
+def compute_class_histograms(
+    labels: Union[np.ndarray, Sequence[np.ndarray]],
+    n_classes: Optional[int] = None,
+    chunk_size: int = 2**22,
+) -> np.ndarray:
+    """
+    Compute per-tile class histograms of segmentation labels with a
+    single `bincount` per chunk of tiles, offsetting the class IDs of
+    each tile so that all tiles of a chunk are counted at once. Chunks
+    hold about `chunk_size` pixels to bound memory usage.
+
+    Args:
+        labels (Union[np.ndarray, Sequence[np.ndarray]]): An (N, H, W)
+            array of class IDs, or a sequence of N arrays of class IDs.
+        n_classes (Optional[int]): Number of classes. Defaults to the
+            maximum class ID + 1.
+        chunk_size (int): Number of pixels processed at once.
+
+    Returns:
+        np.ndarray: An (N, K) array of pixel counts per class.
+    """
+    if n_classes is None:
+        n_classes = max((int(label.max()) for label in labels if label.size), default=0)
+        n_classes += 1
+
+    sizes = np.array([label.size for label in labels], dtype=np.int64)
+    # Each chunk starts at the first tile which does not fit in the previous one
+    chunk_starts = [0]
+    cumulative_sizes = np.cumsum(sizes)
+    while chunk_starts[-1] < len(labels):
+        start = chunk_starts[-1]
+        offset = cumulative_sizes[start - 1] if start > 0 else 0
+        stop = np.searchsorted(cumulative_sizes, offset + chunk_size, side="right")
+        chunk_starts.append(max(int(stop), start + 1))
+
+    histograms = np.empty((len(labels), n_classes), dtype=np.int64)
+    for start, stop in zip(chunk_starts[:-1], chunk_starts[1:]):
+        if isinstance(labels, np.ndarray):
+            values = labels[start:stop].reshape(-1)
+        else:
+            values = np.concatenate([label.ravel() for label in labels[start:stop]])
+        if values.size and (values.min() < 0 or values.max() >= n_classes):
+            raise ValueError(f"Class IDs must be between 0 and {n_classes - 1}.")
+
+        tile_ids = np.repeat(np.arange(stop - start), sizes[start:stop])
+        counts = np.bincount(
+            tile_ids * n_classes + values, minlength=(stop - start) * n_classes
+        )
+        histograms[start:stop] = counts.reshape(stop - start, n_classes)
+    return histograms
+
+
+def quantiles_from_histograms(
+    histograms: np.ndarray, quantile: float, offset: int = 0
+) -> np.ndarray:
+    """
+    Compute per-band quantiles from histograms with one bin per integer
+    value, as returned by `compute_band_histograms`. Results are equal to
+    `np.quantile` with linear interpolation.
+
+    Args:
+        histograms (np.ndarray): A (C, K) array of counts.
+        quantile (float): Quantile to compute, between 0 and 1.
+        offset (int): Value of the first bin.
+
+    Returns:
+        np.ndarray: A (C,) array of quantiles.
+    """
+    counts = histograms.sum(axis=1)
+    cumulative_counts = np.cumsum(histograms, axis=1)
+
+    position = quantile * (counts - 1)
+    lower_rank = np.floor(position)
+    upper_rank = np.minimum(lower_rank + 1, counts - 1)
+
+    # Value at rank k is the first bin whose cumulative count exceeds k
+    lower_value = (cumulative_counts <= lower_rank[:, np.newaxis]).sum(axis=1)
+    upper_value = (cumulative_counts <= upper_rank[:, np.newaxis]).sum(axis=1)
+
+    return offset + lower_value + (upper_value - lower_value) * (position - lower_rank)
+
+
+@lru_cache(maxsize=256)
+def get_crs(crs: str) -> pyproj.CRS:
+    """
+    Return a pyproj CRS object, cached so that CRS definitions are only
+    parsed once.
+
+    Args:
+        crs (str): Coordinate Reference System, e.g. "EPSG:2154".
+
+    Returns:
+        pyproj.CRS: CRS object.
+    """
+    return pyproj.CRS(crs)
+
+
+@lru_cache(maxsize=256)
+def get_transformer(
+    source_crs: str, target_crs: str, always_xy: bool = False
+) -> pyproj.Transformer:
+    """
+    Return a pyproj Transformer between two CRSs. Transformers are cached
+    by (source, target) pair, the cache being shared by all geometry
+    predicates. Cached transformers can be used from several threads,
+    pyproj transformers being thread-safe.
+
+    Args:
+        source_crs (str): Source Coordinate Reference System.
+        target_crs (str): Target Coordinate Reference System.
+        always_xy (bool): True to use the (x, y) / (lon, lat) axis order
+            for all CRSs. Defaults to False, which uses the axis order of
+            the CRS definitions.
+
+    Returns:
+        pyproj.Transformer: Transformer.
+    """
+    return pyproj.Transformer.from_crs(
+        get_crs(source_crs), get_crs(target_crs), always_xy=always_xy
+    )
+
+
+def get_transformer_cache_info() -> Dict[str, tuple]:
+    """
+    Return hit and miss statistics of the CRS and Transformer caches.
+
+    Returns:
+        Dict[str, tuple]: Cache statistics of `get_crs` ("crs" key) and
+            `get_transformer` ("transformer" key), as returned by
+            `functools.lru_cache`.
+    """
+    return {
+        "crs": get_crs.cache_info(),
+        "transformer": get_transformer.cache_info(),
+    }
+
+
+def reproject_geometries(
+    geometries: np.ndarray, source_crs: str, target_crs: str
+) -> np.ndarray:
+    """
+    Reproject shapely geometries, transforming the coordinates of all
+    geometries in a single call to a cached Transformer.
+
+    Args:
+        geometries (np.ndarray): Geometry or array of geometries.
+        source_crs (str): Source Coordinate Reference System.
+        target_crs (str): Target Coordinate Reference System.
+
+    Returns:
+        np.ndarray: Reprojected geometry or array of geometries.
+    """
+    if source_crs == target_crs:
+        return geometries
+    transformer = get_transformer(source_crs, target_crs)
+
+    def transform_coordinates(coordinates: np.ndarray) -> np.ndarray:
+        x, y = transformer.transform(coordinates[:, 0], coordinates[:, 1])
+        return np.column_stack([x, y])
+
+    return shapely.transform(geometries, transform_coordinates)
+
+
+def prepare_reprojected(
+    geometry: shapely.Geometry, source_crs: str, target_crs: str
+) -> shapely.Geometry:
+    """
+    Reproject a geometry and prepare it for repeated predicate queries.
+    The geometry of the caller is never prepared: it is copied when no
+    reprojection is needed.
+
+    Args:
+        geometry (shapely.Geometry): Geometry to reproject.
+        source_crs (str): Source Coordinate Reference System.
+        target_crs (str): Target Coordinate Reference System.
+
+    Returns:
+        shapely.Geometry: Reprojected and prepared geometry.
+    """
+    projected_geometry = reproject_geometries(geometry, source_crs, target_crs)
+    if projected_geometry is geometry:
+        projected_geometry = copy.copy(projected_geometry)
+    shapely.prepare(projected_geometry)
+    return projected_geometry
+
+
+def assign_geometries_to_tiles(
+    geometries: np.ndarray, tile_bounds: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Assign geometries to the tiles they intersect, querying an STRtree
+    of the geometries with all tile footprints at once.
+
+    Args:
+        geometries (np.ndarray): An (M,) array of geometries, in the CRS
+            of the tiles.
+        tile_bounds (np.ndarray): An (N, 4) array of tile bounds
+            (left, bottom, right, top), as returned by
+            `get_bounds_for_tiles`.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Tile indices and geometry indices
+            of the (geometry, tile) pairs, sorted by tile then by geometry.
+    """
+    tree = shapely.STRtree(geometries)
+    tile_indices, geometry_indices = tree.query(
+        shapely.box(*np.asarray(tile_bounds).T), predicate="intersects"
+    )
+    order = np.lexsort((geometry_indices, tile_indices))
+    return tile_indices[order], geometry_indices[order]
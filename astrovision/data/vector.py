@@ -0,0 +1,254 @@
+"""
+Vectorization of segmentation labels to geospatial vector files.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+import shapely
+from osgeo import ogr, osr
+
+from .labeled_satellite_image import SegmentationLabeledSatelliteImage
+
+OGR_DRIVERS = {
+    ".gpkg": "GPKG",
+    ".parquet": "Parquet",
+    ".fgb": "FlatGeobuf",
+    ".geojson": "GeoJSON",
+    ".shp": "ESRI Shapefile",
+}
+
+
+class VectorWriter:
+    """
+    Incremental writer of labeled polygons to a vector file with OGR,
+    e.g. a GeoPackage or a GeoParquet file. Each call to `write` is
+    committed in its own transaction, so that polygons are not held in
+    memory until the end of writing.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        crs: str,
+        layer_name: str = "labels",
+        driver: Optional[str] = None,
+    ):
+        """
+        Constructor. An existing file at `file_path` is overwritten.
+
+        Args:
+            file_path (str): Path of the vector file.
+            crs (str): CRS of the polygons.
+            layer_name (str): Name of the layer. Defaults to "labels".
+            driver (Optional[str]): OGR driver name. Defaults to the driver
+                of the file extension, "GPKG" for ".gpkg" and "Parquet"
+                for ".parquet".
+        """
+        if driver is None:
+            extension = os.path.splitext(file_path)[1].lower()
+            if extension not in OGR_DRIVERS:
+                raise ValueError(
+                    f"Cannot infer the OGR driver of {file_path}, "
+                    "`driver` must be given."
+                )
+            driver = OGR_DRIVERS[extension]
+        ogr_driver = ogr.GetDriverByName(driver)
+        if ogr_driver is None:
+            raise ValueError(f"OGR driver {driver} is not available.")
+
+        if os.path.exists(file_path):
+            ogr_driver.DeleteDataSource(file_path)
+        self.file_path = file_path
+        self.count = 0
+        self._dataset = ogr_driver.CreateDataSource(file_path)
+
+        spatial_ref = osr.SpatialReference()
+        spatial_ref.SetFromUserInput(crs)
+        self._layer = self._dataset.CreateLayer(layer_name, spatial_ref, ogr.wkbPolygon)
+        self._layer.CreateField(ogr.FieldDefn("class", ogr.OFTInteger))
+
+    def __enter__(self) -> VectorWriter:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def write(self, polygons: np.ndarray, classes: np.ndarray) -> None:
+        """
+        Write polygons and their class IDs.
+
+        Args:
+            polygons (np.ndarray): (M,) array of polygons.
+            classes (np.ndarray): (M,) array of class IDs.
+        """
+        if len(polygons) == 0:
+            return
+        layer_definition = self._layer.GetLayerDefn()
+        self._layer.StartTransaction()
+        for wkb, value in zip(shapely.to_wkb(polygons), classes.tolist()):
+            feature = ogr.Feature(layer_definition)
+            feature.SetGeometry(ogr.CreateGeometryFromWkb(wkb))
+            feature.SetField("class", value)
+            self._layer.CreateFeature(feature)
+        self._layer.CommitTransaction()
+        self.count += len(polygons)
+
+    def close(self) -> None:
+        """
+        Flush and close the vector file.
+        """
+        if self._dataset is not None:
+            self._dataset.FlushCache()
+            self._layer, self._dataset = None, None
+
+
+def polygonize_tiles(
+    labeled_images: Iterable[SegmentationLabeledSatelliteImage],
+    file_path: str,
+    layer_name: str = "labels",
+    driver: Optional[str] = None,
+    background: int = 0,
+) -> int:
+    """
+    Polygonize the labels of tiles, e.g. predictions of a model on the
+    tiles of a large image, and write the polygons to a vector file as
+    tiles are processed, without building a mosaic. Regions are
+    4-connected, as with `polygonize(connectivity=4)`.
+
+    Tiles must be given row by row, from top to bottom, as returned by
+    `split`; the order of tiles within a row does not matter. Tiles may
+    overlap the previous tiles of their row and the tiles of the row
+    above, as the last row and column of `split` when the size of the
+    image is not a multiple of the tile length: only the part of a tile
+    which is not covered yet is polygonized. Polygons
+    which do not reach the border of their tile are complete and are
+    written right away. Polygons reaching a border are merged by class
+    with the touching polygons of previous tiles, and are written as soon
+    as a new row of tiles starts below them. Memory usage thus depends on
+    the size of a row of tiles, not on the size of the covered area.
+
+    Args:
+        labeled_images (Iterable[SegmentationLabeledSatelliteImage]):
+            Labeled tiles, which must share a CRS.
+        file_path (str): Path of the vector file.
+        layer_name (str): Name of the layer. Defaults to "labels".
+        driver (Optional[str]): OGR driver name, see `VectorWriter`.
+        background (int): Class ID which is not polygonized.
+            Defaults to 0.
+
+    Returns:
+        int: Number of written polygons.
+    """
+    writer = None
+    row_top = None
+    seam_polygons = np.empty(0, dtype=object)
+    seam_classes = np.empty(0, dtype=np.int64)
+    previous_row_boxes, row_boxes = [], []
+    for labeled_image in labeled_images:
+        satellite_image = labeled_image.satellite_image
+        if writer is None:
+            crs = satellite_image.crs
+            writer = VectorWriter(file_path, crs, layer_name, driver)
+        elif satellite_image.crs != crs:
+            raise ValueError("Labeled images must share the same CRS.")
+
+        # Polygons are on the pixel grid, a half pixel tolerance suffices
+        tolerance = 0.5 * min(
+            abs(satellite_image.transform.a), abs(satellite_image.transform.e)
+        )
+        left, bottom, right, top = satellite_image.bounds
+        if row_top is None or top < row_top - tolerance:
+            # Seam polygons above the new row cannot grow anymore
+            if len(seam_polygons) > 0:
+                complete = shapely.bounds(seam_polygons)[:, 1] > top + tolerance
+                writer.write(seam_polygons[complete], seam_classes[complete])
+                seam_polygons = seam_polygons[~complete]
+                seam_classes = seam_classes[~complete]
+            row_top = top
+            previous_row_boxes, row_boxes = row_boxes, []
+        elif top > row_top + tolerance:
+            raise ValueError("Tiles must be given row by row, from top to bottom.")
+
+        # Only the area not covered by previous tiles is polygonized
+        region = shapely.box(left, bottom, right, top)
+        covered = shapely.union_all(previous_row_boxes + row_boxes)
+        row_boxes.append(region)
+        if shapely.intersection(region, covered).area > tolerance**2:
+            region = shapely.difference(region, covered)
+            if region.area <= tolerance**2:
+                continue
+            polygons, classes = _clip_polygons(
+                *labeled_image.polygonize(4, background), region, tolerance
+            )
+        else:
+            polygons, classes = labeled_image.polygonize(4, background)
+
+        on_seam = shapely.dwithin(polygons, region.boundary, tolerance)
+        writer.write(polygons[~on_seam], classes[~on_seam])
+        seam_polygons, seam_classes = _merge_seam_polygons(
+            seam_polygons, seam_classes, polygons[on_seam], classes[on_seam]
+        )
+
+    if writer is None:
+        raise ValueError("No labeled image to polygonize.")
+
+    writer.write(seam_polygons, seam_classes)
+    writer.close()
+    return writer.count
+
+
+def _clip_polygons(
+    polygons: np.ndarray,
+    classes: np.ndarray,
+    region: shapely.Geometry,
+    tolerance: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Clip polygons to a region, dropping the slivers thinner than
+    `tolerance` which floating point errors leave along its boundary.
+    """
+    parts, indices = shapely.get_parts(
+        shapely.intersection(polygons, region), return_index=True
+    )
+    keep = (shapely.get_type_id(parts) == shapely.GeometryType.POLYGON) & (
+        shapely.area(parts) > tolerance**2
+    )
+    return parts[keep], classes[indices[keep]]
+
+
+def _merge_seam_polygons(
+    seam_polygons: np.ndarray,
+    seam_classes: np.ndarray,
+    polygons: np.ndarray,
+    classes: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge the seam polygons of a tile with the pending seam polygons of
+    the same class they touch. Polygons touching only at a corner are
+    kept apart, as 4-connected regions.
+    """
+    if len(polygons) == 0:
+        return seam_polygons, seam_classes
+
+    # Pending polygons touching a new polygon are merged with it
+    polygon_indices, seam_indices = shapely.STRtree(seam_polygons).query(
+        polygons, predicate="intersects"
+    )
+    same_class = classes[polygon_indices] == seam_classes[seam_indices]
+    touched = np.zeros(len(seam_polygons), dtype=bool)
+    touched[seam_indices[same_class]] = True
+
+    all_polygons = np.concatenate([seam_polygons[touched], polygons])
+    all_classes = np.concatenate([seam_classes[touched], classes])
+    merged_polygons, merged_classes = [seam_polygons[~touched]], [
+        seam_classes[~touched]
+    ]
+    for value in np.unique(all_classes).tolist():
+        parts = shapely.get_parts(shapely.union_all(all_polygons[all_classes == value]))
+        merged_polygons.append(parts)
+        merged_classes.append(np.full(len(parts), value, dtype=np.int64))
+    return np.concatenate(merged_polygons), np.concatenate(merged_classes)
@@ -2,32 +2,62 @@
 Filter out of bounds images.
 """
 
-from typing import List
+from typing import List, Literal, Union
+
+import numpy as np
+import shapely
 from shapely.geometry import Polygon
+
 from ..data import SatelliteImage
+from ..data.utils import prepare_reprojected
 
 
 def filter_oob(
     satellite_images: List[SatelliteImage],
     polygon_geometry: Polygon,
     crs: str,
-) -> List[SatelliteImage]:
+    return_type: Literal["images", "mask", "indices"] = "images",
+) -> Union[List[SatelliteImage], np.ndarray]:
     """
     Filter out images that are not within the bounds of a box.
 
+    The polygon is reprojected and prepared once per image CRS, and
+    intersections with all image boxes of that CRS are computed at once.
+
     Args:
         satellite_images (List[SatelliteImage]): List of satellite images.
         polygon_geometry (Polygon): Polygon.
         crs (str): EPSG of the bounds.
+        return_type (Literal["images", "mask", "indices"]): Whether to
+            return the list of images within the bounds, a boolean mask
+            or the indices of these images. Defaults to "images".
 
     Returns:
-        List[SatelliteImage]: List of satellite images within the bounds of the box.
+        Union[List[SatelliteImage], np.ndarray]: List of satellite images
+            within the bounds of the box, or their mask or indices.
     """
-    inbound_images = []
-    for satellite_image in satellite_images:
-        if satellite_image.intersects_polygon(
-            polygon_geometry,
-            crs,
-        ):
-            inbound_images.append(satellite_image)
-    return inbound_images
+    if return_type not in ["images", "mask", "indices"]:
+        raise ValueError('`return_type` must be "images", "mask" or "indices".')
+
+    image_crs = np.array([satellite_image.crs for satellite_image in satellite_images])
+    bounds = np.array(
+        [tuple(satellite_image.bounds) for satellite_image in satellite_images],
+        dtype=np.float64,
+    ).reshape(-1, 4)
+    boxes = shapely.box(*bounds.T)
+
+    mask = np.zeros(len(satellite_images), dtype=bool)
+    for target_crs in np.unique(image_crs):
+        crs_mask = image_crs == target_crs
+        geometry = prepare_reprojected(polygon_geometry, crs, target_crs)
+        mask[crs_mask] = shapely.intersects(boxes[crs_mask], geometry)
+
+    if return_type == "mask":
+        return mask
+    if return_type == "indices":
+        return np.flatnonzero(mask)
+    return [
+        satellite_image
+        for satellite_image, inbound in zip(satellite_images, mask)
+        if inbound
+    ]
@@ -10,6 +10,7 @@ from ..data import (
     DetectionLabeledSatelliteImage,
     ClassificationLabeledSatelliteImage,
 )
+from ..data.satellite_image import reproject_images
 import rasterio
 from rasterio.merge import merge
 from matplotlib import pyplot as plt
@@ -57,14 +58,13 @@ def make_mosaic_si(
     Returns:
         SatelliteImage: Mosaic of satellite images.
     """
-    # Check all images have same CRS
-    if len(satellite_images) == 1:
-        pass
-    else:
-        reference_crs = satellite_images[0].crs
-        for idx in range(1, len(satellite_images)):
-            if satellite_images[idx].crs != reference_crs:
-                return ValueError("Images must have the same CRS.")
+    # Reproject images to the CRS and resolution of the first image
+    reference_crs = satellite_images[0].crs
+    if any(image.crs != reference_crs for image in satellite_images):
+        transform = satellite_images[0].transform
+        satellite_images = reproject_images(
+            satellite_images, reference_crs, (abs(transform.a), abs(transform.e))
+        )
 
     # Create mosaic array from satellite images
     memory_files = []
@@ -122,14 +122,16 @@ def make_mosaic_lsi(
     Returns:
         SegmentationLabeledSatelliteImage: Mosaic of satellite images and labels.
     """
-    # Check all images have same CRS
-    if len(labelled_satellite_images) == 1:
-        pass
-    else:
-        reference_crs = labelled_satellite_images[0].satellite_image.crs
-        for idx in range(1, len(labelled_satellite_images)):
-            if labelled_satellite_images[idx].satellite_image.crs != reference_crs:
-                return ValueError("Images must have the same CRS.")
+    # Reproject images to the CRS and resolution of the first image
+    reference_crs = labelled_satellite_images[0].satellite_image.crs
+    transform = labelled_satellite_images[0].satellite_image.transform
+    resolution = (abs(transform.a), abs(transform.e))
+    labelled_satellite_images = [
+        lsi
+        if lsi.satellite_image.crs == reference_crs
+        else lsi.reproject(reference_crs, resolution)
+        for lsi in labelled_satellite_images
+    ]
 
     # Create mosaic array from satellite images
     memory_files = []
@@ -170,38 +172,57 @@ def make_mosaic_lsi(
         transform=out_transform,
     )
 
-    # Create mosaic array from labels
+    # Create mosaic array from labels, in the data type of the labels so that
+    # compact logits are not expanded. Quantized logits are dequantized to
+    # float32 only when their scales differ between images
+    logits = labelled_satellite_images[0].logits
+    logits_scale, logits_offset = None, 0.0
+    labels = [lsi.label for lsi in labelled_satellite_images]
+    if logits:
+        quantizations = {
+            (lsi.label.dtype, lsi.logits_scale, lsi.logits_offset)
+            for lsi in labelled_satellite_images
+        }
+        if len(quantizations) == 1:
+            _, logits_scale, logits_offset = quantizations.pop()
+        else:
+            labels = [lsi.get_logits() for lsi in labelled_satellite_images]
+    dtype = np.result_type(*{label.dtype for label in labels})
+    # Float16 is not supported by GTiff datasets
+    memfile_dtype = np.float32 if dtype == np.float16 else dtype
+
     memory_files = []
     raster_list = []
-    for i, image in enumerate(labelled_satellite_images):
+    for image, label in zip(labelled_satellite_images, labels):
         # Add one dimension if label is of shape (H*W)
-        label = (
-            np.expand_dims(image.label, axis=0)
-            if len(image.label.shape) == 2
-            else image.label
-        )
+        label = np.expand_dims(label, axis=0) if len(label.shape) == 2 else label
         memfile = rasterio.io.MemoryFile()
         with memfile.open(
             driver="GTiff",
             count=label.shape[0],
             height=label.shape[1],
             width=label.shape[2],
-            dtype=rasterio.float64,
+            dtype=memfile_dtype,
             crs=image.satellite_image.crs,
             transform=image.satellite_image.transform,
         ) as dataset:
-            dataset.write(label)
+            dataset.write(label.astype(memfile_dtype, copy=False))
         memory_files.append(memfile)
 
     for memfile in memory_files:
         raster_list.append(rasterio.open(memfile))
 
     mosaic_mask, out_transform = merge(raster_list)
-    mosaic_mask = np.squeeze(mosaic_mask)
+    mosaic_mask = mosaic_mask.astype(dtype, copy=False)
+    if not logits:
+        mosaic_mask = mosaic_mask[0]
 
-    logits = True if len(mosaic_mask.shape) == 3 else False
     mosaic_labelled = SegmentationLabeledSatelliteImage(
-        mosaic_image, np.squeeze(mosaic_mask), logits=logits
+        mosaic_image,
+        mosaic_mask,
+        logits=logits,
+        logits_scale=logits_scale,
+        logits_offset=logits_offset,
     )
 
     return mosaic_labelled
@@ -377,14 +398,11 @@ def plot_images_with_detection_label(
     segmented_images = []
     for labeled_image in labeled_satellite_images:
         segmentation_label = np.zeros(
-            (
-                labeled_image.satellite_image.array.shape[1],
-                labeled_image.satellite_image.array.shape[2],
-            )
+            labeled_image.satellite_image.shape[1:], dtype=np.uint8
         )
-        for bounding_box in labeled_image.label:
-            x0, y0, x1, y1 = bounding_box
-            segmentation_label[x0:x1, y0:y1] = 1
+        # x is the column and y the row, box coordinates are inclusive
+        for x0, y0, x1, y1 in labeled_image.label.tolist():
+            segmentation_label[y0 : y1 + 1, x0 : x1 + 1] = 1  # noqa: E203
         segmented_images.append(
             SegmentationLabeledSatelliteImage(
                 labeled_image.satellite_image,
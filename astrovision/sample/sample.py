@@ -3,9 +3,9 @@ Functions to sample from a list of satellite images.
 """
 
 from geopy.distance import geodesic
-from pyproj import Transformer
 from typing import List, Tuple
 from ..data import SatelliteImage
+from ..data.utils import get_transformer
 
 
 def compute_distance_to_point(
@@ -125,6 +125,5 @@ def project(coordinates: List[float], input_crs: str, output_crs: str) -> List[f
     Returns:
         List[float]: Reprojected coordinates.
     """
-    transformer = Transformer.from_crs(input_crs, output_crs)
-    input_lat, input_lon = coordinates
+    transformer = get_transformer(input_crs, output_crs)
     return transformer.transform(*coordinates)
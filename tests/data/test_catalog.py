@@ -0,0 +1,59 @@
+"""
+Tests for astrovision/data/catalog.py
+"""
+
+from datetime import date
+
+from astrovision.data.satellite_image import SatelliteImage
+from astrovision.data.catalog import ImageCatalog
+import shapely
+from shapely.geometry import box
+import pytest
+import numpy as np
+
+
+@pytest.fixture
+def tiles():
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    satellite_image = SatelliteImage.from_raster(
+        path, dep="976", date=date(2020, 5, 25), lazy=True
+    )
+    return satellite_image.split(500)
+
+
+def test_round_trip(tiles):
+    catalog = ImageCatalog.from_images(tiles)
+    assert len(catalog) == 16
+    assert catalog.bounds.shape == (16, 4)
+    assert catalog.file_paths == [tiles[0].reader.file_path]
+
+    images = catalog.to_images()
+    assert all(not image.is_loaded for image in images)
+    for image, tile in zip(images, tiles):
+        assert tuple(image.bounds) == tuple(tile.bounds)
+        assert image.transform == tile.transform
+        assert image.window == tile.window
+        assert image.crs == tile.crs
+        assert image.dep == "976"
+        assert image.date == date(2020, 5, 25)
+    np.testing.assert_array_equal(images[5].array, tiles[5].array)
+
+
+def test_selection(tiles):
+    tiles[0].dep, tiles[0].date = "974", date(2021, 1, 1)
+    catalog = ImageCatalog.from_images(tiles)
+
+    assert catalog.mask_deps(["974"]).nonzero()[0].tolist() == [0]
+    assert catalog.mask_dates(start=date(2020, 6, 1)).sum() == 1
+    assert catalog.mask_dates(end=date(2020, 12, 31)).sum() == 15
+
+    polygon = box(499300, 8599300, 499400, 8599400)
+    mask = catalog.mask_footprint(polygon, "EPSG:4471")
+    expected = [tile.intersects_polygon(polygon, "EPSG:4471") for tile in tiles]
+    assert mask.tolist() == expected
+    # The polygon of the caller is left untouched
+    assert not shapely.is_prepared(polygon)
+
+    subset = catalog.select(mask)
+    assert len(subset) == sum(expected)
+    assert subset.crs.tolist() == ["EPSG:4471"] * len(subset)
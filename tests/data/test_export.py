@@ -0,0 +1,77 @@
+"""
+Tests for astrovision/data/export.py
+"""
+
+from astrovision.data.satellite_image import SatelliteImage
+from astrovision.data.labeled_satellite_image import (
+    SegmentationLabeledSatelliteImage,
+)
+from astrovision.data.export import write_tiles
+from pathlib import Path
+import tempfile
+import pytest
+import numpy as np
+
+
+@pytest.fixture
+def satellite_image():
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    satellite_image = SatelliteImage.from_raster(path)
+    return satellite_image
+
+
+def test_write_tiles(satellite_image):
+    tiles = satellite_image.split(500)
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        manifest = write_tiles(
+            tiles, tmpdirname, naming="{left:.0f}_{top:.0f}", compress="DEFLATE"
+        )
+        assert len(manifest) == 16
+        assert len(list((Path(tmpdirname) / "images").glob("*.tif"))) == 16
+        for tile, paths in zip(tiles, manifest):
+            assert "label" not in paths
+            read_tile = SatelliteImage.from_raster(paths["image"])
+            assert np.array_equal(read_tile.array, tile.array)
+            assert read_tile.bounds == tuple(tile.bounds)
+
+
+def test_write_labeled_tiles(satellite_image):
+    label = np.zeros((2000, 2000), dtype=np.uint8)
+    label[:1000, :1000] = 1
+    labeled_tiles = SegmentationLabeledSatelliteImage(satellite_image, label).split(
+        1000
+    )
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        manifest = write_tiles(
+            labeled_tiles,
+            tmpdirname,
+            naming=lambda idx, image: f"tile_{idx}",
+            n_workers=2,
+            executor="process",
+        )
+        assert [Path(paths["image"]).name for paths in manifest] == [
+            f"tile_{idx}.tif" for idx in range(4)
+        ]
+        for labeled_tile, paths in zip(labeled_tiles, manifest):
+            assert np.array_equal(np.load(paths["label"]), labeled_tile.label)
+
+
+def test_write_tiles_options(satellite_image, monkeypatch):
+    tiles = satellite_image.split(1000)
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        with pytest.raises(ValueError):
+            write_tiles(tiles, tmpdirname, file_format=".jp2", compress="DEFLATE")
+
+        # Each worker compresses with its share of the CPUs
+        calls = []
+        monkeypatch.setattr(
+            SatelliteImage,
+            "to_raster_tif",
+            lambda self, file_path, **kwargs: calls.append(kwargs),
+        )
+        monkeypatch.setattr("os.cpu_count", lambda: 8)
+        write_tiles(tiles, tmpdirname, n_workers=4)
+        assert calls == [{"num_threads": "2"}] * 4
+        calls.clear()
+        write_tiles(tiles, tmpdirname, n_workers=4, num_threads=None)
+        assert calls == [{"num_threads": None}] * 4
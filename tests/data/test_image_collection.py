@@ -0,0 +1,78 @@
+"""
+Tests for astrovision/data/image_collection.py
+"""
+
+from astrovision.data.satellite_image import SatelliteImage
+from astrovision.data.image_collection import ImageCollection
+from astrovision.data.utils import get_transformer
+from shapely.geometry import box, Point
+import pytest
+import numpy as np
+
+
+@pytest.fixture
+def tiles():
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    # Bounds are (499000, 8599000, 500000, 8600000)
+    satellite_image = SatelliteImage.from_raster(path, lazy=True)
+    return satellite_image.split(500)
+
+
+def test_query(tiles):
+    collection = ImageCollection(tiles[:8], max_trees=2)
+    collection.query_box((499000, 8599000, 499100, 8599100), "EPSG:4471")
+    collection.extend(tiles[8:12])
+    collection.query_point((499000, 8599000), "EPSG:4471")
+    collection.extend(tiles[12:])
+    assert len(collection) == 16
+
+    polygon = box(499300, 8599300, 499400, 8599400)
+    indices = collection.query_polygon(polygon, "EPSG:4471")
+    expected_indices = [
+        idx
+        for idx, tile in enumerate(tiles)
+        if tile.intersects_polygon(polygon, "EPSG:4471")
+    ]
+    assert indices.tolist() == expected_indices
+    assert all(not tile.is_loaded for tile in collection)
+
+    indices = collection.query_point((499100.0, 8599900.0), "EPSG:4471")
+    assert indices.tolist() == [0]
+    # Points on shared edges belong to the tile on their right or below them
+    assert collection.query_point((499500.0, 8599500.0), "EPSG:4471").tolist() == [10]
+    assert collection.query_point((499250.0, 8599900.0), "EPSG:4471").tolist() == [1]
+    assert collection.query_point((500000.0, 8599000.0), "EPSG:4471").tolist() == [15]
+
+    # EPSG:4326 coordinates are in (latitude, longitude) order
+    lat, lon = get_transformer("EPSG:4471", "EPSG:4326").transform(499100.0, 8599900.0)
+    assert collection.query_point((lat, lon), "EPSG:4326").tolist() == [0]
+    polygon_4326 = Point(lat, lon).buffer(0.0001)
+    assert collection.query_polygon(polygon_4326, "EPSG:4326").tolist() == [0]
+    polygon_4326 = Point(lat + 0.01, lon).buffer(0.0001)
+    assert len(collection.query_polygon(polygon_4326, "EPSG:4326")) == 0
+
+
+def test_bulk_query(tiles):
+    collection = ImageCollection(tiles)
+    geometries = np.array(
+        [Point(499100.0, 8599900.0), Point(499900.0, 8599100.0), Point(0.0, 0.0)]
+    )
+    pairs = collection.query(geometries, "EPSG:4471")
+    assert pairs.tolist() == [[0, 1], [0, 15]]
+
+    sub_collection = collection.select(
+        collection.query_box(
+            (499000, 8599500, 500000, 8600000), "EPSG:4471", predicate="contains"
+        )
+    )
+    assert len(sub_collection) == 8
+
+
+def test_nearest(tiles):
+    collection = ImageCollection(tiles)
+    assert collection.nearest(Point(499100.0, 8600500.0), "EPSG:4471") == 0
+    nearest = collection.nearest(
+        np.array([Point(498000.0, 8599900.0), Point(501000.0, 8598000.0)]),
+        "EPSG:4471",
+    )
+    assert nearest.tolist() == [0, 15]
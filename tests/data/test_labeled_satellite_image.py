@@ -6,9 +6,12 @@ from astrovision.data.satellite_image import SatelliteImage
 from astrovision.data.labeled_satellite_image import (
     SegmentationLabeledSatelliteImage,
     DetectionLabeledSatelliteImage,
+    compute_classification_labels,
 )
+from astrovision.data.utils import reproject_geometries
 import pytest
 import numpy as np
+import shapely
 
 
 @pytest.fixture
@@ -141,3 +144,246 @@ def test_detection_to_classification(
         empty_detection_labeled_image.to_classification_labeled_image().label
     )
     assert classification_label == 0
+
+
+def test_reproject_segmentation():
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    satellite_image = SatelliteImage.from_raster(path)
+    label = np.zeros((2000, 2000), dtype=np.uint8)
+    label[:1000] = 2
+    labeled_image = SegmentationLabeledSatelliteImage(satellite_image, label)
+
+    reprojected = labeled_image.reproject("EPSG:4471", resolution=1.0)
+    assert reprojected.satellite_image.array.shape == (3, 1000, 1000)
+    assert reprojected.label.shape == (1000, 1000)
+    assert reprojected.label.dtype == np.uint8
+    assert set(np.unique(reprojected.label).tolist()) == {0, 2}
+
+
+def test_split_to_batch_segmentation():
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    satellite_image = SatelliteImage.from_raster(path)
+    label = np.arange(2000 * 2000, dtype=np.int32).reshape(2000, 2000)
+    labeled_image = SegmentationLabeledSatelliteImage(satellite_image, label)
+
+    for tile_length in [500, 600]:
+        images, labels, metadata = labeled_image.split_to_batch(tile_length)
+        tiles = labeled_image.split(tile_length)
+        assert images.shape == (len(tiles), 3, tile_length, tile_length)
+        assert labels.shape == (len(tiles), tile_length, tile_length)
+        for idx, tile in enumerate(tiles):
+            assert np.array_equal(images[idx], tile.satellite_image.array)
+            assert np.array_equal(labels[idx], tile.label)
+            assert tuple(metadata["bounds"][idx]) == tuple(tile.satellite_image.bounds)
+
+    logits = np.random.rand(4, 2000, 2000).astype(np.float32)
+    logits_image = SegmentationLabeledSatelliteImage(
+        satellite_image, logits, logits=True
+    )
+    tiles = logits_image.split(1000)
+    assert all(tile.logits for tile in tiles)
+    assert tiles[1].label.shape == (4, 1000, 1000)
+    assert np.array_equal(tiles[1].label, logits[:, :1000, 1000:])
+
+    _, labels, _ = logits_image.split_to_batch(1000)
+    assert labels.shape == (4, 4, 1000, 1000)
+    assert np.array_equal(labels[1], tiles[1].label)
+
+
+def test_split_detection():
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    satellite_image = SatelliteImage.from_raster(path)
+    rng = np.random.default_rng(0)
+    x0, y0 = rng.integers(0, 1950, size=(2, 1000))
+    x1, y1 = x0 + rng.integers(0, 50, size=1000), y0 + rng.integers(0, 50, size=1000)
+    boxes = np.stack([x0, y0, x1, y1], axis=1)
+    labeled_image = DetectionLabeledSatelliteImage(
+        satellite_image, [tuple(bounding_box) for bounding_box in boxes.tolist()]
+    )
+
+    for stride, min_visible_ratio in [(None, 0.0), (400, 0.5)]:
+        tiles = labeled_image.split(500, stride, min_visible_ratio)
+        for tile in tiles:
+            tile_transform = tile.satellite_image.transform
+            col_off, row_off = ~satellite_image.transform * (
+                tile_transform.c,
+                tile_transform.f,
+            )
+            col_off, row_off = round(col_off), round(row_off)
+            expected = []
+            for bx0, by0, bx1, by1 in boxes.tolist():
+                cx0, cy0 = max(bx0, col_off), max(by0, row_off)
+                cx1, cy1 = min(bx1, col_off + 499), min(by1, row_off + 499)
+                if cx0 > cx1 or cy0 > cy1:
+                    continue
+                area = (bx1 - bx0 + 1) * (by1 - by0 + 1)
+                if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) < min_visible_ratio * area:
+                    continue
+                expected.append(
+                    (cx0 - col_off, cy0 - row_off, cx1 - col_off, cy1 - row_off)
+                )
+            assert [tuple(box) for box in tile.label.tolist()] == expected
+    assert len(labeled_image.split(500, stride=400)) == 25
+
+
+def test_detection_label_array():
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    satellite_image = SatelliteImage.from_raster(path, lazy=True)
+    # Validation uses (height, width) and does not read pixels
+    satellite_image = satellite_image.crop((0, 1000), (0, 2000))
+    labeled_image = DetectionLabeledSatelliteImage(
+        satellite_image, [(1500, 10, 1999, 20)]
+    )
+    assert not satellite_image.is_loaded
+    assert labeled_image.label.shape == (1, 4)
+    with pytest.raises(ValueError):
+        DetectionLabeledSatelliteImage(satellite_image, [(10, 1500, 20, 1600)])
+
+    # 0.5 m pixels, top left corner at (499000, 8600000)
+    world_boxes = labeled_image.get_world_boxes()
+    assert world_boxes.tolist() == [[499750.0, 8599989.5, 500000.0, 8599995.0]]
+    round_trip = DetectionLabeledSatelliteImage.from_world_boxes(
+        satellite_image, world_boxes
+    )
+    assert np.array_equal(round_trip.label, labeled_image.label)
+
+    tensor = labeled_image.label_to_tensor()
+    assert tensor.shape == (1, 4)
+    assert tensor.data_ptr() == labeled_image.label.ctypes.data
+
+
+def test_compute_classification_labels():
+    labels = np.zeros((4, 10, 10), dtype=np.uint8)
+    labels[1, 0, 0] = 1
+    labels[2, :6] = 2
+    labels[3, :3] = 1
+    labels[3, 3:5] = 2
+
+    any_labels, histograms = compute_classification_labels(labels, "any")
+    assert any_labels.tolist() == [0, 1, 1, 1]
+    assert histograms.tolist() == [[100, 0, 0], [99, 1, 0], [40, 0, 60], [50, 30, 20]]
+    majority_labels, _ = compute_classification_labels(labels, "majority")
+    assert majority_labels.tolist() == [0, 0, 2, 0]
+    weighted_labels, _ = compute_classification_labels(
+        labels, "weighted", class_weights=np.array([1.0, 2.0])
+    )
+    assert weighted_labels.tolist() == [0, 0, 2, 1]
+    threshold_labels, _ = compute_classification_labels(
+        labels, "threshold", threshold=0.5
+    )
+    assert threshold_labels.tolist() == [0, 0, 1, 1]
+    with pytest.raises(ValueError):
+        compute_classification_labels(labels, "mean")
+
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    satellite_image = SatelliteImage.from_raster(path)
+    label = np.zeros((2000, 2000), dtype=np.uint8)
+    label[:10, :10] = 1
+    tiles = SegmentationLabeledSatelliteImage(satellite_image, label).split(1000)
+    (
+        images,
+        histograms,
+    ) = SegmentationLabeledSatelliteImage.to_classification_labeled_images(tiles)
+    assert [image.label for image in images] == [1, 0, 0, 0]
+    assert histograms[0].tolist() == [10**6 - 100, 100]
+    assert images[0].satellite_image is tiles[0].satellite_image
+
+    # Logits are converted to class IDs first
+    logits = np.zeros((2, 20, 20), dtype=np.float32)
+    logits[1, 5:15] = 1.0
+    logits_image = SegmentationLabeledSatelliteImage(
+        satellite_image.crop((0, 20), (0, 20)), logits, logits=True
+    )
+    _, histograms = compute_classification_labels([logits_image])
+    assert histograms.tolist() == [[200, 200]]
+    assert logits_image.to_classification_labeled_image("threshold").label == 1
+
+
+def test_from_geometries():
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    satellite_image = SatelliteImage.from_raster(path, lazy=True)
+    # 0.5 m pixels, top left corner at (499000, 8600000)
+    geometries = [
+        shapely.box(499000, 8599990, 499010, 8600000),
+        shapely.box(499240, 8599740, 499260, 8599760),
+        shapely.box(499005, 8599995, 499010, 8600000),
+    ]
+    labeled_image = SegmentationLabeledSatelliteImage.from_geometries(
+        satellite_image, geometries, "EPSG:4471", classes=[1, 2, 3]
+    )
+    assert not satellite_image.is_loaded
+    assert labeled_image.label.shape == (2000, 2000)
+    assert labeled_image.label.dtype == np.uint8
+    assert np.bincount(labeled_image.label.ravel()).tolist()[1:] == [300, 1600, 100]
+    # Later geometries are drawn over earlier ones
+    assert labeled_image.label[:10, 10:20].tolist() == [[3] * 10] * 10
+
+    tiles = SegmentationLabeledSatelliteImage.from_geometries_split(
+        satellite_image, geometries, "EPSG:4471", 300, classes=[1, 2, 3]
+    )
+    split_tiles = labeled_image.split(300)
+    assert len(tiles) == len(split_tiles)
+    for tile, split_tile in zip(tiles, split_tiles):
+        assert tile.satellite_image.bounds == split_tile.satellite_image.bounds
+        assert np.array_equal(tile.label, split_tile.label)
+
+    # Geometries are reprojected to the CRS of the image
+    geometries_4326 = reproject_geometries(
+        np.array(geometries[:1]), "EPSG:4471", "EPSG:4326"
+    )
+    reprojected_image = SegmentationLabeledSatelliteImage.from_geometries(
+        satellite_image, geometries_4326, "EPSG:4326"
+    )
+    assert abs(int(reprojected_image.label.sum()) - 400) <= 4
+
+
+def test_quantize_logits():
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    satellite_image = SatelliteImage.from_raster(path, lazy=True)
+    logits = np.random.randn(4, 2000, 2000).astype(np.float32)
+    labeled_image = SegmentationLabeledSatelliteImage(
+        satellite_image, logits, logits=True
+    )
+
+    quantized_image = labeled_image.quantize_logits(np.uint8)
+    assert quantized_image.label.dtype == np.uint8
+    assert quantized_image.label.nbytes == logits.nbytes // 4
+    dequantized = quantized_image.get_logits()
+    assert dequantized.dtype == np.float32
+    assert np.abs(dequantized - logits).max() <= quantized_image.logits_scale / 2 + 1e-5
+    # Class IDs only differ where logits are closer than the quantization step
+    sorted_logits = np.sort(logits, axis=0)
+    clear = sorted_logits[-1] - sorted_logits[-2] > quantized_image.logits_scale
+    assert np.array_equal(
+        quantized_image.class_ids[clear], labeled_image.class_ids[clear]
+    )
+    assert quantized_image.class_ids is quantized_image.class_ids
+    assert quantized_image.confidence.dtype == np.float32
+    assert np.allclose(
+        quantized_image.confidence,
+        logits.max(axis=0),
+        atol=quantized_image.logits_scale,
+    )
+
+    tiles = quantized_image.split(1000)
+    assert tiles[1].label.dtype == np.uint8
+    assert tiles[1].logits_scale == quantized_image.logits_scale
+    assert np.array_equal(tiles[1].get_logits(), dequantized[:, :1000, 1000:])
+
+    float16_image = labeled_image.quantize_logits(np.float16)
+    assert float16_image.label.dtype == np.float16
+    assert float16_image.logits_scale is None
+    assert np.allclose(float16_image.get_logits(), logits, atol=1e-2)
+
+    # Changing the label resets cached maps
+    quantized_image.label = np.zeros((4, 2000, 2000), dtype=np.uint8)
+    assert not quantized_image.class_ids.any()
+
+    with pytest.raises(ValueError):
+        SegmentationLabeledSatelliteImage(
+            satellite_image, quantized_image.label, logits=True
+        )
+    with pytest.raises(ValueError):
+        SegmentationLabeledSatelliteImage(
+            satellite_image, logits, logits=True, logits_scale=0.1
+        )
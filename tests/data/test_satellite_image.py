@@ -4,9 +4,13 @@ Tests for astrovision/data/satellite_image.py
 
 from astrovision.data.satellite_image import (
     SatelliteImage,
+    iter_tiles,
+    reproject_images,
 )
 from osgeo import ogr
 from shapely.wkt import loads
+import os
+import pickle
 import tempfile
 import pytest
 from pathlib import Path
@@ -45,6 +49,67 @@ def test_cast_to_float(satellite_image):
     assert np.all((satellite_image.array >= 0) & (satellite_image.array <= 1))
 
 
+def test_from_raster_lazy(satellite_image):
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    lazy_image = SatelliteImage.from_raster(path, lazy=True)
+    assert not lazy_image.is_loaded
+    assert lazy_image.shape == (3, 2000, 2000)
+    assert lazy_image.bounds == satellite_image.bounds
+    assert lazy_image.transform == satellite_image.transform
+
+    assert np.array_equal(lazy_image.array, satellite_image.array)
+    assert lazy_image.is_loaded
+
+
+def test_split_lazy(satellite_image):
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    lazy_image = SatelliteImage.from_raster(path, lazy=True)
+    tiles = lazy_image.split(1500)
+    eager_tiles = satellite_image.split(1500)
+    assert len(tiles) == 4
+    assert not lazy_image.is_loaded
+    for tile, eager_tile in zip(tiles, eager_tiles):
+        assert not tile.is_loaded
+        assert tile.shape == (3, 1500, 1500)
+        assert tile.transform == eager_tile.transform
+        assert tile.bounds == eager_tile.bounds
+        assert np.array_equal(tile.array, eager_tile.array)
+
+
+def test_crop_lazy(satellite_image):
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    lazy_image = SatelliteImage.from_raster(path, lazy=True)
+    crop = lazy_image.crop((100, 300), (50, 250)).crop((10, 20), (0, 30))
+    assert crop.window == (110, 50, 10, 30)
+    assert np.array_equal(crop.array, satellite_image.array[:, 110:120, 50:80])
+    assert crop.to_tensor().size() == torch.Size([3, 10, 30])
+
+
+def test_cast_to_float_dtype(satellite_image):
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    float_image = SatelliteImage.from_raster(path, cast_to_float=True)
+    assert float_image.array.dtype == np.float32
+    assert np.allclose(float_image.array, satellite_image.array / 255.0)
+
+    float_image = SatelliteImage.from_raster(path, cast_to_float=True, dtype=np.float64)
+    assert float_image.array.dtype == np.float64
+
+
+def test_from_raster_bands(satellite_image):
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    assert satellite_image.array.dtype == np.uint8
+
+    image = SatelliteImage.from_raster(path, bands_indices=[2, 0])
+    assert image.array.shape == (2, 2000, 2000)
+    assert np.array_equal(image.array, satellite_image.array[[2, 0]])
+
+    image = SatelliteImage.from_raster(path, n_bands=2, lazy=True)
+    assert image.shape == (2, 2000, 2000)
+    assert np.array_equal(
+        image.split(1000)[0].array, satellite_image.array[:2, :1000, :1000]
+    )
+
+
 def test_split(satellite_image):
     # 1st split
     tiles = satellite_image.split(1000)
@@ -59,6 +124,49 @@ def test_split(satellite_image):
         assert tile.array.shape == (3, 1500, 1500)
 
 
+def test_iter_tiles(satellite_image):
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    for tile_length in [500, 1500]:
+        tiles = list(iter_tiles(path, tile_length))
+        eager_tiles = satellite_image.split(tile_length)
+        assert len(tiles) == len(eager_tiles)
+        for tile, eager_tile in zip(tiles, eager_tiles):
+            assert tile.is_loaded
+            assert tile.transform == eager_tile.transform
+            assert tile.bounds == eager_tile.bounds
+            assert np.array_equal(tile.array, eager_tile.array)
+
+    tiles = list(satellite_image.iter_tiles(1000))
+    assert len(tiles) == 4
+
+
+def test_split_to_batch(satellite_image):
+    for tile_length in [500, 1500]:
+        batch, metadata = satellite_image.split_to_batch(tile_length)
+        tiles = satellite_image.split(tile_length)
+        assert batch.shape == (len(tiles), 3, tile_length, tile_length)
+        assert batch.flags["C_CONTIGUOUS"]
+        assert metadata["indices"].shape == (len(tiles), 4)
+        for idx, tile in enumerate(tiles):
+            assert np.array_equal(batch[idx], tile.array)
+            assert np.allclose(metadata["bounds"][idx], tile.bounds)
+            assert np.allclose(metadata["transforms"][idx], tile.transform[:6])
+
+    batch, _ = satellite_image.split_to_batch(
+        1000, bands_indices=[2, 0], dtype=np.float32
+    )
+    assert batch.shape == (4, 2, 1000, 1000)
+    assert batch.dtype == np.float32
+    assert np.array_equal(batch[3, 0], satellite_image.array[2, 1000:, 1000:])
+
+
+def test_to_tensor_batch(satellite_image):
+    tensor, metadata = satellite_image.to_tensor_batch(500, bands_indices=[0])
+    assert isinstance(tensor, torch.Tensor)
+    assert tensor.size() == torch.Size([16, 1, 500, 500])
+    assert len(metadata["bounds"]) == 16
+
+
 def test_to_tensor(satellite_image):
     # 1st tensor conversion
     tensor = satellite_image.to_tensor(bands_indices=None)
@@ -78,11 +186,94 @@ def test_normalize(satellite_image):
     assert np.all((normalized_array >= 0) & (normalized_array <= 1))
 
 
+def test_get_quantiles(satellite_image):
+    expected_quantiles = np.quantile(satellite_image.array.reshape(3, -1), 0.97, axis=1)
+    quantiles = satellite_image.get_quantiles(0.97)
+    assert np.allclose(quantiles, expected_quantiles)
+    # Quantiles are cached until the array is accessed or reassigned
+    assert satellite_image.get_quantiles(0.97) is quantiles
+    satellite_image.array = satellite_image.array.astype(np.uint16)
+    assert satellite_image.get_quantiles(0.97) is not quantiles
+    assert np.allclose(satellite_image.get_quantiles(0.97), expected_quantiles)
+
+    # In-place changes through `array` are seen by cached statistics
+    image = SatelliteImage(
+        np.arange(100, dtype=np.uint8).reshape(1, 10, 10),
+        satellite_image.crs,
+        None,
+        satellite_image.transform,
+    )
+    assert image.get_quantiles(0.5).tolist() == [49.5]
+    image.array[:, :5] = 0
+    assert image.get_quantiles(0.5).tolist() == [25.0]
+
+
+def test_normalize_float32_inplace(satellite_image):
+    normalized_image = satellite_image.normalize(dtype=np.float32)
+    assert normalized_image.array.dtype == np.float32
+
+    float_image = SatelliteImage(
+        satellite_image.array.astype(np.float64),
+        satellite_image.crs,
+        satellite_image.bounds,
+        satellite_image.transform,
+    )
+    float_array = float_image.array
+    assert float_image.normalize(inplace=True) is float_image
+    assert float_image.array is float_array
+    assert np.allclose(float_image.array, normalized_image.array, atol=1e-6)
+
+    with pytest.raises(ValueError):
+        satellite_image.normalize(inplace=True)
+
+
 def test_copy(satellite_image):
     copy = satellite_image.copy()
     assert np.all(satellite_image.array == copy.array)
 
 
+def test_copy(satellite_image):
+    array = satellite_image.array
+    copy = satellite_image.copy()
+    # Pixels are shared until an image hands out its array for writing
+    assert copy._array is array
+    copy.normalize()
+    assert copy._array is array
+    with pytest.raises(ValueError):
+        array[0, 0, 0] = 0
+
+    value = satellite_image.array[0, 0, 0]
+    copy.array[0, 0, 0] = 255 - value
+    assert copy._array is not array
+    assert satellite_image.array[0, 0, 0] == value
+    satellite_image.array[0, 0, 1] = 255 - copy.array[0, 0, 1]
+    assert copy.array[0, 0, 1] != satellite_image.array[0, 0, 1]
+
+    # Copies of lazy images do not read pixels
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    lazy_image = SatelliteImage.from_raster(path, lazy=True)
+    assert not lazy_image.copy().is_loaded
+
+
+def test_lazy_bounds(satellite_image):
+    assert not hasattr(satellite_image, "__dict__")
+    assert tuple(satellite_image.bounds) == (499000, 8599000, 500000, 8600000)
+
+    tile = satellite_image.crop((1000, 1500), (500, 1000))
+    assert tuple(tile.bounds) == (499250, 8599250, 499500, 8599500)
+
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    for lazy in [False, True]:
+        channels_last = SatelliteImage.from_raster(
+            path, channels_first=False, lazy=lazy
+        )
+        assert tuple(channels_last.bounds) == (499000, 8599000, 500000, 8600000)
+
+    tile = pickle.loads(pickle.dumps(tile))
+    assert tuple(tile.bounds) == (499250, 8599250, 499500, 8599500)
+    assert tile.array.shape == (3, 500, 500)
+
+
 def test_to_raster(satellite_image):
     with tempfile.TemporaryDirectory() as tmpdirname:
         # .jp2 file
@@ -95,15 +286,33 @@ def test_to_raster(satellite_image):
         assert read_image.array.shape == (3, 2000, 2000)
 
         # .tif file
-        # TODO: run this test but this requires fixing install
-        # issues
-        # file_name = Path(tmpdirname) / "tmp.tif"
-        # file_name = file_name.absolute().as_posix()
-        # satellite_image.to_raster(file_name)
+        file_name = Path(tmpdirname) / "tmp.tif"
+        file_name = file_name.absolute().as_posix()
+        satellite_image.to_raster(file_name)
+
+        read_image = SatelliteImage.from_raster(file_name)
+        assert isinstance(read_image, SatelliteImage)
+        assert read_image.array.shape == (3, 2000, 2000)
+        assert read_image.array.dtype == satellite_image.array.dtype
+
+
+def test_to_raster_tif_options(satellite_image):
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        uncompressed_file = (Path(tmpdirname) / "tmp.tif").as_posix()
+        satellite_image.to_raster_tif(uncompressed_file)
 
-        # read_image = SatelliteImage.from_raster(file_name)
-        # assert isinstance(read_image, SatelliteImage)
-        # assert read_image.array.shape == (3, 2000, 2000)
+        for options in [
+            {"compress": "DEFLATE", "tiled": True, "block_size": 512},
+            {"compress": "ZSTD", "cog": True},
+        ]:
+            file_name = (Path(tmpdirname) / "tiled" / "tmp.tif").as_posix()
+            satellite_image.to_raster_tif(file_name, **options)
+            assert os.path.getsize(file_name) < os.path.getsize(uncompressed_file)
+
+            read_image = SatelliteImage.from_raster(file_name)
+            assert np.array_equal(read_image.array, satellite_image.array)
+            assert read_image.crs == satellite_image.crs
+            assert read_image.transform == satellite_image.transform
 
 
 def test_intersects_box_1(
@@ -185,3 +394,45 @@ def test_contains_point_2(
     crs = "EPSG:4471"
 
     assert not satellite_image_land.contains(coordinates=coordinates, crs=crs)
+
+
+def test_reproject(satellite_image):
+    resampled_image = satellite_image.reproject("EPSG:4471", resolution=1.0)
+    assert resampled_image.array.shape == (3, 1000, 1000)
+    assert resampled_image.array.dtype == satellite_image.array.dtype
+    assert tuple(resampled_image.bounds) == tuple(satellite_image.bounds)
+
+    reprojected_image = satellite_image.reproject("EPSG:32738", resolution=0.5)
+    assert reprojected_image.crs == "EPSG:32738"
+    assert reprojected_image.transform.a == 0.5
+    assert reprojected_image.intersects_box(satellite_image.bounds, "EPSG:4471")
+
+    tiles = satellite_image.split(1000)
+    tiles[1] = tiles[1].reproject("EPSG:32738")
+    reprojected_tiles = reproject_images(tiles, "EPSG:4471", 0.5, n_workers=2)
+    assert reprojected_tiles[0] is tiles[0]
+    assert all(tile.crs == "EPSG:4471" for tile in reprojected_tiles)
+    assert reproject_images(tiles[:1], "EPSG:4471", [0.5, 0.5 + 1e-12])[0] is tiles[0]
+
+
+def test_overviews(satellite_image, tmp_path):
+    file_path = str(tmp_path / "overviews.tif")
+    satellite_image.to_raster_tif(file_path, tiled=True, overviews=[2, 4])
+
+    overview_image = SatelliteImage.from_raster(file_path, lazy=True, overview_level=0)
+    assert overview_image.shape == (3, 1000, 1000)
+    assert overview_image.transform.a == 1.0
+    assert tuple(overview_image.bounds) == tuple(satellite_image.bounds)
+    assert overview_image.array.shape == (3, 1000, 1000)
+
+    assert SatelliteImage.from_raster(file_path, resolution=2.0).shape == (3, 500, 500)
+    assert SatelliteImage.from_raster(file_path, resolution=1.5).shape == (
+        3,
+        1000,
+        1000,
+    )
+    assert SatelliteImage.from_raster(file_path, resolution=0.5).shape == (
+        3,
+        2000,
+        2000,
+    )
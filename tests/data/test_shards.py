@@ -0,0 +1,80 @@
+"""
+Tests for astrovision/data/shards.py
+"""
+
+from datetime import date, datetime
+
+from astrovision.data.satellite_image import SatelliteImage
+from astrovision.data.labeled_satellite_image import (
+    SegmentationLabeledSatelliteImage,
+    DetectionLabeledSatelliteImage,
+    ClassificationLabeledSatelliteImage,
+)
+from astrovision.data.shards import ShardWriter, ShardReader
+import pytest
+import numpy as np
+
+
+@pytest.fixture
+def labeled_images():
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    satellite_image = SatelliteImage.from_raster(
+        path, dep="976", date=date(2020, 5, 25)
+    )
+    tiles = satellite_image.split(500)
+    labeled_images = []
+    for idx, tile in enumerate(tiles[:7]):
+        if idx % 3 == 0:
+            label = np.full((500, 500), idx, dtype=np.uint8)
+            labeled_images.append(
+                SegmentationLabeledSatelliteImage(
+                    tile, label, "RIL", datetime(2021, 1, 1, 12)
+                )
+            )
+        elif idx % 3 == 1:
+            label = [(0, 0, 10, 10), (idx, idx, 100, 200)]
+            labeled_images.append(DetectionLabeledSatelliteImage(tile, label))
+        else:
+            labeled_images.append(ClassificationLabeledSatelliteImage(tile, 1))
+    return labeled_images
+
+
+def assert_equal(labeled_image, expected):
+    assert type(labeled_image) is type(expected)
+    image, expected_image = labeled_image.satellite_image, expected.satellite_image
+    np.testing.assert_array_equal(image.array, expected_image.array)
+    assert image.crs == expected_image.crs
+    assert tuple(image.bounds) == tuple(expected_image.bounds)
+    assert image.transform == expected_image.transform
+    assert image.dep == expected_image.dep
+    assert image.date == expected_image.date
+    assert labeled_image.source == expected.source
+    assert labeled_image.labeling_date == expected.labeling_date
+    if isinstance(expected, ClassificationLabeledSatelliteImage):
+        assert labeled_image.label == expected.label
+    else:
+        np.testing.assert_array_equal(labeled_image.label, expected.label)
+        assert labeled_image.label.dtype == expected.label.dtype
+
+
+def test_shards(tmp_path, labeled_images):
+    with ShardWriter(str(tmp_path), max_samples=3) as writer:
+        for labeled_image in labeled_images:
+            writer.write(labeled_image)
+    assert writer.shards == [
+        "shard-000000.tar",
+        "shard-000001.tar",
+        "shard-000002.tar",
+    ]
+
+    reader = ShardReader(str(tmp_path))
+    assert len(reader) == 7
+    for labeled_image, expected in zip(reader, labeled_images):
+        assert_equal(labeled_image, expected)
+    for idx in [5, 0, 6, 3]:
+        assert_equal(reader[idx], labeled_images[idx])
+
+    samples = list(reader.iter_shards([1]))
+    assert len(samples) == 3
+    assert_equal(samples[0], labeled_images[3])
+    reader.close()
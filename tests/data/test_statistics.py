@@ -0,0 +1,95 @@
+"""
+Tests for astrovision/data/statistics.py
+"""
+
+from astrovision.data.satellite_image import SatelliteImage
+from astrovision.data.statistics import (
+    RadiometricStatistics,
+    compute_statistics,
+)
+import pytest
+import numpy as np
+
+
+@pytest.fixture
+def satellite_image():
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    satellite_image = SatelliteImage.from_raster(path)
+    return satellite_image
+
+
+def test_compute_statistics(satellite_image):
+    tiles = satellite_image.split(500)
+    statistics = compute_statistics(tiles, n_workers=4)
+
+    bands = satellite_image.array.reshape(3, -1)
+    assert np.array_equal(statistics.count, [bands.shape[1]] * 3)
+    assert np.allclose(statistics.mean, bands.mean(axis=1))
+    assert np.allclose(statistics.std, bands.std(axis=1))
+    assert np.array_equal(statistics.min, bands.min(axis=1))
+    assert np.array_equal(statistics.max, bands.max(axis=1))
+    assert np.allclose(statistics.quantile(0.97), np.quantile(bands, 0.97, axis=1))
+
+
+def test_statistics_from_raster(satellite_image):
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    statistics = RadiometricStatistics().update(path, strip_height=300)
+    image_statistics = RadiometricStatistics().update(satellite_image)
+    assert np.array_equal(statistics.histograms, image_statistics.histograms)
+    assert np.allclose(statistics.std, image_statistics.std)
+
+    # Lazy images are read by strips and are not loaded
+    lazy_tile = SatelliteImage.from_raster(path, lazy=True).split(1000)[-1]
+    lazy_statistics = RadiometricStatistics().update(lazy_tile, strip_height=300)
+    assert not lazy_tile.is_loaded
+    tile_statistics = RadiometricStatistics().update(satellite_image.split(1000)[-1])
+    assert np.array_equal(lazy_statistics.histograms, tile_statistics.histograms)
+    assert np.allclose(lazy_statistics.std, tile_statistics.std)
+
+
+def test_merge_float_statistics(satellite_image):
+    tiles = [
+        SatelliteImage(tile.array / 255.0, tile.crs, tile.bounds, tile.transform)
+        for tile in satellite_image.split(1000)
+    ]
+    statistics = RadiometricStatistics(n_bins=1024).update(tiles[0])
+    other_statistics = compute_statistics(tiles[1:], n_bins=1024)
+    statistics.merge(other_statistics)
+
+    bands = satellite_image.array.reshape(3, -1) / 255.0
+    assert np.allclose(statistics.mean, bands.mean(axis=1))
+    assert np.allclose(statistics.std, bands.std(axis=1))
+    assert np.allclose(
+        statistics.quantile(0.97), np.quantile(bands, 0.97, axis=1), atol=1 / 1024
+    )
+
+    with pytest.raises(ValueError):
+        statistics.merge(compute_statistics(satellite_image.split(1000)))
+
+
+def test_statistics_with_nan(satellite_image):
+    array = satellite_image.array / 255.0
+    array[:, :100] = np.nan
+    array[2] = np.nan
+    image = SatelliteImage(
+        array, satellite_image.crs, satellite_image.bounds, satellite_image.transform
+    )
+    statistics = compute_statistics(image.split(500), n_workers=4)
+
+    bands = array[:2, 100:].reshape(2, -1)
+    assert np.array_equal(statistics.count, [bands.shape[1]] * 2 + [0])
+    assert np.allclose(statistics.mean[:2], bands.mean(axis=1))
+    assert np.allclose(statistics.std[:2], bands.std(axis=1))
+    assert np.array_equal(statistics.min[:2], bands.min(axis=1))
+    assert np.array_equal(statistics.max[:2], bands.max(axis=1))
+    assert np.array_equal(statistics.histograms.sum(axis=1), statistics.count)
+
+
+def test_normalize_with_statistics(satellite_image):
+    statistics = compute_statistics([satellite_image])
+    normalized_image = satellite_image.normalize(statistics=statistics)
+    assert np.allclose(normalized_image.array, satellite_image.normalize().array)
+
+    tile = satellite_image.split(500)[-1]
+    normalized_tile = tile.normalize(statistics=statistics)
+    assert np.allclose(normalized_tile.array, normalized_image.array[:, 1500:, 1500:])
@@ -0,0 +1,60 @@
+"""
+Tests for astrovision/data/tile_store.py
+"""
+
+import os
+from datetime import date
+
+from astrovision.data.satellite_image import SatelliteImage
+from astrovision.data.tile_store import TileStore
+import numpy as np
+
+
+def test_tile_store(tmp_path):
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    satellite_image = SatelliteImage.from_raster(path)
+    store = TileStore(str(tmp_path / "store"))
+
+    image = store.get(path, dep="976", date=date(2020, 5, 25))
+    assert isinstance(image.array, np.memmap)
+    np.testing.assert_array_equal(image.array, satellite_image.array)
+    assert image.crs == satellite_image.crs
+    assert tuple(image.bounds) == tuple(satellite_image.bounds)
+    assert image.transform == satellite_image.transform
+
+    # Reloads come from the store, with the stored dep and date
+    reloaded = store.get(path)
+    assert isinstance(reloaded.array, np.memmap)
+    assert reloaded.dep == "976"
+    assert reloaded.date == date(2020, 5, 25)
+    assert len(os.listdir(tmp_path / "store")) == 2
+
+    # Options give separate entries
+    float_image = store.get(path, bands_indices=[0], cast_to_float=True)
+    assert float_image.array.shape == (1, 2000, 2000)
+    assert float_image.array.dtype == np.float32
+    assert len(os.listdir(tmp_path / "store")) == 4
+
+    store.invalidate(path)
+    assert os.listdir(tmp_path / "store") == []
+
+
+def test_tile_store_invalidation(tmp_path):
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    satellite_image = SatelliteImage.from_raster(path)
+    source_path = str(tmp_path / "image.tif")
+    satellite_image.to_raster_tif(source_path)
+
+    for validation in ["mtime", "hash"]:
+        store = TileStore(str(tmp_path / validation), validation=validation)
+        np.testing.assert_array_equal(
+            store.get(source_path).array, satellite_image.array
+        )
+
+    satellite_image.array = 255 - satellite_image.array
+    satellite_image.to_raster_tif(source_path, compress="DEFLATE")
+    for validation in ["mtime", "hash"]:
+        store = TileStore(str(tmp_path / validation), validation=validation)
+        np.testing.assert_array_equal(
+            store.get(source_path).array, satellite_image.array
+        )
@@ -3,12 +3,20 @@ Tests for astrovision/data/utils.py
 """
 
 from astrovision.data.utils import (
+    compute_class_histograms,
     generate_tiles_borders,
+    generate_tiles_grid,
     get_bounds_for_tile,
+    get_bounds_for_tiles,
     get_transform_for_tile,
+    get_transformer,
+    get_transformer_cache_info,
+    get_transforms_for_tiles,
 )
 from collections import Counter
+import pytest
 from affine import Affine
+import numpy as np
 
 
 def test_generate_tiles_borders():
@@ -76,3 +84,83 @@ def test_get_transform_for_tile():
     tile_transform = get_transform_for_tile(transform, row, col)
     awaited_tile_transform = Affine.translation(3, 3)
     assert tile_transform == awaited_tile_transform
+
+
+def test_generate_tiles_grid():
+    # The last column of tiles is shifted back to fit in the image
+    assert generate_tiles_grid(6, 5, 2).tolist() == [
+        [0, 2, 0, 2],
+        [0, 2, 2, 4],
+        [0, 2, 3, 5],
+        [2, 4, 0, 2],
+        [2, 4, 2, 4],
+        [2, 4, 3, 5],
+        [4, 6, 0, 2],
+        [4, 6, 2, 4],
+        [4, 6, 3, 5],
+    ]
+    # As is the last row
+    assert generate_tiles_grid(5, 4, 2).tolist() == [
+        [0, 2, 0, 2],
+        [0, 2, 2, 4],
+        [2, 4, 0, 2],
+        [2, 4, 2, 4],
+        [3, 5, 0, 2],
+        [3, 5, 2, 4],
+    ]
+
+
+def test_get_bounds_and_transforms_for_tiles():
+    transform = Affine(0.5, 0.1, 500000.0, 0.2, -0.5, 8600000.0)
+    grid = generate_tiles_grid(10, 7, 3)
+    bounds = get_bounds_for_tiles(transform, grid)
+    transforms = get_transforms_for_tiles(transform, grid)
+    assert bounds.shape == (len(grid), 4)
+    assert transforms.shape == (len(grid), 6)
+    for (row_min, row_max, col_min, col_max), tile_bounds, tile_transform in zip(
+        grid.tolist(), bounds, transforms
+    ):
+        assert np.allclose(
+            tile_bounds,
+            get_bounds_for_tile(transform, (row_min, row_max), (col_min, col_max)),
+        )
+        assert Affine(*tile_transform).almost_equals(
+            get_transform_for_tile(transform, row_min, col_min)
+        )
+
+
+def test_get_transformer():
+    get_transformer.cache_clear()
+    transformer = get_transformer("EPSG:4471", "EPSG:4326")
+    assert get_transformer("EPSG:4471", "EPSG:4326") is transformer
+    assert get_transformer("EPSG:4326", "EPSG:4471") is not transformer
+
+    cache_info = get_transformer_cache_info()["transformer"]
+    assert cache_info.hits == 1
+    assert cache_info.misses == 2
+
+    lat, lon = transformer.transform(509500.0, 8592500.0)
+    assert -13 < lat < -12
+    assert 45 < lon < 46
+
+
+def test_generate_tiles_grid_stride():
+    grid = generate_tiles_grid(10, 7, 4, stride=2)
+    assert grid[:, 0].tolist() == [0] * 3 + [2] * 3 + [4] * 3 + [6] * 3
+    assert grid[:, 2].tolist() == [0, 2, 3] * 4
+
+
+def test_compute_class_histograms():
+    labels = np.random.randint(0, 5, size=(7, 30, 20)).astype(np.uint8)
+    expected = np.stack([np.bincount(label.ravel(), minlength=5) for label in labels])
+    # Chunks smaller than a tile still count each tile in one pass
+    for chunk_size in [100, 1000, 2**22]:
+        histograms = compute_class_histograms(labels, chunk_size=chunk_size)
+        assert np.array_equal(histograms, expected)
+
+    histograms = compute_class_histograms(list(labels[:, :10]), n_classes=8)
+    assert histograms.shape == (7, 8)
+    assert histograms.sum(axis=1).tolist() == [200] * 7
+
+    with pytest.raises(ValueError):
+        compute_class_histograms(labels, n_classes=3)
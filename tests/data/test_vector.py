@@ -0,0 +1,120 @@
+"""
+Tests for astrovision/data/vector.py
+"""
+
+import numpy as np
+import pytest
+import shapely
+from osgeo import ogr
+
+from astrovision.data.labeled_satellite_image import SegmentationLabeledSatelliteImage
+from astrovision.data.satellite_image import SatelliteImage
+from astrovision.data.vector import polygonize_tiles
+
+
+@pytest.fixture
+def labeled_image():
+    path = "tests/test_data/ORT_2020052526656219_0499_8600_U38S_8Bits.jp2"
+    satellite_image = SatelliteImage.from_raster(path, lazy=True)
+    label = np.zeros((2000, 2000), dtype=np.uint8)
+    # Inside a 500 x 500 tile
+    label[100:200, 100:200] = 1
+    # Across a vertical seam, and across a corner of four tiles
+    label[300:350, 450:560] = 1
+    label[950:1050, 950:1050] = 2
+    # Ring across a seam, whose hole is in another tile
+    label[400:700, 1400:1700] = 1
+    label[550:650, 1500:1600] = 0
+    # Across all rows of tiles
+    label[:, 1900:1910] = 2
+    # Touching at a corner, along a seam
+    label[1490:1500, 1920:1930] = 2
+    label[1500:1510, 1930:1940] = 2
+    return SegmentationLabeledSatelliteImage(satellite_image, label)
+
+
+def read_polygons(file_path):
+    layer = ogr.GetDriverByName("GPKG").Open(file_path, 0).GetLayer()
+    polygons, classes = [], []
+    feature = layer.GetNextFeature()
+    while feature is not None:
+        polygons.append(shapely.from_wkt(feature.GetGeometryRef().ExportToWkt()))
+        classes.append(feature.GetField("class"))
+        feature = layer.GetNextFeature()
+    return np.array(polygons, dtype=object), np.array(classes)
+
+
+def test_polygonize(labeled_image):
+    polygons, classes = labeled_image.polygonize()
+    assert sorted(classes.tolist()) == [1, 1, 1, 2, 2, 2, 2]
+    # 0.5 m pixels, top left corner at (499000, 8600000)
+    assert polygons[0].equals(shapely.box(499050, 8599900, 499100, 8599950))
+    assert sorted(shapely.area(polygons).tolist()) == [
+        25.0,
+        25.0,
+        1375.0,
+        2500.0,
+        2500.0,
+        5000.0,
+        20000.0,
+    ]
+
+
+def test_polygonize_tiles(labeled_image, tmp_path):
+    file_path = str(tmp_path / "labels.gpkg")
+    tiles = labeled_image.split(500)
+    count = polygonize_tiles(tiles, file_path)
+    assert count == 7
+
+    polygons, classes = read_polygons(file_path)
+    expected_polygons, expected_classes = labeled_image.polygonize()
+    order = np.lexsort(
+        (shapely.bounds(polygons)[:, 0], shapely.area(polygons), classes)
+    )
+    expected_order = np.lexsort(
+        (
+            shapely.bounds(expected_polygons)[:, 0],
+            shapely.area(expected_polygons),
+            expected_classes,
+        )
+    )
+    assert classes[order].tolist() == expected_classes[expected_order].tolist()
+    for polygon, expected_polygon in zip(
+        polygons[order], expected_polygons[expected_order]
+    ):
+        assert polygon.normalize().equals(expected_polygon)
+
+    with pytest.raises(ValueError):
+        polygonize_tiles(tiles, str(tmp_path / "labels.txt"))
+    with pytest.raises(ValueError):
+        polygonize_tiles(tiles[::-1], file_path)
+
+
+def test_polygonize_tiles_corner(labeled_image, tmp_path):
+    # Pixels touching at a corner across seams are distinct 4-connected regions
+    satellite_image = labeled_image.satellite_image.crop((0, 4), (0, 4))
+    label = np.array(
+        [[0, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 0]], dtype=np.uint8
+    )
+    tiles = SegmentationLabeledSatelliteImage(satellite_image, label).split(2)
+    assert polygonize_tiles(tiles, str(tmp_path / "labels.gpkg")) == 2
+
+
+def test_polygonize_tiles_overlap(labeled_image, tmp_path):
+    # The last row and column of tiles overlap previous tiles
+    satellite_image = labeled_image.satellite_image.crop((0, 50), (0, 50))
+    label = np.zeros((50, 50), dtype=np.uint8)
+    label[32:35, 32:35] = 1
+    label[10:45, 36:38] = 2
+    label_image = SegmentationLabeledSatelliteImage(satellite_image, label)
+    file_path = str(tmp_path / "labels.gpkg")
+    assert polygonize_tiles(label_image.split(20), file_path) == 2
+
+    polygons, classes = read_polygons(file_path)
+    expected_polygons, expected_classes = label_image.polygonize()
+    order, expected_order = np.argsort(classes), np.argsort(expected_classes)
+    assert classes[order].tolist() == expected_classes[expected_order].tolist()
+    for polygon, expected_polygon in zip(
+        polygons[order], expected_polygons[expected_order]
+    ):
+        assert polygon.normalize().equals(expected_polygon.normalize())
@@ -3,6 +3,8 @@ Tests for astrovision/filter/bounds.py
 """
 
 from osgeo import ogr
+import shapely
+from shapely.geometry import box
 from shapely.wkt import loads
 from astrovision.data.satellite_image import (
     SatelliteImage,
@@ -46,3 +48,22 @@ def test_filter_oob(oob_satellite_image, satellite_image):
 
     filtered_images = filter_oob([oob_satellite_image, satellite_image], geometry, crs)
     assert len(filtered_images) == 1
+
+
+def test_filter_oob_mask(oob_satellite_image):
+    tiles = oob_satellite_image.split(250)
+    polygon = box(499300, 8599300, 499400, 8599400)
+    crs = "EPSG:4471"
+
+    expected = [tile.intersects_polygon(polygon, crs) for tile in tiles]
+    mask = filter_oob(tiles, polygon, crs, return_type="mask")
+    assert mask.tolist() == expected
+
+    indices = filter_oob(tiles, polygon, crs, return_type="indices")
+    assert indices.tolist() == [idx for idx, value in enumerate(expected) if value]
+    assert len(filter_oob(tiles, polygon, crs)) == sum(expected)
+
+    # The polygon of the caller is left untouched
+    assert not shapely.is_prepared(polygon)
+    with pytest.raises(ValueError):
+        filter_oob(tiles, polygon, crs, return_type="list")
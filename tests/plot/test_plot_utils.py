@@ -5,6 +5,7 @@ Test the plot_utils module.
 from astrovision.data.satellite_image import (
     SatelliteImage,
 )
+from astrovision.data.labeled_satellite_image import SegmentationLabeledSatelliteImage
 from astrovision.plot import make_mosaic
 import pytest
 import numpy as np
@@ -52,3 +53,33 @@ def test_plot_images_with_detection_label():
     # TODO: Implement test
     # Just a placeholder for now
     pass
+
+
+def test_mosaic_reproject(satellite_image):
+    tiles = satellite_image.split(1000)
+    tiles[3] = tiles[3].reproject("EPSG:32738", resolution=0.5)
+    mosaic = make_mosaic(tiles, bands_indices=[0, 1, 2])
+    assert mosaic.crs == satellite_image.crs
+    assert mosaic.transform.a == 0.5
+    # Untouched tiles are unchanged in the mosaic
+    assert np.array_equal(mosaic.array[:, :1000, :1000], tiles[0].array)
+
+
+def test_mosaic_quantized_logits(satellite_image):
+    logits = np.random.rand(3, 2000, 2000).astype(np.float32)
+    labeled_image = SegmentationLabeledSatelliteImage(
+        satellite_image, logits, logits=True
+    ).quantize_logits()
+    mosaic = make_mosaic(labeled_image.split(1000), bands_indices=[0, 1, 2])
+    # Quantized logits are mosaicked without being dequantized
+    assert mosaic.label.dtype == np.uint8
+    assert np.array_equal(mosaic.label, labeled_image.label)
+    assert mosaic.logits_scale == labeled_image.logits_scale
+    assert np.array_equal(mosaic.class_ids, labeled_image.class_ids)
+
+    class_ids = SegmentationLabeledSatelliteImage(
+        satellite_image, labeled_image.class_ids.astype(np.uint8)
+    )
+    mosaic = make_mosaic(class_ids.split(1000), bands_indices=[0, 1, 2])
+    assert mosaic.label.dtype == np.uint8
+    assert np.array_equal(mosaic.label, class_ids.label)